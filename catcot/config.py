@@ -6,6 +6,7 @@ used across the codebase (indexer, searcher, topology, web, watcher, savings, me
 
 import hashlib
 import os
+import threading
 from pathlib import Path
 
 import chromadb
@@ -15,6 +16,12 @@ BASE_DIR = os.path.expanduser("~/.code-rag-mcp")
 CHROMA_DIR = os.path.join(BASE_DIR, "chroma_db")
 MEMORY_DIR = os.path.join(BASE_DIR, "memory")
 SAVINGS_FILE = os.path.join(BASE_DIR, "savings.json")
+EMBED_CACHE_FILE = os.path.join(BASE_DIR, "embed_cache.sqlite3")
+MANIFEST_DIR = os.path.join(BASE_DIR, "manifests")
+LEXICAL_DIR = os.path.join(BASE_DIR, "lexical")
+INDEX_JOBS_FILE = os.path.join(BASE_DIR, "index_jobs.json")
+PROVIDER_CACHE_FILE = os.path.join(BASE_DIR, "provider.json")
+EMBED_DAEMON_SOCKET = os.path.join(BASE_DIR, "embed.sock")
 
 
 # ── ChromaDB helpers ─────────────────────────────────────────────────
@@ -27,10 +34,22 @@ def collection_name(project_path: str) -> str:
     return f"{base}_{h}"
 
 
+_CHROMA_CLIENT: chromadb.ClientAPI | None = None
+_CHROMA_LOCK = threading.Lock()
+
+
 def get_chroma_client() -> chromadb.ClientAPI:
-    """Get a ChromaDB persistent client (single entry point)."""
-    os.makedirs(CHROMA_DIR, exist_ok=True)
-    return chromadb.PersistentClient(path=CHROMA_DIR)
+    """Get the process-wide ChromaDB persistent client (single entry point).
+
+    Created on first use and shared by every caller; collection handles
+    are cached separately in catcot.core.registry.
+    """
+    global _CHROMA_CLIENT
+    with _CHROMA_LOCK:
+        if _CHROMA_CLIENT is None:
+            os.makedirs(CHROMA_DIR, exist_ok=True)
+            _CHROMA_CLIENT = chromadb.PersistentClient(path=CHROMA_DIR)
+        return _CHROMA_CLIENT
 
 
 def memory_collection_name(project_path: str) -> str:
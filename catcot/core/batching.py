@@ -0,0 +1,147 @@
+"""Adaptive, token-budgeted embedding batch sizing.
+
+Each provider gets a per-request token budget and item cap. The budget
+starts small and adapts from what the provider actually does: it grows
+while full batches come back well under the target latency, shrinks when
+they come back slow, and halves on errors. API providers that accept
+thousands of inputs per request quickly climb to large batches; local
+models stay at the size they can serve without stalling.
+
+Override with CATCOT_EMBED_MAX_BATCH_ITEMS, CATCOT_EMBED_MAX_BATCH_TOKENS
+and CATCOT_EMBED_TARGET_LATENCY (seconds, default 10).
+
+Also holds the per-input token limit of each provider/model, used to split
+oversized chunks into windows up front (CATCOT_EMBED_MAX_INPUT_TOKENS).
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+
+# Code tokenizes denser than prose; err on the side of smaller batches.
+CHARS_PER_TOKEN = 3
+
+
+@dataclass(frozen=True)
+class BatchLimits:
+    max_items: int      # inputs per request accepted by the provider
+    max_tokens: int     # total tokens per request accepted by the provider
+    start_tokens: int   # initial budget before any latency is observed
+
+
+_PROVIDER_LIMITS: dict[str, BatchLimits] = {
+    "openai": BatchLimits(max_items=2048, max_tokens=250_000, start_tokens=32_000),
+    "voyage": BatchLimits(max_items=128, max_tokens=100_000, start_tokens=16_000),
+    "google": BatchLimits(max_items=100, max_tokens=100_000, start_tokens=16_000),
+    "ollama": BatchLimits(max_items=64, max_tokens=16_000, start_tokens=4_000),
+    "local":  BatchLimits(max_items=64, max_tokens=16_000, start_tokens=4_000),
+}
+_DEFAULT_LIMITS = BatchLimits(max_items=32, max_tokens=8_000, start_tokens=4_000)
+_MIN_BUDGET = 1_000
+
+# Tokens a single input may carry. Ollama's limit is its default num_ctx,
+# not the model's trained context.
+_INPUT_TOKENS_BY_PROVIDER = {
+    "ollama": 2048,
+    "local": 512,
+    "google": 2048,
+    "openai": 8191,
+    "voyage": 32_000,
+}
+_INPUT_TOKENS_BY_MODEL = {
+    "mxbai-embed-large": 512,
+    "all-minilm": 256,
+    "snowflake-arctic-embed": 512,
+    "sentence-transformers/all-MiniLM-L6-v2": 256,
+    "jinaai/jina-embeddings-v2-small-en": 8192,
+    "jinaai/jina-embeddings-v2-base-code": 8192,
+    "nomic-ai/nomic-embed-text-v1.5": 8192,
+    "voyage-code-3": 32_000,
+    "voyage-3-lite": 32_000,
+}
+# Headroom for the chars-per-token estimate being off on dense code
+_INPUT_SAFETY = 0.9
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def max_input_chars(provider: str, model: str) -> int:
+    """Characters one input may hold for this provider/model before splitting."""
+    base = _INPUT_TOKENS_BY_MODEL.get(model.split(":")[0])
+    if base is None:
+        base = _INPUT_TOKENS_BY_PROVIDER.get(provider, 512)
+    tokens = _env_number("CATCOT_EMBED_MAX_INPUT_TOKENS", base)
+    return max(int(tokens * CHARS_PER_TOKEN * _INPUT_SAFETY), 64)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+class BatchSizer:
+    """Latency- and error-driven token budget for one provider (thread-safe)."""
+
+    def __init__(self, limits: BatchLimits, target_latency: float):
+        self.max_items = limits.max_items
+        self.max_tokens = limits.max_tokens
+        self.target_latency = target_latency
+        self.budget = min(limits.start_tokens, limits.max_tokens)
+        self.requests = 0
+        self.errors = 0
+        self.items = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, items: int, tokens: int, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.items += items
+            self.seconds += seconds
+            if seconds > self.target_latency:
+                self.budget = max(_MIN_BUDGET, int(self.budget * 0.75))
+            elif seconds < self.target_latency / 2 and tokens >= self.budget // 2:
+                # Only a reasonably full batch says anything about headroom
+                self.budget = min(self.max_tokens, int(self.budget * 1.5))
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self.budget = max(_MIN_BUDGET, self.budget // 2)
+
+    def stats(self) -> dict:
+        with self._lock:
+            ok = self.requests - self.errors
+            return {
+                "token_budget": self.budget,
+                "max_items": self.max_items,
+                "max_tokens": self.max_tokens,
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_items_per_request": round(self.items / ok, 1) if ok else 0.0,
+                "avg_latency_seconds": round(self.seconds / ok, 3) if ok else 0.0,
+            }
+
+
+_SIZERS: dict[str, BatchSizer] = {}
+_SIZERS_LOCK = threading.Lock()
+
+
+def get_batch_sizer(provider: str) -> BatchSizer:
+    """Shared sizer for a provider name."""
+    with _SIZERS_LOCK:
+        sizer = _SIZERS.get(provider)
+        if sizer is None:
+            base = _PROVIDER_LIMITS.get(provider, _DEFAULT_LIMITS)
+            max_items = int(_env_number("CATCOT_EMBED_MAX_BATCH_ITEMS", base.max_items))
+            max_tokens = int(_env_number("CATCOT_EMBED_MAX_BATCH_TOKENS", base.max_tokens))
+            limits = BatchLimits(max_items, max_tokens, min(base.start_tokens, max_tokens))
+            sizer = BatchSizer(limits, _env_number("CATCOT_EMBED_TARGET_LATENCY", 10.0))
+            _SIZERS[provider] = sizer
+        return sizer
@@ -0,0 +1,273 @@
+"""Persistent, content-addressed embedding cache.
+
+Embeddings are stored in a single SQLite file under BASE_DIR, keyed by
+(provider, model, dimensions, sha256 of the sanitized text). The cache is
+shared by every project and every catcot process, so re-indexing after a
+chunker change or indexing a second worktree of the same repo costs almost
+no provider calls.
+
+Size is capped (CATCOT_EMBED_CACHE_MAX_MB, default 512) with least-recently-
+used eviction. Set CATCOT_EMBED_CACHE=0 to disable.
+
+Search queries additionally go through a small in-process LRU with a TTL
+(CATCOT_QUERY_CACHE_SIZE, default 256; CATCOT_QUERY_CACHE_TTL seconds,
+default 600) that coalesces concurrent identical lookups.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from catcot.config import EMBED_CACHE_FILE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key       TEXT PRIMARY KEY,
+    vector    BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used);
+"""
+
+
+def cache_key(provider: str, model: str, dimensions: int, text: str) -> str:
+    """Content address for one embedding."""
+    h = hashlib.sha256()
+    h.update(f"{provider}\0{model}\0{dimensions}\0".encode())
+    h.update(text.encode("utf-8", errors="surrogatepass"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of embedding vectors (thread-safe)."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._bytes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            row = conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+            self._bytes = row[0]
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Look up many keys at once; returns only the ones found."""
+        if not keys:
+            return {}
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            conn = self._connect()
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                conn.commit()
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        """Store vectors, evicting least-recently-used entries past the size cap."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(k, array("f", v).tobytes(), now) for k, v in items.items()]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._bytes += sum(len(r[1]) for r in rows)
+            if self._bytes > self.max_bytes:
+                self._evict(conn, len(rows[0][1]))
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, row_bytes: int) -> None:
+        """Drop the oldest entries until the cache is back to 90% of its cap."""
+        excess = self._bytes - int(self.max_bytes * 0.9)
+        n = max(1, excess // max(row_bytes, 1))
+        cur = conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (n,),
+        )
+        self.evictions += cur.rowcount
+        row = conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        self._bytes = row[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "size_mb": round(self._bytes / 1_048_576, 2),
+            "max_mb": round(self.max_bytes / 1_048_576, 2),
+        }
+
+
+_CACHE: EmbeddingCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Return the process-wide cache, or None when disabled."""
+    global _CACHE
+    if os.environ.get("CATCOT_EMBED_CACHE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            try:
+                max_mb = float(os.environ.get("CATCOT_EMBED_CACHE_MAX_MB", 512))
+            except ValueError:
+                max_mb = 512.0
+            _CACHE = EmbeddingCache(EMBED_CACHE_FILE, int(max_mb * 1_048_576))
+        return _CACHE
+
+
+class QueryCache:
+    """In-process LRU + TTL cache for query embeddings with single-flight.
+
+    Concurrent lookups of the same key share one in-flight computation.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[tuple, tuple[float, list[float]]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple) -> list[float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, vector = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _put(self, key: tuple, vector: list[float]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_compute(
+        self,
+        key: tuple,
+        compute: Callable[[], Awaitable[list[float]]],
+    ) -> list[float]:
+        vector = self._get(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        loop = asyncio.get_running_loop()
+        fut = self._inflight.get(key)
+        # Futures only coalesce within one event loop (the watcher runs its own)
+        if fut is not None and fut.get_loop() is loop:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise  # this caller was cancelled
+                # The leader was cancelled: compute it ourselves
+
+        self.misses += 1
+        fut = loop.create_future()
+        self._inflight[key] = fut
+        try:
+            vector = await compute()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+        self._put(key, vector)
+        fut.set_result(vector)
+        return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / total, 4) if total else 0.0,
+        }
+
+
+_QUERY_CACHE: QueryCache | None = None
+
+
+def get_query_cache() -> QueryCache:
+    """Process-wide query-embedding cache."""
+    global _QUERY_CACHE
+    with _CACHE_LOCK:
+        if _QUERY_CACHE is None:
+            try:
+                size = max(1, int(os.environ.get("CATCOT_QUERY_CACHE_SIZE", 256)))
+            except ValueError:
+                size = 256
+            try:
+                ttl = float(os.environ.get("CATCOT_QUERY_CACHE_TTL", 600))
+            except ValueError:
+                ttl = 600.0
+            _QUERY_CACHE = QueryCache(size, ttl)
+        return _QUERY_CACHE
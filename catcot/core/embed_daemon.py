@@ -0,0 +1,234 @@
+"""Shared local embedding daemon.
+
+One process per user holds the fastembed model and serves every catcot
+server over a Unix socket (EMBED_DAEMON_SOCKET), so N open sessions cost one
+copy of the model and one cold start. Requests arriving close together
+from different clients are embedded as a single batch.
+
+Start it with ``catcot-embed-daemon`` (or ``python -m catcot.core.embed_daemon``).
+With the ``local`` provider, catcot uses the daemon whenever its socket
+answers and falls back to in-process embedding otherwise. Set
+CATCOT_EMBED_DAEMON=0 to never use it.
+
+Protocol: one JSON object per line. Request ``{"model": str, "texts": [str],
+"query": bool}``, response ``{"vectors": [base64 float32], "dim": int}`` or
+``{"error": str}``. Query requests bypass the batch queue.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import signal
+import sys
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from catcot.config import EMBED_DAEMON_SOCKET
+
+MAX_BATCH_TEXTS = 256
+BATCH_WINDOW = 0.005  # seconds to wait for more requests before embedding
+_STREAM_LIMIT = 64 * 1024 * 1024
+
+_unavailable_until = 0.0  # client: skip the socket for a while after a failure
+
+
+def daemon_enabled() -> bool:
+    value = os.environ.get("CATCOT_EMBED_DAEMON", "1").strip().lower()
+    return value not in ("0", "false", "no", "off") and hasattr(asyncio, "open_unix_connection")
+
+
+def daemon_socket_present() -> bool:
+    """Cheap check: is there a daemon socket to try (may still be stale)?"""
+    return daemon_enabled() and os.path.exists(EMBED_DAEMON_SOCKET)
+
+
+def _encode(vectors) -> list[str]:
+    return [base64.b64encode(array("f", v).tobytes()).decode("ascii") for v in vectors]
+
+
+def _decode(encoded: list[str]) -> list[list[float]]:
+    out = []
+    for item in encoded:
+        vec = array("f")
+        vec.frombytes(base64.b64decode(item))
+        out.append(vec.tolist())
+    return out
+
+
+# ── Client ───────────────────────────────────────────────────────────
+
+
+async def embed_via_daemon(
+    model: str, texts: list[str], query: bool = False,
+) -> list[list[float]] | None:
+    """Embed through the daemon, or return None if it is not reachable.
+
+    A reply that is not valid JSON or carries no vectors counts as
+    unreachable too. Errors reported by a reachable daemon raise RuntimeError.
+    """
+    global _unavailable_until
+    if not daemon_socket_present() or time.monotonic() < _unavailable_until:
+        return None
+    try:
+        reader, writer = await asyncio.open_unix_connection(EMBED_DAEMON_SOCKET, limit=_STREAM_LIMIT)
+    except OSError:
+        _unavailable_until = time.monotonic() + 30.0
+        return None
+    try:
+        writer.write(json.dumps({"model": model, "texts": texts, "query": query}).encode() + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+    except OSError:
+        _unavailable_until = time.monotonic() + 30.0
+        return None
+    finally:
+        writer.close()
+    try:
+        resp = json.loads(line)
+        if "error" not in resp:
+            return _decode(resp["vectors"])
+    except (ValueError, KeyError, TypeError) as e:
+        # Empty, truncated or garbled reply: back off as if the socket were gone
+        sys.stderr.write(f"[Catcot] Embedding daemon sent a bad reply ({e!r}); embedding in-process\n")
+        _unavailable_until = time.monotonic() + 30.0
+        return None
+    raise RuntimeError(f"Embedding daemon error: {resp['error']}")
+
+
+# ── Server ───────────────────────────────────────────────────────────
+
+
+class _Daemon:
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.queue: asyncio.Queue[tuple[list[str], asyncio.Future]] = asyncio.Queue()
+        self.query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="daemon-query")
+        self.ready = asyncio.Event()
+        self.requests = 0
+        self.batches = 0
+
+    async def batch_loop(self) -> None:
+        from catcot.core.embedder import _fastembed_embed, warm_up_local_model
+        await asyncio.to_thread(warm_up_local_model)
+        self.ready.set()
+        sys.stderr.write(f"[Catcot Daemon] Model {self.model_name} loaded\n")
+        while True:
+            pending = [await self.queue.get()]
+            count = len(pending[0][0])
+            deadline = time.monotonic() + BATCH_WINDOW
+            while count < MAX_BATCH_TEXTS:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                count += len(item[0])
+
+            texts = [t for batch, _ in pending for t in batch]
+            try:
+                vectors = await asyncio.to_thread(_fastembed_embed, texts)
+            except Exception as e:
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            pos = 0
+            for batch, fut in pending:
+                if not fut.done():
+                    fut.set_result(vectors[pos:pos + len(batch)])
+                pos += len(batch)
+
+    async def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        from catcot.core.embedder import _fastembed_query
+        await self.ready.wait()
+        loop = asyncio.get_running_loop()
+        return [await loop.run_in_executor(self.query_executor, _fastembed_query, q) for q in queries]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    req = json.loads(line)
+                    if req.get("model") != self.model_name:
+                        raise ValueError(
+                            f"daemon serves '{self.model_name}', request was for '{req.get('model')}'"
+                        )
+                    self.requests += 1
+                    if req.get("query"):
+                        vectors = await self.embed_queries(list(req["texts"]))
+                    else:
+                        fut = asyncio.get_running_loop().create_future()
+                        await self.queue.put((list(req["texts"]), fut))
+                        vectors = await fut
+                    resp = {"vectors": _encode(vectors), "dim": len(vectors[0]) if vectors else 0}
+                except Exception as e:
+                    resp = {"error": str(e)}
+                writer.write(json.dumps(resp).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _socket_in_use(path: str) -> bool:
+    try:
+        _, writer = await asyncio.open_unix_connection(path)
+    except OSError:
+        return False
+    writer.close()
+    return True
+
+
+async def serve() -> None:
+    """Run the daemon until cancelled."""
+    if os.path.exists(EMBED_DAEMON_SOCKET):
+        if await _socket_in_use(EMBED_DAEMON_SOCKET):
+            sys.stderr.write(f"[Catcot Daemon] Already running on {EMBED_DAEMON_SOCKET}\n")
+            return
+        os.unlink(EMBED_DAEMON_SOCKET)  # stale socket from a dead daemon
+
+    model_name = os.environ.get("CATCOT_LOCAL_MODEL", "BAAI/bge-small-en-v1.5")
+    daemon = _Daemon(model_name)
+    os.makedirs(os.path.dirname(EMBED_DAEMON_SOCKET), exist_ok=True)
+    server = await asyncio.start_unix_server(daemon.handle, EMBED_DAEMON_SOCKET, limit=_STREAM_LIMIT)
+    os.chmod(EMBED_DAEMON_SOCKET, 0o600)
+    sys.stderr.write(f"[Catcot Daemon] Listening on {EMBED_DAEMON_SOCKET}\n")
+    batcher = asyncio.create_task(daemon.batch_loop())
+    serving = asyncio.create_task(server.serve_forever())
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        asyncio.get_running_loop().add_signal_handler(sig, serving.cancel)
+    try:
+        done, _ = await asyncio.wait({batcher, serving}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled():
+                task.result()  # surfaces e.g. a model that failed to load
+    finally:
+        batcher.cancel()
+        serving.cancel()
+        server.close()
+        try:
+            os.unlink(EMBED_DAEMON_SOCKET)
+        except OSError:
+            pass
+
+
+def main() -> None:
+    """Entry point for `catcot-embed-daemon`."""
+    if not hasattr(asyncio, "start_unix_server"):
+        sys.stderr.write("[Catcot Daemon] Unix sockets are not supported on this platform.\n")
+        sys.exit(1)
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,42 @@ Supports local (fastembed), Ollama, Google, OpenAI, and Voyage.
 Auto-detects available provider, or set CATCOT_EMBEDDING_PROVIDER explicitly.
 
 Priority (local-first): Ollama → local (fastembed) → Google → OpenAI → Voyage
+
+Requests go through a per-provider circuit breaker (core/health.py); with
+CATCOT_EMBED_FALLBACK set, they fail over to a secondary provider serving
+the same model while the primary is down.
 """
 
 import asyncio
+import functools
+import hashlib
+import importlib.util
+import json
+import math
 import os
+import re
 import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Callable, Awaitable
 
 import httpx
 
-# ── Truncation settings ──────────────────────────────────────────────
-MAX_CHARS = 6000
-MIN_CHARS = 500
+from catcot.config import BASE_DIR, PROVIDER_CACHE_FILE
+from catcot.core.batching import estimate_tokens, get_batch_sizer, max_input_chars
+from catcot.core.embed_cache import cache_key, get_embedding_cache, get_query_cache
+from catcot.core.embed_daemon import daemon_socket_present, embed_via_daemon
+from catcot.core.health import CircuitOpenError, ProviderUnavailableError, get_breaker
+from catcot.core.hostpool import HostPool, get_host_pool
+from catcot.core.httpclient import get_http_client
+from catcot.core.ratelimit import get_rate_limiter, parse_retry_after
+
+# ── Splitting settings ───────────────────────────────────────────────
+MIN_CHARS = 500  # windows are never split below this on a context-length error
 _RETRY_STATUSES = {429, 500, 502, 503, 504}
-_MAX_RETRIES = 3
 
 # ── Provider dataclass ───────────────────────────────────────────────
 
@@ -28,6 +49,19 @@ class _EmbeddingProvider:
     dimensions: int
     model: str
     embed: Callable[[httpx.AsyncClient, list[str]], Awaitable[list[list[float]]]]
+    # Optional dedicated path for search queries (e.g. a model's query prefix)
+    embed_query: Callable[[str], Awaitable[list[float]]] | None = None
+    # Non-default endpoint (an alternative Ollama host), None = the provider's usual one
+    endpoint: str | None = None
+    # Same model and dimensions elsewhere, used while this provider's circuit is open
+    fallback: "_EmbeddingProvider | None" = None
+    # embed() accepts dimensions=N and returns reduced vectors itself
+    native_dimensions: bool = False
+
+    @property
+    def key(self) -> str:
+        """Circuit-breaker name: the provider, qualified by its endpoint if any."""
+        return f"{self.name}@{self.endpoint}" if self.endpoint else self.name
 
 
 # ── Shared retry helper ──────────────────────────────────────────────
@@ -36,16 +70,32 @@ async def _request_with_retry(
     client: httpx.AsyncClient,
     method: str,
     url: str,
+    provider: str,
+    texts: list[str],
     **kwargs,
 ) -> httpx.Response:
-    """HTTP request with exponential backoff retry for transient errors."""
-    for attempt in range(_MAX_RETRIES):
+    """Rate-limited HTTP request with retry for transient errors.
+
+    Every attempt first passes the provider's RPM/TPM buckets. 429 and 5xx
+    responses are retried (CATCOT_EMBED_MAX_RETRIES, default 6), waiting
+    for Retry-After when the server sends it and otherwise backing off
+    exponentially with jitter.
+    """
+    limiter = get_rate_limiter(provider)
+    tokens = sum(estimate_tokens(t) for t in texts)
+    max_retries = _env_int("CATCOT_EMBED_MAX_RETRIES", 6)
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(tokens)
         resp = await client.request(method, url, **kwargs)
-        if resp.status_code in _RETRY_STATUSES and attempt < _MAX_RETRIES - 1:
-            wait = 2 ** attempt
+        if resp.status_code in _RETRY_STATUSES and attempt < max_retries:
+            wait = limiter.backoff(
+                attempt,
+                parse_retry_after(resp.headers.get("retry-after")),
+                rate_limited=resp.status_code == 429,
+            )
             sys.stderr.write(
-                f"[Catcot] HTTP {resp.status_code}, retrying in {wait}s "
-                f"(attempt {attempt + 1}/{_MAX_RETRIES})\n"
+                f"[Catcot] {provider} HTTP {resp.status_code}, retrying in {wait:.1f}s "
+                f"(attempt {attempt + 1}/{max_retries})\n"
             )
             await asyncio.sleep(wait)
             continue
@@ -56,114 +106,404 @@ async def _request_with_retry(
 
 def _sanitize_texts(texts: list[str]) -> list[str]:
     """Ensure no empty strings (some providers reject them)."""
-    return [(t.strip() or " ")[:MAX_CHARS] for t in texts]
+    return [t.strip() or " " for t in texts]
+
+
+def _split_windows(text: str, max_chars: int) -> list[str]:
+    """Split text into windows of at most max_chars, on line boundaries where possible."""
+    if len(text) <= max_chars:
+        return [text]
+    windows: list[str] = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            # A single line longer than the window: hard cut
+            if current:
+                windows.append(current)
+                current = ""
+            windows.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(current) + len(line) > max_chars:
+            windows.append(current)
+            current = ""
+        current += line
+    if current.strip() or not windows:
+        windows.append(current)
+    return [w if w.strip() else " " for w in windows]
+
+
+def _pool(vectors: list[list[float]], weights: list[int]) -> list[float]:
+    """Length-weighted mean of window embeddings, L2-normalized."""
+    if len(vectors) == 1:
+        return vectors[0]
+    total = float(sum(weights))
+    pooled = [0.0] * len(vectors[0])
+    for vec, w in zip(vectors, weights):
+        f = w / total
+        for i, x in enumerate(vec):
+            pooled[i] += x * f
+    norm = math.sqrt(sum(x * x for x in pooled))
+    return [x / norm for x in pooled] if norm else pooled
+
+
+def _truncate(vectors: list[list[float]], dimensions: int) -> list[list[float]]:
+    """Matryoshka reduction: keep the leading dimensions and L2-renormalize."""
+    out = []
+    for vec in vectors:
+        if len(vec) <= dimensions:
+            out.append(vec)
+            continue
+        head = vec[:dimensions]
+        norm = math.sqrt(sum(x * x for x in head))
+        out.append([x / norm for x in head] if norm else head)
+    return out
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment."""
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
 
 
 # ── Local (fastembed) provider ───────────────────────────────────────
 
 _FASTEMBED_MODEL_CACHE = None
+_FASTEMBED_LOCK = threading.Lock()
+
+# Bulk embedding and search queries run on separate single-thread executors
+# (ONNX already uses every core per call), so indexing can never queue ahead
+# of an interactive query.
+_LOCAL_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catcot-embed")
+_LOCAL_QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catcot-query")
+
 
 def _get_fastembed_model():
-    """Lazy-load fastembed model (cached per process)."""
+    """Lazy-load fastembed model (cached per process).
+
+    CATCOT_LOCAL_THREADS sets the ONNX Runtime thread count (default: all cores).
+    """
     global _FASTEMBED_MODEL_CACHE
     if _FASTEMBED_MODEL_CACHE is None:
-        from fastembed import TextEmbedding
-        model_name = os.environ.get("CATCOT_LOCAL_MODEL", "BAAI/bge-small-en-v1.5")
-        _FASTEMBED_MODEL_CACHE = TextEmbedding(model_name=model_name)
+        with _FASTEMBED_LOCK:
+            if _FASTEMBED_MODEL_CACHE is None:
+                from fastembed import TextEmbedding
+                model_name = os.environ.get("CATCOT_LOCAL_MODEL", "BAAI/bge-small-en-v1.5")
+                threads = os.environ.get("CATCOT_LOCAL_THREADS")
+                _FASTEMBED_MODEL_CACHE = TextEmbedding(
+                    model_name=model_name,
+                    threads=_env_int("CATCOT_LOCAL_THREADS", 1) if threads else None,
+                )
     return _FASTEMBED_MODEL_CACHE
 
 
+def _fastembed_embed(texts: list[str]) -> list[list[float]]:
+    """Passage embedding, optionally data-parallel across worker processes.
+
+    CATCOT_LOCAL_PARALLEL > 1 (or 0 for one worker per core) makes fastembed
+    split batches larger than CATCOT_LOCAL_BATCH_SIZE (default 256) across
+    processes; smaller batches stay in-process.
+    """
+    model = _get_fastembed_model()
+    parallel = os.environ.get("CATCOT_LOCAL_PARALLEL", "").strip()
+    return [
+        e.tolist()
+        for e in model.embed(
+            texts,
+            batch_size=_env_int("CATCOT_LOCAL_BATCH_SIZE", 256),
+            parallel=int(parallel) if parallel.isdigit() else None,
+        )
+    ]
+
+
+def _fastembed_query(query: str) -> list[float]:
+    return next(iter(_get_fastembed_model().query_embed(query))).tolist()
+
+
+def warm_up_local_model() -> None:
+    """Load the fastembed model and run one tiny inference (blocking)."""
+    _fastembed_embed(["warm up"])
+    _fastembed_query("warm up")
+
+
 def _check_fastembed_available() -> bool:
-    """Check if fastembed is installed."""
-    try:
-        import fastembed  # noqa: F401
-        return True
-    except ImportError:
-        return False
+    """Check if fastembed is installed (without importing it — that is slow)."""
+    return importlib.util.find_spec("fastembed") is not None
+
+
+_DAEMON_WARNED = False
 
 
 async def _embed_local(client: httpx.AsyncClient, texts: list[str]) -> list[list[float]]:
     """Embed using fastembed (runs locally, no server needed).
 
-    Runs in a thread to avoid blocking the event loop.
+    Goes through the shared embedding daemon when one is listening (one model
+    for every catcot process); otherwise loads the model in-process and runs
+    it in a thread to avoid blocking the event loop.
     """
-    model = _get_fastembed_model()
+    global _DAEMON_WARNED
     sanitized = _sanitize_texts(texts)
-    embeddings = await asyncio.to_thread(
-        lambda: [e.tolist() for e in model.embed(sanitized)]
-    )
-    return embeddings
+    model_name = os.environ.get("CATCOT_LOCAL_MODEL", "BAAI/bge-small-en-v1.5")
+    try:
+        vectors = await embed_via_daemon(model_name, sanitized)
+    except RuntimeError as e:
+        vectors = None
+        if not _DAEMON_WARNED:
+            _DAEMON_WARNED = True
+            sys.stderr.write(f"[Catcot] {e}; embedding in-process instead\n")
+    if vectors is not None:
+        return vectors
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_LOCAL_EXECUTOR, _fastembed_embed, sanitized)
+
+
+async def _embed_local_query(query: str) -> list[float]:
+    """Low-latency query path: fastembed's query_embed on its own executor."""
+    model_name = os.environ.get("CATCOT_LOCAL_MODEL", "BAAI/bge-small-en-v1.5")
+    try:
+        vectors = await embed_via_daemon(model_name, [query], query=True)
+    except RuntimeError:
+        vectors = None
+    if vectors is not None:
+        return vectors[0]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_LOCAL_QUERY_EXECUTOR, _fastembed_query, query)
 
 
 # ── Ollama provider ─────────────────────────────────────────────────
 
-async def _embed_ollama(client: httpx.AsyncClient, texts: list[str]) -> list[list[float]]:
-    model = os.environ.get("CATCOT_OLLAMA_MODEL", "nomic-embed-text")
-    ollama_url = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
-    results: list[list[float]] = []
-
-    for text in texts:
-        content = text.strip() or " "
-        limit = MAX_CHARS
-
-        while True:
-            truncated = content[:limit] if len(content) > limit else content
-            resp = await client.post(
-                f"{ollama_url}/api/embed",
-                json={"model": model, "input": truncated},
-            )
+def ollama_hosts() -> tuple[str, ...]:
+    """Ollama base URLs: CATCOT_OLLAMA_HOSTS (comma-separated) or OLLAMA_HOST."""
+    raw = os.environ.get("CATCOT_OLLAMA_HOSTS") or os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+    hosts = []
+    for host in raw.split(","):
+        host = host.strip().rstrip("/")
+        if not host:
+            continue
+        if "://" not in host:
+            host = f"http://{host}"  # OLLAMA_HOST is often given as host:port
+        if host not in hosts:
+            hosts.append(host)
+    return tuple(hosts) or ("http://localhost:11434",)
+
+
+# Semaphores per event loop (the watcher runs its own short-lived loops), per host.
+_OLLAMA_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _ollama_semaphore(ollama_url: str, hosts: int = 1) -> asyncio.Semaphore:
+    """Limit concurrent /api/embed requests to one host across all callers in this loop.
+
+    With ``hosts`` > 1, ``ollama_url`` names a pool and the limit is the
+    pool's combined capacity.
+    """
+    per_host = _OLLAMA_SEMAPHORES.setdefault(asyncio.get_running_loop(), {})
+    sem = per_host.get(ollama_url)
+    if sem is None:
+        sem = asyncio.Semaphore(_env_int("CATCOT_OLLAMA_CONCURRENCY", 4) * hosts)
+        per_host[ollama_url] = sem
+    return sem
+
+
+class _ContextLengthError(Exception):
+    """Ollama rejected the request because an input exceeds the model context."""
+
 
-            if resp.status_code == 400 and "context length" in resp.text:
-                limit = limit // 2
-                if limit < MIN_CHARS:
-                    limit = MIN_CHARS
-                    truncated = content[:limit]
-                    resp = await client.post(
-                        f"{ollama_url}/api/embed",
-                        json={"model": model, "input": truncated},
+async def _ollama_post(
+    client: httpx.AsyncClient,
+    ollama_url: str,
+    model: str,
+    inputs: list[str],
+) -> list[list[float]]:
+    """Send one /api/embed request for a list of inputs."""
+    async with _ollama_semaphore(ollama_url):
+        resp = await client.post(
+            f"{ollama_url}/api/embed",
+            json={"model": model, "input": inputs},
+        )
+    if resp.status_code == 400 and "context length" in resp.text:
+        raise _ContextLengthError(resp.text)
+    resp.raise_for_status()
+
+    emb_list = resp.json().get("embeddings") or []
+    if len(emb_list) != len(inputs):
+        raise RuntimeError(
+            f"Ollama returned empty embeddings for model '{model}'. "
+            "Ensure the model is pulled: ollama pull " + model
+        )
+    return emb_list
+
+
+async def _ollama_embed_split(
+    client: httpx.AsyncClient,
+    ollama_url: str,
+    model: str,
+    content: str,
+) -> list[float]:
+    """Embed an input the token estimate let through but Ollama rejected.
+
+    Inputs are pre-split to fit the context, so this only triggers when the
+    estimate is off (e.g. very dense text). The input is split in two and
+    the halves pooled, so nothing is dropped. An input still rejected at
+    MIN_CHARS or less raises RuntimeError, like any other Ollama API error.
+    """
+    try:
+        return (await _ollama_post(client, ollama_url, model, [content]))[0]
+    except _ContextLengthError as e:
+        if len(content) <= MIN_CHARS:
+            raise RuntimeError(
+                f"ollama API error: 400 - a {len(content)}-character input "
+                f"({content[:60]!r}...) exceeds the context length of model '{model}': {e}"
+            ) from None
+    halves = _split_windows(content, len(content) // 2 + 1)
+    vectors = [await _ollama_embed_split(client, ollama_url, model, h) for h in halves]
+    return _pool(vectors, [len(h) for h in halves])
+
+
+async def _ollama_embed_batch(
+    client: httpx.AsyncClient,
+    ollama_url: str,
+    model: str,
+    batch: list[str],
+) -> list[list[float]]:
+    """Embed a batch in one request.
+
+    If Ollama rejects the batch for context length, the longest remaining
+    input (the one over the limit) is pulled out and split on its own;
+    the rest of the batch is retried unchanged.
+    """
+    results: list[list[float] | None] = [None] * len(batch)
+    pending = list(range(len(batch)))
+    while pending:
+        try:
+            embs = await _ollama_post(client, ollama_url, model, [batch[i] for i in pending])
+        except _ContextLengthError:
+            worst = max(pending, key=lambda i: len(batch[i]))
+            pending.remove(worst)
+            results[worst] = await _ollama_embed_split(client, ollama_url, model, batch[worst])
+            continue
+        for i, emb in zip(pending, embs):
+            results[i] = emb
+        break
+    return results  # type: ignore[return-value]
+
+
+async def _ollama_embed_balanced(
+    client: httpx.AsyncClient,
+    pool: HostPool,
+    model: str,
+    batch: list[str],
+) -> list[list[float]]:
+    """Embed a batch on the least-loaded healthy host, moving to another host on failure.
+
+    Connection errors, timeouts and 5xx take the host out of rotation (see
+    core/hostpool.py); any other error is about the request and is raised.
+    """
+    # Pick a host only once a slot is free, so the host that just finished
+    # (the fastest) takes the next batch instead of batches queueing evenly.
+    pool_key = "pool:" + ",".join(h.url for h in pool.hosts)
+    tried: set[str] = set()
+    last_error: Exception | None = None
+    async with _ollama_semaphore(pool_key, len(pool.hosts)):
+        while (host := pool.acquire(exclude=tried)) is not None:
+            tried.add(host.url)
+            t0 = time.monotonic()
+            try:
+                result = await _ollama_embed_batch(client, host.url, model, batch)
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                    pool.release(host)
+                    raise
+                pool.release(host, error=e)
+                last_error = e
+                if len(pool.hosts) > 1:
+                    sys.stderr.write(
+                        f"[Catcot] Ollama host {host.url} failed ({e!r}), taking it out of rotation\n"
                     )
-                    resp.raise_for_status()
-                    break
                 continue
+            except BaseException:
+                pool.release(host)
+                raise
+            pool.release(host, seconds=time.monotonic() - t0)
+            return result
+
+    if last_error is not None:
+        raise last_error
+    down = [h for h in pool.stats() if h["state"] != "healthy"]
+    raise ProviderUnavailableError(
+        f"No Ollama host available ({len(down)} down, last error: "
+        f"{down[0]['last_error'] if down else 'none'}). Start it with: ollama serve"
+    )
 
-            resp.raise_for_status()
-            break
 
-        data = resp.json()
-        emb_list = data.get("embeddings") or []
-        if emb_list:
-            results.append(emb_list[0])
-        else:
-            raise RuntimeError(
-                f"Ollama returned empty embeddings for model '{model}'. "
-                "Ensure the model is pulled: ollama pull " + model
-            )
+async def _embed_ollama(
+    client: httpx.AsyncClient,
+    texts: list[str],
+    host: str | None = None,
+) -> list[list[float]]:
+    """Embed via Ollama's /api/embed, batching inputs and running batches concurrently.
+
+    Batches are spread over every host in CATCOT_OLLAMA_HOSTS (or OLLAMA_HOST)
+    by least outstanding requests. Batch size and per-host concurrency are set
+    with CATCOT_OLLAMA_BATCH_SIZE (default 16) and CATCOT_OLLAMA_CONCURRENCY
+    (default 4). ``host`` pins a single host (used for fallbacks).
+    """
+    model = os.environ.get("CATCOT_OLLAMA_MODEL", "nomic-embed-text")
+    pool = get_host_pool((host.rstrip("/"),) if host else ollama_hosts())
+    batch_size = _env_int("CATCOT_OLLAMA_BATCH_SIZE", 16)
 
-    return results
+    sanitized = _sanitize_texts(texts)
+    batches = [sanitized[i:i + batch_size] for i in range(0, len(sanitized), batch_size)]
+    batch_results = await asyncio.gather(*(
+        _ollama_embed_balanced(client, pool, model, b) for b in batches
+    ))
+    return [emb for embs in batch_results for emb in embs]
 
 
 # ── API providers ────────────────────────────────────────────────────
 
-async def _embed_google(client: httpx.AsyncClient, texts: list[str]) -> list[list[float]]:
+async def _embed_google(
+    client: httpx.AsyncClient,
+    texts: list[str],
+    dimensions: int | None = None,
+) -> list[list[float]]:
     api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY", "")
     model = os.environ.get("CATCOT_GOOGLE_MODEL", "text-embedding-004")
     url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:batchEmbedContents?key={api_key}"
 
     sanitized = _sanitize_texts(texts)
     requests_body = [{"model": f"models/{model}", "content": {"parts": [{"text": t}]}} for t in sanitized]
-    resp = await _request_with_retry(client, "POST", url, json={"requests": requests_body})
+    if dimensions:
+        for body in requests_body:
+            body["outputDimensionality"] = dimensions
+    resp = await _request_with_retry(
+        client, "POST", url, "google", sanitized, json={"requests": requests_body},
+    )
     data = resp.json()
     return [e["values"] for e in data["embeddings"]]
 
 
-async def _embed_openai(client: httpx.AsyncClient, texts: list[str]) -> list[list[float]]:
+async def _embed_openai(
+    client: httpx.AsyncClient,
+    texts: list[str],
+    dimensions: int | None = None,
+) -> list[list[float]]:
     api_key = os.environ.get("OPENAI_API_KEY", "")
     model = os.environ.get("CATCOT_OPENAI_MODEL", "text-embedding-3-small")
+    sanitized = _sanitize_texts(texts)
+    body = {"model": model, "input": sanitized}
+    if dimensions:
+        body["dimensions"] = dimensions
     resp = await _request_with_retry(
         client, "POST",
         "https://api.openai.com/v1/embeddings",
+        "openai", sanitized,
         headers={"Authorization": f"Bearer {api_key}"},
-        json={"model": model, "input": _sanitize_texts(texts)},
+        json=body,
     )
     data = resp.json()
     return [item["embedding"] for item in data["data"]]
@@ -172,11 +512,13 @@ async def _embed_openai(client: httpx.AsyncClient, texts: list[str]) -> list[lis
 async def _embed_voyage(client: httpx.AsyncClient, texts: list[str]) -> list[list[float]]:
     api_key = os.environ.get("VOYAGE_API_KEY", "")
     model = os.environ.get("CATCOT_VOYAGE_MODEL", "voyage-3-lite")
+    sanitized = _sanitize_texts(texts)
     resp = await _request_with_retry(
         client, "POST",
         "https://api.voyageai.com/v1/embeddings",
+        "voyage", sanitized,
         headers={"Authorization": f"Bearer {api_key}"},
-        json={"model": model, "input": _sanitize_texts(texts)},
+        json={"model": model, "input": sanitized},
     )
     data = resp.json()
     return [item["embedding"] for item in data["data"]]
@@ -192,35 +534,93 @@ _PROVIDER_DEFAULTS: dict[str, tuple[int, str, Callable]] = {
     "voyage":  (512,  "voyage-3-lite",           _embed_voyage),
 }
 
-# ── Shared HTTP client ───────────────────────────────────────────────
-
-_HTTP_CLIENT: httpx.AsyncClient | None = None
-
+# Matryoshka-trained models: their leading dimensions are a usable embedding
+# on their own, so vectors can be reduced (natively or by truncation).
+_MATRYOSHKA_MODELS = {
+    "text-embedding-3-small",
+    "text-embedding-3-large",
+    "text-embedding-004",
+    "nomic-embed-text",
+    "mxbai-embed-large",
+    "nomic-ai/nomic-embed-text-v1.5",
+    "voyage-code-3",
+    "voyage-3-large",
+    "voyage-3.5",
+    "voyage-3.5-lite",
+}
 
-def _get_http_client() -> httpx.AsyncClient:
-    """Get or create a shared HTTP client for connection reuse."""
-    global _HTTP_CLIENT
-    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
-        _HTTP_CLIENT = httpx.AsyncClient(timeout=120.0)
-    return _HTTP_CLIENT
+# Providers whose API returns reduced vectors itself (dimensions=N)
+_NATIVE_DIMENSIONS = {"openai", "google"}
 
+# Providers with a separate query path (search queries skip the passage path)
+_QUERY_EMBEDDERS: dict[str, Callable[[str], Awaitable[list[float]]]] = {
+    "local": _embed_local_query,
+}
 
 # ── Provider resolution ──────────────────────────────────────────────
 
 _PROVIDER_CACHE: _EmbeddingProvider | None = None
+_PROVIDER_LOCK = threading.Lock()
 
 
 def _check_ollama_reachable() -> bool:
-    """Check if Ollama is reachable (2s timeout).
+    """Check if any configured Ollama host is reachable (2s timeout each).
 
-    Uses a short-lived sync client to avoid event loop issues at startup.
+    Uses a short-lived sync client; callers on an event loop go through
+    resolve_provider_info(), which runs this in a worker thread.
     """
-    ollama_url = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+    for ollama_url in ollama_hosts():
+        try:
+            if httpx.get(f"{ollama_url}/", timeout=2.0).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            continue
+    return False
+
+
+def _detection_fingerprint() -> str:
+    """Hash of the environment that auto-detection depends on."""
+    parts = [
+        ",".join(ollama_hosts()),
+        str(_check_fastembed_available()),
+    ] + [
+        str(bool(os.environ.get(k)))
+        for k in ("GOOGLE_API_KEY", "GEMINI_API_KEY", "OPENAI_API_KEY", "VOYAGE_API_KEY")
+    ]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:16]
+
+
+def _detection_ttl() -> float:
     try:
-        resp = httpx.get(f"{ollama_url}/", timeout=2.0)
-        return resp.status_code == 200
-    except (httpx.ConnectError, httpx.TimeoutException):
-        return False
+        return float(os.environ.get("CATCOT_PROVIDER_CACHE_TTL", 300))
+    except ValueError:
+        return 300.0
+
+
+def _load_detected_provider(fingerprint: str) -> str | None:
+    """Provider name from a recent auto-detection, if the environment is unchanged."""
+    try:
+        with open(PROVIDER_CACHE_FILE, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return None
+    if data.get("fingerprint") != fingerprint:
+        return None
+    if time.time() - data.get("detected_at", 0) > _detection_ttl():
+        return None
+    name = data.get("name")
+    return name if name in _PROVIDER_DEFAULTS else None
+
+
+def _save_detected_provider(name: str, fingerprint: str) -> None:
+    try:
+        os.makedirs(BASE_DIR, exist_ok=True)
+        tmp = f"{PROVIDER_CACHE_FILE}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"name": name, "fingerprint": fingerprint, "detected_at": time.time()}, f)
+        os.replace(tmp, PROVIDER_CACHE_FILE)
+    except OSError:
+        pass
 
 
 def _resolve_provider() -> _EmbeddingProvider:
@@ -233,11 +633,45 @@ def _resolve_provider() -> _EmbeddingProvider:
       4. OPENAI_API_KEY
       5. VOYAGE_API_KEY
       6. None → error with instructions
+
+    Auto-detection results are cached on disk for CATCOT_PROVIDER_CACHE_TTL
+    seconds (default 300), so restarts skip the Ollama probe. This may block
+    on that probe; code on an event loop should await
+    resolve_provider_info() instead.
     """
-    global _PROVIDER_CACHE
     if _PROVIDER_CACHE is not None:
         return _PROVIDER_CACHE
+    with _PROVIDER_LOCK:
+        if _PROVIDER_CACHE is not None:
+            return _PROVIDER_CACHE
+        return _detect_provider()
+
+
+def _auto_detect_provider() -> str:
+    """Pick a provider name from what is available (local-first)."""
+    if _check_ollama_reachable():
+        return "ollama"
+    if _check_fastembed_available():
+        return "local"
+    if os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY"):
+        return "google"
+    if os.environ.get("OPENAI_API_KEY"):
+        return "openai"
+    if os.environ.get("VOYAGE_API_KEY"):
+        return "voyage"
+    raise RuntimeError(
+        "No embedding provider available. Options:\n"
+        "  1. Start Ollama locally: ollama serve\n"
+        "  2. Install fastembed for pure-local embeddings: pip install fastembed\n"
+        "  3. Set GOOGLE_API_KEY or GEMINI_API_KEY for Google embeddings\n"
+        "  4. Set OPENAI_API_KEY for OpenAI embeddings\n"
+        "  5. Set VOYAGE_API_KEY for Voyage embeddings\n"
+        "  Or set CATCOT_EMBEDDING_PROVIDER explicitly."
+    )
 
+
+def _detect_provider() -> _EmbeddingProvider:
+    global _PROVIDER_CACHE
     explicit = os.environ.get("CATCOT_EMBEDDING_PROVIDER", "").lower().strip()
 
     if explicit:
@@ -249,41 +683,85 @@ def _resolve_provider() -> _EmbeddingProvider:
         name = explicit
         _verify_provider_env(name)
     else:
-        # Auto-detect: local-first priority
-        if _check_ollama_reachable():
-            name = "ollama"
-        elif _check_fastembed_available():
-            name = "local"
-        elif os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY"):
-            name = "google"
-        elif os.environ.get("OPENAI_API_KEY"):
-            name = "openai"
-        elif os.environ.get("VOYAGE_API_KEY"):
-            name = "voyage"
-        else:
-            raise RuntimeError(
-                "No embedding provider available. Options:\n"
-                "  1. Start Ollama locally: ollama serve\n"
-                "  2. Install fastembed for pure-local embeddings: pip install fastembed\n"
-                "  3. Set GOOGLE_API_KEY or GEMINI_API_KEY for Google embeddings\n"
-                "  4. Set OPENAI_API_KEY for OpenAI embeddings\n"
-                "  5. Set VOYAGE_API_KEY for Voyage embeddings\n"
-                "  Or set CATCOT_EMBEDDING_PROVIDER explicitly."
-            )
+        fingerprint = _detection_fingerprint()
+        name = _load_detected_provider(fingerprint)
+        if name is None:
+            name = _auto_detect_provider()
+            _save_detected_provider(name, fingerprint)
 
     dims, default_model, embed_fn = _PROVIDER_DEFAULTS[name]
     model_env = f"CATCOT_{name.upper()}_MODEL"
     model = os.environ.get(model_env, default_model)
 
-    _PROVIDER_CACHE = _EmbeddingProvider(
+    primary = _EmbeddingProvider(
         name=name,
         dimensions=dims,
         model=model,
         embed=embed_fn,
+        embed_query=_QUERY_EMBEDDERS.get(name),
+        native_dimensions=name in _NATIVE_DIMENSIONS,
     )
+    primary.fallback = _configure_fallback(primary)
+    _PROVIDER_CACHE = primary
     return _PROVIDER_CACHE
 
 
+def _configure_fallback(primary: _EmbeddingProvider) -> _EmbeddingProvider | None:
+    """Secondary provider from CATCOT_EMBED_FALLBACK, if it is vector-compatible.
+
+    Accepts a provider name (``openai``), ``ollama@<url>``, or a bare URL
+    meaning another Ollama host. The fallback must use the same model and
+    dimensions as the primary, otherwise its vectors would not be comparable
+    with the index; an incompatible fallback is ignored with a warning.
+    """
+    spec = os.environ.get("CATCOT_EMBED_FALLBACK", "").strip()
+    if not spec:
+        return None
+    if spec.startswith(("http://", "https://")):
+        name, endpoint = "ollama", spec
+    else:
+        name, _, endpoint = spec.partition("@")
+        name = name.lower().strip()
+    endpoint = endpoint.strip().rstrip("/") or None
+
+    def ignore(reason: str) -> None:
+        sys.stderr.write(f"[Catcot] Warning: ignoring CATCOT_EMBED_FALLBACK={spec}: {reason}\n")
+
+    if name not in _PROVIDER_DEFAULTS:
+        ignore(f"unknown provider '{name}'")
+        return None
+    if endpoint and name != "ollama":
+        ignore("only Ollama fallbacks take a host")
+        return None
+    dims, default_model, embed_fn = _PROVIDER_DEFAULTS[name]
+    model = os.environ.get(f"CATCOT_{name.upper()}_MODEL", default_model)
+    if (model, dims) != (primary.model, primary.dimensions):
+        ignore(
+            f"{name} serves {model} ({dims} dims), the index uses "
+            f"{primary.model} ({primary.dimensions} dims)"
+        )
+        return None
+    if name == primary.name and endpoint == primary.endpoint:
+        ignore("same endpoint as the primary provider")
+        return None
+    try:
+        _verify_provider_env(name)
+    except RuntimeError as e:
+        ignore(str(e))
+        return None
+    if endpoint:
+        embed_fn = functools.partial(_embed_ollama, host=endpoint)
+    return _EmbeddingProvider(
+        name=name,
+        dimensions=dims,
+        model=model,
+        embed=embed_fn,
+        embed_query=_QUERY_EMBEDDERS.get(name),
+        endpoint=endpoint,
+        native_dimensions=name in _NATIVE_DIMENSIONS,
+    )
+
+
 def _verify_provider_env(name: str) -> None:
     """Verify that required env vars exist for the chosen provider."""
     env_checks = {
@@ -306,11 +784,12 @@ def _verify_provider_env(name: str) -> None:
 
 def reset_provider_cache() -> None:
     """Reset the cached provider. Useful for testing or provider switching."""
-    global _PROVIDER_CACHE, _HTTP_CLIENT
+    global _PROVIDER_CACHE
     _PROVIDER_CACHE = None
-    if _HTTP_CLIENT and not _HTTP_CLIENT.is_closed:
-        # Don't close here — it may be in use. Let GC handle it.
-        _HTTP_CLIENT = None
+    try:
+        os.remove(PROVIDER_CACHE_FILE)
+    except OSError:
+        pass
 
 
 # ── Public API ───────────────────────────────────────────────────────
@@ -328,31 +807,335 @@ def get_provider_info() -> dict:
     }
 
 
-async def embed_texts(texts: list[str]) -> list[list[float]]:
+async def _resolve_provider_async() -> _EmbeddingProvider:
+    """_resolve_provider without blocking the event loop on detection."""
+    if _PROVIDER_CACHE is not None:
+        return _PROVIDER_CACHE
+    return await asyncio.to_thread(_resolve_provider)
+
+
+async def resolve_provider_info() -> dict:
+    """Async get_provider_info: waits for detection in a worker thread if needed."""
+    await _resolve_provider_async()
+    return get_provider_info()
+
+
+def peek_provider_info() -> dict | None:
+    """Provider info if detection already finished, else None (never blocks)."""
+    return get_provider_info() if _PROVIDER_CACHE is not None else None
+
+
+def start_provider_detection() -> None:
+    """Detect the provider in a background thread and log the result.
+
+    Called at server start so the MCP loop comes up immediately; the first
+    tool that needs an embedding waits for detection only if it is still
+    running. With the local provider the model is also loaded and warmed
+    up here (unless the shared daemon serves it), so the first search does
+    not pay the load cost.
+    """
+    def detect() -> None:
+        try:
+            provider = get_provider_info()
+            sys.stderr.write(
+                f"[Catcot] Embedding provider: {provider['name']} "
+                f"(model: {provider['model']}, dims: {provider['dimensions']})\n"
+            )
+        except RuntimeError as e:
+            sys.stderr.write(f"[Catcot] Warning: {e}\n")
+            return
+        if provider["name"] == "local" and not daemon_socket_present():
+            t0 = time.monotonic()
+            try:
+                warm_up_local_model()
+            except Exception as e:
+                sys.stderr.write(f"[Catcot] Warning: local model warm-up failed: {e}\n")
+                return
+            sys.stderr.write(f"[Catcot] Local model ready in {time.monotonic() - t0:.1f}s\n")
+
+    threading.Thread(target=detect, name="catcot-provider-detect", daemon=True).start()
+
+
+def resolve_dimensions(requested: int | None) -> int:
+    """Effective embedding size for a requested reduced dimension.
+
+    ``requested`` None/0 falls back to CATCOT_EMBED_DIMENSIONS, then to the
+    model's full size.
+
+    Raises:
+        ValueError: If the size is invalid or the model is not Matryoshka-trained.
+    """
+    provider = _resolve_provider()
+    if not requested:
+        try:
+            requested = int(os.environ.get("CATCOT_EMBED_DIMENSIONS") or 0)
+        except ValueError:
+            raise ValueError("CATCOT_EMBED_DIMENSIONS must be an integer") from None
+    if not requested or requested == provider.dimensions:
+        return provider.dimensions
+    if not 0 < requested < provider.dimensions:
+        raise ValueError(
+            f"dimensions must be between 1 and {provider.dimensions} for {provider.model}, got {requested}"
+        )
+    if provider.model.split(":")[0] not in _MATRYOSHKA_MODELS:
+        raise ValueError(
+            f"{provider.model} does not support reduced dimensions. "
+            f"Matryoshka models: {', '.join(sorted(_MATRYOSHKA_MODELS))}"
+        )
+    return requested
+
+
+def collection_dimensions(metadata: dict | None) -> int | None:
+    """Reduced embedding size a collection was indexed with, or None for full size."""
+    dims = (metadata or {}).get("embedding_dimensions")
+    if isinstance(dims, int) and 0 < dims < _resolve_provider().dimensions:
+        return dims
+    return None
+
+
+async def embed_texts(texts: list[str], dimensions: int | None = None) -> list[list[float]]:
     """Embed a list of texts using the active provider.
 
+    Vectors already in the persistent embedding cache are reused; only the
+    misses are sent to the provider. ``dimensions`` reduces Matryoshka
+    embeddings to that size (see resolve_dimensions); None keeps full size.
+
     Returns list of embedding vectors.
     """
-    provider = _resolve_provider()
-    client = _get_http_client()
+    provider = await _resolve_provider_async()
+    cache = get_embedding_cache()
+    if dimensions and dimensions >= provider.dimensions:
+        dimensions = None
+
+    keys: list[str] = []
+    cached: dict[str, list[float]] = {}
+    if cache is not None:
+        keys = [
+            cache_key(provider.name, provider.model, dimensions or provider.dimensions, t)
+            for t in _sanitize_texts(texts)
+        ]
+        cached = await asyncio.to_thread(cache.get_many, keys)
+        if len(cached) == len(set(keys)):
+            return [cached[k] for k in keys]
+
+    missing = [i for i in range(len(texts)) if not keys or keys[i] not in cached]
+    fresh = await _embed_with_provider(provider, [texts[i] for i in missing], dimensions)
+
+    if cache is None:
+        return fresh
+    new_items = {keys[i]: emb for i, emb in zip(missing, fresh)}
+    await asyncio.to_thread(cache.put_many, new_items)
+    cached.update(new_items)
+    return [cached[k] for k in keys]
+
+
+async def _embed_with_provider(
+    provider: _EmbeddingProvider,
+    texts: list[str],
+    dimensions: int | None = None,
+) -> list[list[float]]:
+    """Embed texts, splitting any that exceed the model's input limit.
+
+    Oversized texts are cut into windows that fit the provider/model token
+    limit; the window embeddings are pooled back into one vector per text,
+    so trailing code is never silently truncated away.
+    """
+    max_chars = max_input_chars(provider.name, provider.model)
+    windows: list[str] = []
+    spans: list[tuple[int, int]] = []
+    for text in _sanitize_texts(texts):
+        parts = _split_windows(text, max_chars)
+        spans.append((len(windows), len(windows) + len(parts)))
+        windows.extend(parts)
+    if len(windows) == len(texts):
+        return await _embed_with_failover(provider, windows, dimensions)
+
+    max_items = get_batch_sizer(provider.name).max_items
+    vectors: list[list[float]] = []
+    for i in range(0, len(windows), max_items):
+        vectors += await _embed_with_failover(provider, windows[i:i + max_items], dimensions)
+    return [
+        _pool(vectors[a:b], [len(w) for w in windows[a:b]])
+        for a, b in spans
+    ]
+
+
+async def _embed_with_failover(
+    provider: _EmbeddingProvider,
+    texts: list[str],
+    dimensions: int | None = None,
+) -> list[list[float]]:
+    """Embed through the first provider whose circuit lets the request through.
+
+    The primary is tried first, then its fallback. An unavailable provider
+    (connection error, timeout, 5xx) counts against its breaker; once the
+    breaker is open the provider is skipped without waiting on it.
+    """
+    candidates = [provider] + ([provider.fallback] if provider.fallback else [])
+    last_error: ProviderUnavailableError | None = None
+    for candidate in candidates:
+        breaker = get_breaker(candidate.key)
+        if not breaker.allow():
+            last_error = CircuitOpenError(
+                f"{candidate.key} is unavailable (circuit open, next probe in "
+                f"{breaker.retry_in():.0f}s): {breaker.last_error}"
+            )
+            continue
+        try:
+            result = await _embed_request(candidate, texts, dimensions)
+        except ProviderUnavailableError as e:
+            breaker.record_failure(e)
+            last_error = e
+            if candidate is not candidates[-1]:
+                sys.stderr.write(
+                    f"[Catcot] {candidate.key} unavailable ({e}); "
+                    f"failing over to {candidates[-1].key}\n"
+                )
+            continue
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+    raise last_error  # type: ignore[misc]
+
+
+_TOO_LARGE = re.compile(
+    r"too large|too long|too many|context length|maximum context|exceed", re.IGNORECASE,
+)
+
+
+def _payload_too_large(response: httpx.Response) -> bool:
+    """Whether an error response rejects the size of the batch, not the request."""
+    if response.status_code == 413:
+        return True
+    return response.status_code == 400 and bool(_TOO_LARGE.search(response.text))
+
+
+async def _embed_request(
+    provider: _EmbeddingProvider,
+    texts: list[str],
+    dimensions: int | None = None,
+) -> list[list[float]]:
+    """Call the provider, translating transport errors into RuntimeError.
+
+    Latency and failures feed the provider's adaptive batch sizer. A batch
+    rejected as too large (HTTP 413, or a 400 saying so) is split in half
+    and retried; any other 4xx is about the request itself and is raised.
+    Connection errors, timeouts and 5xx raise ProviderUnavailableError.
+    Reduced ``dimensions`` are requested natively where the API supports
+    it, otherwise the full vectors are truncated and renormalized.
+    """
+    client = get_http_client()
+    sizer = get_batch_sizer(provider.name)
+    embed = provider.embed
+    if dimensions and provider.native_dimensions:
+        embed = functools.partial(provider.embed, dimensions=dimensions)
 
+    t0 = time.monotonic()
     try:
-        return await provider.embed(client, texts)
+        result = await embed(client, texts)
     except httpx.ConnectError:
         if provider.name == "ollama":
-            raise RuntimeError(
-                "Ollama is not running. Start it with: ollama serve"
+            where = f" at {provider.endpoint}" if provider.endpoint else ""
+            raise ProviderUnavailableError(
+                f"Ollama is not running{where}. Start it with: ollama serve"
             )
-        raise RuntimeError(
+        raise ProviderUnavailableError(
             f"Cannot connect to {provider.name} API. Check your network and API key."
         )
     except httpx.HTTPStatusError as e:
-        raise RuntimeError(
+        status = e.response.status_code
+        too_large = _payload_too_large(e.response)
+        if too_large or status == 429 or status >= 500:
+            sizer.record_failure()
+        if too_large and len(texts) > 1:
+            mid = len(texts) // 2
+            return (
+                await _embed_request(provider, texts[:mid], dimensions)
+                + await _embed_request(provider, texts[mid:], dimensions)
+            )
+        error = ProviderUnavailableError if status >= 500 else RuntimeError
+        raise error(
             f"{provider.name} API error: {e.response.status_code} - {e.response.text}"
         )
+    except httpx.TimeoutException:
+        sizer.record_failure()
+        raise ProviderUnavailableError(f"{provider.key} timed out")
+    except httpx.TransportError as e:
+        raise ProviderUnavailableError(f"{provider.key} connection failed: {e!r}")
+    sizer.record_success(
+        len(texts),
+        sum(estimate_tokens(t) for t in _sanitize_texts(texts)),
+        time.monotonic() - t0,
+    )
+    return _truncate(result, dimensions) if dimensions else result
+
+
+def get_provider_health() -> dict:
+    """Circuit state of the active provider and its fallback."""
+    provider = _resolve_provider()
+    health = {
+        "provider": provider.key,
+        **get_breaker(provider.key).stats(),
+        "fallback": None,
+    }
+    if provider.name == "ollama":
+        health["hosts"] = _ollama_host_stats(provider)
+    if provider.fallback is not None:
+        health["fallback"] = {
+            "provider": provider.fallback.key,
+            **get_breaker(provider.fallback.key).stats(),
+        }
+        if provider.fallback.name == "ollama":
+            health["fallback"]["hosts"] = _ollama_host_stats(provider.fallback)
+    return health
+
+
+def _ollama_host_stats(provider: _EmbeddingProvider) -> list[dict]:
+    hosts = (provider.endpoint,) if provider.endpoint else ollama_hosts()
+    return get_host_pool(hosts).stats()
 
 
-async def embed_query(query: str) -> list[float]:
-    """Embed a single query string."""
-    results = await embed_texts([query])
-    return results[0]
+def get_rate_limit_stats() -> dict:
+    """Request/token quota usage and throttling for the active provider."""
+    return get_rate_limiter(_resolve_provider().name).stats()
+
+
+def get_batching_stats() -> dict:
+    """Adaptive batch size state for the active provider."""
+    return get_batch_sizer(_resolve_provider().name).stats()
+
+
+def get_embedding_cache_stats() -> dict | None:
+    """Hit/miss counters and size of the persistent embedding cache."""
+    cache = get_embedding_cache()
+    return cache.stats() if cache is not None else None
+
+
+def get_query_cache_stats() -> dict:
+    """Hit/miss/coalesced counters of the in-process query-embedding cache."""
+    return get_query_cache().stats()
+
+
+async def embed_query(query: str, dimensions: int | None = None) -> list[float]:
+    """Embed a single query string.
+
+    Repeated queries are served from an in-process LRU/TTL cache, and
+    concurrent identical queries share a single provider request. The full
+    vector is cached; ``dimensions`` truncates it for a reduced-dimension
+    collection, so one query serves collections of every size.
+    """
+    provider = await _resolve_provider_async()
+    key = (provider.name, provider.model, provider.dimensions, query)
+
+    async def compute() -> list[float]:
+        text = _sanitize_texts([query])[0]
+        if provider.embed_query is not None and len(text) <= max_input_chars(provider.name, provider.model):
+            return await provider.embed_query(text)
+        return (await embed_texts([query]))[0]
+
+    vector = await get_query_cache().get_or_compute(key, compute)
+    if dimensions and dimensions < len(vector):
+        return _truncate([vector], dimensions)[0]
+    return vector
@@ -0,0 +1,142 @@
+"""Circuit breakers for embedding providers.
+
+Each provider endpoint (e.g. ``ollama`` or ``ollama@http://box2:11434``)
+has a breaker. After CATCOT_BREAKER_FAILURES consecutive failures
+(connection errors, timeouts, 5xx; default 3) it opens: calls fail at once
+instead of waiting on a dead host, and embedding fails over to the
+configured fallback provider if there is one. After CATCOT_BREAKER_COOLDOWN
+seconds (default 30) a single probe request is let through; success closes
+the breaker, failure keeps it open for another cooldown.
+"""
+
+import os
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailableError(RuntimeError):
+    """The provider could not serve the request (down, timing out, or 5xx)."""
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    """The provider's breaker is open; the request was not attempted."""
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one provider endpoint (thread-safe)."""
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.last_error: str | None = None
+        self.last_failure_at: float | None = None
+        self.last_success_at: float | None = None
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.last_success_at = time.time()
+            self.state = CLOSED
+            self._probing = False
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error) or type(error).__name__
+            self.last_failure_at = time.time()
+            was_probe = self.state == HALF_OPEN
+            self._probing = False
+            if was_probe or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a claimed probe without a verdict (e.g. a 4xx or cancellation)."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "trips": self.trips,
+                "retry_in_seconds": round(retry_in, 1),
+                "last_error": self.last_error,
+                "last_failure_at": self.last_failure_at,
+                "last_success_at": self.last_success_at,
+            }
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Shared breaker for a provider endpoint."""
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                int(_env_number("CATCOT_BREAKER_FAILURES", 3)),
+                _env_number("CATCOT_BREAKER_COOLDOWN", 30.0),
+            )
+            _BREAKERS[name] = breaker
+        return breaker
+
+
+def breaker_stats() -> dict[str, dict]:
+    """State of every breaker created so far, keyed by endpoint."""
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {b.name: b.stats() for b in breakers}
@@ -0,0 +1,122 @@
+"""Least-outstanding-requests balancing over hosts serving the same model.
+
+Used for Ollama with several hosts (CATCOT_OLLAMA_HOSTS). Each request goes
+to the healthy host with the fewest requests in flight, ties broken by the
+lower moving-average latency. A host that fails (connection error, timeout,
+5xx) is taken out of rotation for CATCOT_OLLAMA_HOST_COOLDOWN seconds
+(default 10, doubling on repeated failures up to 8x); after that it gets
+one probe request at a time until a success brings it fully back.
+"""
+
+import os
+import threading
+import time
+
+_LATENCY_ALPHA = 0.3  # weight of the newest sample in the latency average
+_MAX_BACKOFF_FACTOR = 8
+
+
+class Host:
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency: float | None = None  # exponential moving average, seconds
+        self.down_until = 0.0
+        self.last_error: str | None = None
+
+    def available(self, now: float) -> bool:
+        if now < self.down_until:
+            return False
+        # A recovering host takes one probe at a time
+        return self.consecutive_failures == 0 or self.outstanding == 0
+
+    def stats(self, now: float) -> dict:
+        if self.consecutive_failures == 0:
+            state = "healthy"
+        elif now < self.down_until:
+            state = "down"
+        else:
+            state = "probing"
+        return {
+            "url": self.url,
+            "state": state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "retry_in_seconds": round(max(0.0, self.down_until - now), 1),
+            "last_error": self.last_error,
+        }
+
+
+class HostPool:
+    """Thread-safe host selection and health tracking for one host list."""
+
+    def __init__(self, urls: tuple[str, ...], cooldown: float):
+        self.hosts = [Host(url) for url in urls]
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude: set[str] = frozenset()) -> Host | None:
+        """Claim the best available host, or None if every host is down/excluded."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                h for h in self.hosts if h.url not in exclude and h.available(now)
+            ]
+            if not candidates:
+                return None
+            host = min(candidates, key=lambda h: (h.outstanding, h.latency or 0.0))
+            host.outstanding += 1
+            return host
+
+    def release(self, host: Host, seconds: float | None = None, error: Exception | None = None) -> None:
+        """Return a claimed host with the request's outcome.
+
+        ``seconds`` records a success; ``error`` takes the host out of
+        rotation. With neither (e.g. cancellation or a request-level error)
+        the host's health is left unchanged.
+        """
+        with self._lock:
+            host.outstanding -= 1
+            if error is not None:
+                host.requests += 1
+                host.failures += 1
+                host.consecutive_failures += 1
+                host.last_error = str(error) or type(error).__name__
+                factor = min(2 ** (host.consecutive_failures - 1), _MAX_BACKOFF_FACTOR)
+                host.down_until = time.monotonic() + self.cooldown * factor
+            elif seconds is not None:
+                host.requests += 1
+                host.consecutive_failures = 0
+                host.down_until = 0.0
+                if host.latency is None:
+                    host.latency = seconds
+                else:
+                    host.latency += _LATENCY_ALPHA * (seconds - host.latency)
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            now = time.monotonic()
+            return [h.stats(now) for h in self.hosts]
+
+
+_POOLS: dict[tuple[str, ...], HostPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_host_pool(urls: tuple[str, ...]) -> HostPool:
+    """Shared pool for a host list (health is tracked across all callers)."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(urls)
+        if pool is None:
+            try:
+                cooldown = float(os.environ.get("CATCOT_OLLAMA_HOST_COOLDOWN", 10.0))
+            except ValueError:
+                cooldown = 10.0
+            pool = HostPool(urls, cooldown if cooldown > 0 else 10.0)
+            _POOLS[urls] = pool
+        return pool
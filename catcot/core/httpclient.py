@@ -0,0 +1,120 @@
+"""Shared HTTP client for embedding providers and the code reviewer.
+
+One pooled ``httpx.AsyncClient`` per event loop (the watcher runs its own
+short-lived loops, and pooled connections cannot cross loops), so TLS
+handshakes and TCP setup stay off the hot path. Tuned with:
+
+- CATCOT_HTTP_MAX_CONNECTIONS (default 100) and CATCOT_HTTP_MAX_PER_HOST
+  (default 16): total and per-host concurrent connections.
+- CATCOT_HTTP_MAX_KEEPALIVE (default 32) and CATCOT_HTTP_KEEPALIVE_EXPIRY
+  (seconds, default 60): idle connections kept for reuse.
+- CATCOT_HTTP_CONNECT_TIMEOUT (default 5) and CATCOT_HTTP_READ_TIMEOUT
+  (default 120): a dead host fails in seconds while slow embedding
+  requests still get time to finish.
+- CATCOT_HTTP2=1: multiplex concurrent requests to HTTPS APIs over one
+  connection (needs ``pip install 'catcot[http2]'``).
+"""
+
+import asyncio
+import importlib.util
+import os
+import sys
+import weakref
+
+import httpx
+
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_HTTP2_WARNED = False
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def client_timeout(read: float | None = None) -> httpx.Timeout:
+    """Split connect/read/write/pool timeouts; ``read`` overrides the read timeout."""
+    return httpx.Timeout(
+        connect=_env_float("CATCOT_HTTP_CONNECT_TIMEOUT", 5.0),
+        read=read or _env_float("CATCOT_HTTP_READ_TIMEOUT", 120.0),
+        write=30.0,
+        pool=_env_float("CATCOT_HTTP_READ_TIMEOUT", 120.0),
+    )
+
+
+def _http2_enabled() -> bool:
+    global _HTTP2_WARNED
+    if os.environ.get("CATCOT_HTTP2", "").strip().lower() not in ("1", "true", "yes", "on"):
+        return False
+    if importlib.util.find_spec("h2") is None:
+        if not _HTTP2_WARNED:
+            _HTTP2_WARNED = True
+            sys.stderr.write(
+                "[Catcot] Warning: CATCOT_HTTP2 needs the h2 package "
+                "(pip install 'catcot[http2]'); using HTTP/1.1\n"
+            )
+        return False
+    return True
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """Caps concurrent requests per host on top of the pool-wide limits.
+
+    Responses are read in full before the slot is released (nothing here
+    streams), so the cap counts busy connections.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host: int):
+        self._transport = transport
+        self._per_host = per_host
+        self._semaphores: dict[tuple[bytes, bytes, int | None], asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        key = (url.raw_scheme, url.raw_host, url.port)
+        sem = self._semaphores.get(key)
+        if sem is None:
+            sem = self._semaphores[key] = asyncio.Semaphore(self._per_host)
+        async with sem:
+            response = await self._transport.handle_async_request(request)
+            # Hold the slot until the body is read, i.e. while the connection is busy
+            await response.aread()
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(_env_float("CATCOT_HTTP_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(_env_float("CATCOT_HTTP_MAX_KEEPALIVE", 32)),
+        keepalive_expiry=_env_float("CATCOT_HTTP_KEEPALIVE_EXPIRY", 60.0),
+    )
+    transport = httpx.AsyncHTTPTransport(limits=limits, http2=_http2_enabled())
+    return httpx.AsyncClient(
+        transport=_HostLimitedTransport(transport, int(_env_float("CATCOT_HTTP_MAX_PER_HOST", 16))),
+        timeout=client_timeout(),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared client for the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _CLIENTS[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the running loop's client and its pooled connections."""
+    client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
@@ -0,0 +1,297 @@
+"""Gitignore-compatible ignore engine.
+
+One compiled, cached matcher per project, shared by the indexer, the watcher
+and the savings estimator. Supports the gitignore rules that matter in
+practice: negation (``!``), anchoring (leading or inner ``/``), directory-only
+patterns (trailing ``/``), ``*``/``?``/``[...]`` globs and ``**``, nested
+``.gitignore`` files, ``.gitignore`` files between the git root and the
+project, and ``.git/info/exclude``. Built-in IGNORE_DIRS / IGNORE_EXTENSIONS
+always apply on top and cannot be negated.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+# Default ignore patterns
+IGNORE_DIRS = {
+    ".git", ".idea", ".vscode", "node_modules", "__pycache__",
+    ".gradle", "build", "dist", "target", ".next", "venv", ".venv",
+    ".mypy_cache", ".pytest_cache", ".tox", "vendor",
+}
+
+IGNORE_EXTENSIONS = {
+    ".pyc", ".class", ".jar", ".war", ".o", ".so", ".dylib",
+    ".exe", ".dll", ".png", ".jpg", ".jpeg", ".gif", ".svg",
+    ".ico", ".woff", ".woff2", ".ttf", ".eot", ".mp3", ".mp4",
+    ".zip", ".tar", ".gz", ".lock", ".min.js", ".min.css",
+}
+
+
+@dataclass
+class _Rule:
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob (already stripped of anchors) to a regex body."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                before_ok = i == 0 or pattern[i - 1] == "/"
+                after = pattern[i + 2:i + 3]
+                if before_ok and after == "/":
+                    out.append("(?:.*/)?")   # "**/" — zero or more directories
+                    i += 3
+                    continue
+                if before_ok and i + 2 == n:
+                    out.append(".*")         # trailing "/**" — everything inside
+                    i += 2
+                    continue
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("!", "^") else i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def _compile_line(line: str, base: str) -> _Rule | None:
+    """Compile one .gitignore line declared in directory ``base`` ("" = git root)."""
+    if not line.strip() or line.startswith("#"):
+        return None
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip()
+    if stripped.endswith("\\") and line[len(stripped):len(stripped) + 1] == " ":
+        stripped += " "
+    line = stripped
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    anchored = "/" in line
+    line = line.lstrip("/")
+    body = _glob_to_regex(line)
+    prefix = re.escape(base + "/") if base else ""
+    if anchored:
+        regex = f"^{prefix}{body}$"
+    else:
+        regex = f"^{prefix}(?:.*/)?{body}$"
+    return _Rule(re.compile(regex, re.DOTALL), negate, dir_only)
+
+
+def _parse_file(path: str, base: str) -> list[_Rule]:
+    try:
+        with open(path, "r", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        rule = _compile_line(line, base)
+        if rule is not None:
+            rules.append(rule)
+    return rules
+
+
+def _find_git_dir(start: str) -> tuple[str | None, str | None]:
+    """Return (work tree root, git dir) for the repo containing ``start``."""
+    cur = os.path.abspath(start)
+    while True:
+        dot_git = os.path.join(cur, ".git")
+        if os.path.isdir(dot_git):
+            return cur, dot_git
+        if os.path.isfile(dot_git):
+            # Worktree / submodule: ".git" is a file pointing at the real git dir
+            try:
+                with open(dot_git, "r") as f:
+                    content = f.read().strip()
+            except OSError:
+                return cur, None
+            if content.startswith("gitdir:"):
+                gitdir = os.path.join(cur, content[len("gitdir:"):].strip())
+                common = os.path.join(gitdir, "commondir")
+                if os.path.isfile(common):
+                    with open(common, "r") as f:
+                        gitdir = os.path.join(gitdir, f.read().strip())
+                return cur, os.path.normpath(gitdir)
+            return cur, None
+        parent = os.path.dirname(cur)
+        if parent == cur:
+            return None, None
+        cur = parent
+
+
+class IgnoreMatcher:
+    """Compiled ignore rules for one project.
+
+    Paths passed in are relative to the project root using "/" separators.
+    Per-directory rule sets are cached and recompiled when the
+    corresponding .gitignore changes (by mtime).
+    """
+
+    def __init__(self, project_path: str):
+        self.root = os.path.abspath(project_path)
+        git_root, git_dir = _find_git_dir(self.root)
+        self.git_root = git_root or self.root
+        rel = os.path.relpath(self.root, self.git_root)
+        self.prefix = "" if rel == "." else rel.replace(os.sep, "/")
+        self._exclude_file = os.path.join(git_dir, "info", "exclude") if git_dir else None
+        self._cache: dict[str, tuple[int | None, list[_Rule]]] = {}
+        self._lock = threading.Lock()
+
+    # ── rule loading ────────────────────────────────────────────────
+
+    def _rules_from(self, path: str, base: str) -> list[_Rule]:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        rules = _parse_file(path, base) if mtime is not None else []
+        with self._lock:
+            self._cache[path] = (mtime, rules)
+        return rules
+
+    def _dir_rules(self, git_rel_dir: str) -> list[_Rule]:
+        """Rules declared by the .gitignore in one directory (git-root-relative)."""
+        path = os.path.join(self.git_root, git_rel_dir, ".gitignore") if git_rel_dir \
+            else os.path.join(self.git_root, ".gitignore")
+        return self._rules_from(path, git_rel_dir)
+
+    def _rules_for(self, git_rel_dir: str) -> list[_Rule]:
+        """All rules that apply inside ``git_rel_dir``, lowest precedence first."""
+        rules: list[_Rule] = []
+        if self._exclude_file:
+            rules.extend(self._rules_from(self._exclude_file, ""))
+        rules.extend(self._dir_rules(""))
+        if git_rel_dir:
+            parts = git_rel_dir.split("/")
+            for i in range(1, len(parts) + 1):
+                rules.extend(self._dir_rules("/".join(parts[:i])))
+        return rules
+
+    # ── matching ────────────────────────────────────────────────────
+
+    def _git_rel(self, rel_path: str) -> str:
+        return f"{self.prefix}/{rel_path}" if self.prefix else rel_path
+
+    @staticmethod
+    def _builtin(name: str, is_dir: bool) -> bool:
+        if is_dir:
+            return name in IGNORE_DIRS
+        return os.path.splitext(name)[1] in IGNORE_EXTENSIONS or name.endswith((".min.js", ".min.css"))
+
+    def _match(self, rel_path: str, is_dir: bool, rules: list[_Rule]) -> bool:
+        """Check one path against rules only (ancestors assumed not ignored)."""
+        if self._builtin(rel_path.rsplit("/", 1)[-1], is_dir):
+            return True
+        git_rel = self._git_rel(rel_path)
+        ignored = False
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(git_rel):
+                ignored = not rule.negate
+        return ignored
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Full check of a project-relative path, including every ancestor directory."""
+        rel_path = rel_path.replace(os.sep, "/").strip("/")
+        if not rel_path or rel_path == ".":
+            return False
+        parts = rel_path.split("/")
+        for i in range(1, len(parts)):
+            parent = "/".join(parts[:i - 1])
+            rules = self._rules_for(self._git_rel(parent) if parent else self.prefix)
+            if self._match("/".join(parts[:i]), True, rules):
+                return True
+        parent = "/".join(parts[:-1])
+        rules = self._rules_for(self._git_rel(parent) if parent else self.prefix)
+        return self._match(rel_path, is_dir, rules)
+
+    def walk(self) -> Iterator[tuple[str, list[str]]]:
+        """os.walk the project, pruning ignored directories before descending.
+
+        Yields (project-relative dir, non-ignored file names).
+        """
+        # Rules accumulate top-down, so each .gitignore is stat'ed once per walk
+        rules_by_dir: dict[str, list[_Rule]] = {}
+        for root, dirs, files in os.walk(self.root):
+            rel_dir = os.path.relpath(root, self.root)
+            rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+            if rel_dir:
+                parent = rel_dir.rsplit("/", 1)[0] if "/" in rel_dir else ""
+                rules = rules_by_dir.get(parent)
+                if rules is None:
+                    rules = self._rules_for(self._git_rel(parent) if parent else self.prefix)
+                rules = rules + self._dir_rules(self._git_rel(rel_dir))
+            else:
+                rules = self._rules_for(self.prefix)
+            join = (lambda n: f"{rel_dir}/{n}") if rel_dir else (lambda n: n)
+            dirs[:] = [d for d in dirs if not self._match(join(d), True, rules)]
+            if dirs:
+                rules_by_dir[rel_dir] = rules
+            yield rel_dir, [f for f in files if not self._match(join(f), False, rules)]
+
+
+_MATCHERS: dict[str, IgnoreMatcher] = {}
+_MATCHERS_LOCK = threading.Lock()
+
+
+def get_ignore_matcher(project_path: str) -> IgnoreMatcher:
+    """Cached matcher for a project (rules recompile when ignore files change)."""
+    project_path = os.path.abspath(os.path.expanduser(project_path))
+    with _MATCHERS_LOCK:
+        matcher = _MATCHERS.get(project_path)
+        if matcher is None:
+            matcher = IgnoreMatcher(project_path)
+            _MATCHERS[project_path] = matcher
+        return matcher
+
+
+def is_ignored_path(project_path: str, file_path: str | Path) -> bool:
+    """Convenience: is an absolute path inside project_path ignored?"""
+    try:
+        rel = os.path.relpath(os.path.abspath(file_path), os.path.abspath(project_path))
+    except ValueError:
+        return True
+    if rel.startswith(".."):
+        return True
+    return get_ignore_matcher(project_path).is_ignored(rel)
@@ -1,89 +1,679 @@
 """Indexes project files: reads, chunks, embeds, stores in ChromaDB."""
 
+import asyncio
 import hashlib
 import os
+import stat
+import sys
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
 
 from catcot.chunkers import Chunk, get_chunker
 from catcot.config import CHROMA_DIR, collection_name, get_chroma_client
-from catcot.core.embedder import embed_texts, get_provider_info
-
-# Default ignore patterns
-IGNORE_DIRS = {
-    ".git", ".idea", ".vscode", "node_modules", "__pycache__",
-    ".gradle", "build", "dist", "target", ".next", "venv", ".venv",
-    ".mypy_cache", ".pytest_cache", ".tox", "vendor",
-}
-
-IGNORE_EXTENSIONS = {
-    ".pyc", ".class", ".jar", ".war", ".o", ".so", ".dylib",
-    ".exe", ".dll", ".png", ".jpg", ".jpeg", ".gif", ".svg",
-    ".ico", ".woff", ".woff2", ".ttf", ".eot", ".mp3", ".mp4",
-    ".zip", ".tar", ".gz", ".lock", ".min.js", ".min.css",
-}
+from catcot.core.batching import estimate_tokens, get_batch_sizer
+from catcot.core.embedder import (
+    collection_dimensions,
+    embed_texts,
+    get_provider_info,
+    ollama_hosts,
+    resolve_dimensions,
+    resolve_provider_info,
+)
+from catcot.core.ratelimit import get_rate_limiter
+from catcot.core.registry import invalidate_collection, list_collection_entries
+from catcot.core.ignore import IgnoreMatcher, get_ignore_matcher
+from catcot.core.lexical import drop_lexical_index, get_lexical_index
+from catcot.core.manifest import Manifest, get_manifest
+from catcot.features.git_tools import GitChanges, get_changes_since, get_head_commit
 
 MAX_FILE_SIZE = 500_000  # 500KB
+MANIFEST_SAVE_INTERVAL = 5.0  # seconds between manifest checkpoints while indexing
+LEXICAL_BACKFILL_PAGE = 2000  # chunks read from Chroma per page when building a lexical index
 
 
-def _file_hash(content: str) -> str:
-    return hashlib.sha256(content.encode()).hexdigest()[:16]
+def _file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
 
 
-def _should_ignore(path: Path) -> bool:
-    for part in path.parts:
-        if part in IGNORE_DIRS:
-            return True
-    if path.suffix in IGNORE_EXTENSIONS:
-        return True
-    return False
+def _decode(data: bytes) -> str:
+    """Decode file bytes the way Path.read_text(errors="ignore") would."""
+    text = data.decode("utf-8", errors="ignore")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
 
 
-def _load_gitignore(project_path: Path) -> list[str]:
-    """Load .gitignore patterns (basic support)."""
-    gitignore = project_path / ".gitignore"
-    if not gitignore.exists():
-        return []
-    patterns = []
-    for line in gitignore.read_text(errors="ignore").splitlines():
-        line = line.strip()
-        if line and not line.startswith("#"):
-            patterns.append(line)
-    return patterns
+def _stat_if_indexable(fpath: Path) -> os.stat_result | None:
+    """Stat a non-ignored candidate file, or None if it is not a small regular file."""
+    try:
+        st = fpath.stat()
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode) or st.st_size > MAX_FILE_SIZE:
+        return None
+    return st
 
 
-def _matches_gitignore(rel_path: str, patterns: list[str]) -> bool:
-    """Basic gitignore matching."""
-    for pattern in patterns:
-        pattern = pattern.rstrip("/")
-        if pattern in rel_path or rel_path.endswith(pattern):
-            return True
-    return False
+def _collect_files(
+    project_path: Path, matcher: IgnoreMatcher,
+) -> list[tuple[Path, os.stat_result]]:
+    """Collect all indexable files (with their stat) from project.
 
-
-def _collect_files(project_path: Path, gitignore_patterns: list[str]) -> list[Path]:
-    """Collect all indexable files from project."""
+    Ignored directories are pruned before descending into them.
+    """
     files = []
-    for root, dirs, filenames in os.walk(project_path):
-        # Prune ignored directories in-place
-        dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
+    for rel_dir, filenames in matcher.walk():
+        base = project_path / rel_dir if rel_dir else project_path
         for fname in filenames:
-            fpath = Path(root) / fname
-            if _should_ignore(fpath):
+            fpath = base / fname
+            st = _stat_if_indexable(fpath)
+            if st is not None:
+                files.append((fpath, st))
+    return files
+
+
+def _collect_git_changes(
+    project_path: Path, changes: GitChanges, matcher: IgnoreMatcher,
+) -> list[tuple[Path, os.stat_result]]:
+    """Indexable files among the paths git reports as changed."""
+    files = []
+    for rel in dict.fromkeys(changes.changed):
+        if matcher.is_ignored(rel):
+            continue
+        fpath = project_path / rel
+        st = _stat_if_indexable(fpath)
+        if st is not None:
+            files.append((fpath, st))
+    return files
+
+
+def _find_vanished(
+    project_path: Path,
+    manifest: Manifest,
+    files: list[tuple[Path, os.stat_result]],
+    git_changes: GitChanges | None,
+) -> list[str]:
+    """Indexed files that are no longer on disk (or are now ignored/too large).
+
+    In git mode nothing is stat'ed: a file is gone if git reports it
+    deleted, no longer lists it (an untracked file deleted since the last
+    run, a file ignored since), or reports it changed but it is no longer
+    indexable.
+    """
+    on_disk = {str(fpath.relative_to(project_path)) for fpath, _ in files}
+    if git_changes is not None:
+        changed = set(git_changes.changed)
+        deleted = set(git_changes.deleted)
+        return [
+            p for p in list(manifest.files)
+            if p not in git_changes.present
+            or (p in changed and p not in on_disk)
+            or (p in deleted and p not in changed)
+        ]
+    return [p for p in list(manifest.files) if p not in on_disk]
+
+
+def _detect_renames(
+    project_path: Path,
+    manifest: Manifest,
+    changed: list[tuple[Path, os.stat_result]],
+    vanished: list[str],
+) -> list[tuple[str, Path, os.stat_result, str]]:
+    """Pair new files with vanished ones that had identical bytes.
+
+    Returns (old rel path, new path, new stat, hash). Only same-extension
+    pairs count, since the chunker — and so the chunks — depend on it.
+    """
+    by_hash: dict[tuple[str, str], list[str]] = {}
+    for old in vanished:
+        by_hash.setdefault((manifest.get_hash(old), Path(old).suffix), []).append(old)
+
+    renames = []
+    for fpath, st in changed:
+        rel = str(fpath.relative_to(project_path))
+        if manifest.get_hash(rel) is not None:
+            continue
+        try:
+            fhash = _file_hash(fpath.read_bytes())
+        except OSError:
+            continue
+        candidates = by_hash.get((fhash, fpath.suffix))
+        if candidates:
+            renames.append((candidates.pop(), fpath, st, fhash))
+    return renames
+
+
+def _apply_renames(
+    collection,
+    project_root: Path,
+    project_path: str,
+    manifest: Manifest,
+    renames: list[tuple[str, Path, os.stat_result, str]],
+) -> int:
+    """Move chunks of renamed files to their new path, reusing stored embeddings."""
+    moved = 0
+    for old_rel, fpath, st, fhash in renames:
+        new_rel = str(fpath.relative_to(project_root))
+        old = collection.get(
+            where={"file_path": old_rel},
+            include=["documents", "metadatas", "embeddings"],
+        )
+        if not old["ids"]:
+            continue
+        rows = sorted(
+            zip(old["ids"], old["documents"], old["metadatas"], old["embeddings"]),
+            key=lambda r: (r[2].get("start_line", 0), r[2].get("end_line", 0)),
+        )
+        chunks = [
+            Chunk(
+                content=doc,
+                file_path=new_rel,
+                start_line=meta.get("start_line", 0),
+                end_line=meta.get("end_line", 0),
+                symbol_name=meta.get("symbol_name") or None,
+                language=meta.get("language") or None,
+            )
+            for _, doc, meta, _ in rows
+        ]
+        collection.upsert(
+            ids=_chunk_ids(new_rel, chunks),
+            documents=[c.content for c in chunks],
+            metadatas=[_chunk_meta(c, fhash, project_path) for c in chunks],
+            embeddings=[list(r[3]) for r in rows],
+        )
+        collection.delete(ids=[r[0] for r in rows])
+        lexical = get_lexical_index(collection.name)
+        lexical.upsert(
+            _chunk_ids(new_rel, chunks),
+            [c.content for c in chunks],
+            [_chunk_meta(c, fhash, project_path) for c in chunks],
+        )
+        lexical.delete([r[0] for r in rows])
+        manifest.remove(old_rel)
+        manifest.record(new_rel, st, fhash)
+        moved += 1
+    return moved
+
+
+def _purge_paths(collection, manifest: Manifest, rel_paths: list[str]) -> int:
+    """Delete every chunk of the given files in one bulk call. Returns files purged."""
+    if not rel_paths:
+        return 0
+    # Chunked only to stay under SQLite's bound-parameter limit
+    for i in range(0, len(rel_paths), 5000):
+        collection.delete(where={"file_path": {"$in": rel_paths[i:i + 5000]}})
+    get_lexical_index(collection.name).delete_files(rel_paths)
+    for p in rel_paths:
+        manifest.remove(p)
+    return len(rel_paths)
+
+
+def _backfill_lexical(collection) -> None:
+    """Build a collection's lexical index from its stored chunks."""
+    try:
+        offset = 0
+        while True:
+            page = collection.get(
+                limit=LEXICAL_BACKFILL_PAGE, offset=offset, include=["documents", "metadatas"],
+            )
+            if not page["ids"]:
+                break
+            get_lexical_index(collection.name).upsert(
+                page["ids"], page["documents"], page["metadatas"],
+            )
+            offset += len(page["ids"])
+    except Exception:
+        # A partial index would look complete to the next run
+        drop_lexical_index(collection.name)
+        raise
+
+
+# ── Pipeline settings ────────────────────────────────────────────────
+
+@dataclass
+class PipelineConfig:
+    """Degree of parallelism and queue depth for each indexing stage.
+
+    Defaults can be overridden with CATCOT_INDEX_* environment variables.
+    """
+    read_workers: int = 4        # concurrent read+chunk workers
+    embed_concurrency: int = 4   # embedding requests in flight (per host for Ollama)
+    batch_size: int | None = None  # fixed chunks per request; None = adaptive per provider
+    queue_depth: int = 8         # max batches buffered between stages
+
+    @classmethod
+    def from_env(cls, provider: str | None = None) -> "PipelineConfig":
+        def _int(name: str, default: int) -> int:
+            try:
+                return max(1, int(os.environ.get(name, default)))
+            except ValueError:
+                return default
+
+        fixed_batch = os.environ.get("CATCOT_INDEX_BATCH_SIZE", "").strip()
+        # Keep every Ollama host busy: throughput scales with the host count
+        hosts = len(ollama_hosts()) if provider == "ollama" else 1
+        return cls(
+            read_workers=_int("CATCOT_INDEX_READ_WORKERS", min(8, os.cpu_count() or 4)),
+            embed_concurrency=_int("CATCOT_INDEX_EMBED_CONCURRENCY", 4 * hosts),
+            batch_size=_int("CATCOT_INDEX_BATCH_SIZE", 20) if fixed_batch else None,
+            queue_depth=_int("CATCOT_INDEX_QUEUE_DEPTH", 8),
+        )
+
+
+@dataclass
+class _FilePlan:
+    """Chunk-level diff between the indexed and the current version of a file.
+
+    Only ``add_*`` chunks need embedding; chunks whose content is unchanged
+    keep their vectors and at most get a metadata update (e.g. moved lines).
+    """
+    rel_path: str
+    file_hash: str
+    stat: os.stat_result | None = None
+    chunk_count: int = 0
+    add_ids: list[str] = field(default_factory=list)
+    add_docs: list[str] = field(default_factory=list)
+    add_metas: list[dict] = field(default_factory=list)
+    update_ids: list[str] = field(default_factory=list)
+    update_metas: list[dict] = field(default_factory=list)
+    delete_ids: list[str] = field(default_factory=list)
+
+    @property
+    def is_noop(self) -> bool:
+        return not (self.add_ids or self.update_ids or self.delete_ids)
+
+
+@dataclass
+class _Batch:
+    """A unit of work flowing from the batcher to the writer."""
+    ids: list[str] = field(default_factory=list)
+    docs: list[str] = field(default_factory=list)
+    metas: list[dict] = field(default_factory=list)
+    update_ids: list[str] = field(default_factory=list)
+    update_metas: list[dict] = field(default_factory=list)
+    delete_ids: list[str] = field(default_factory=list)
+    files: list[str] = field(default_factory=list)  # rel paths with work in this batch
+    tokens: int = 0  # estimated tokens in docs
+    embeddings: list[list[float]] | None = None
+
+
+_DONE = object()  # queue sentinel
+
+
+def _chunk_ids(rel_path: str, chunks: list[Chunk]) -> list[str]:
+    """Content-derived, stable chunk IDs.
+
+    ``<md5(path)[:8]>_<sha256(content)[:16]>`` — a chunk keeps its ID when
+    other parts of the file change or when it merely moves. Identical chunks
+    within one file are disambiguated with an occurrence suffix.
+    """
+    prefix = hashlib.md5(rel_path.encode()).hexdigest()[:8]
+    seen: dict[str, int] = {}
+    ids = []
+    for chunk in chunks:
+        h = hashlib.sha256(chunk.content.encode()).hexdigest()[:16]
+        n = seen.get(h, 0)
+        seen[h] = n + 1
+        ids.append(f"{prefix}_{h}" if n == 0 else f"{prefix}_{h}_{n}")
+    return ids
+
+
+def _chunk_meta(chunk: Chunk, file_hash: str, project_path: str) -> dict:
+    return {
+        "file_path": chunk.file_path,
+        "start_line": chunk.start_line,
+        "end_line": chunk.end_line,
+        "language": chunk.language or "",
+        "symbol_name": chunk.symbol_name or "",
+        "file_hash": file_hash,
+        "project_path": project_path,
+    }
+
+
+def _plan_file(
+    collection,
+    project_path: str,
+    rel_path: str,
+    file_hash: str,
+    chunks: list[Chunk],
+    indexed_before: bool = True,
+) -> _FilePlan:
+    """Diff a file's new chunks against what the collection holds for it."""
+    old: dict[str, dict] = {}
+    if indexed_before:
+        existing = collection.get(where={"file_path": rel_path}, include=["metadatas"])
+        for cid, meta in zip(existing["ids"], existing["metadatas"] or []):
+            old[cid] = meta or {}
+
+    plan = _FilePlan(rel_path=rel_path, file_hash=file_hash, chunk_count=len(chunks))
+    new_ids = _chunk_ids(rel_path, chunks)
+    for cid, chunk in zip(new_ids, chunks):
+        meta = _chunk_meta(chunk, file_hash, project_path)
+        if cid not in old:
+            plan.add_ids.append(cid)
+            plan.add_docs.append(chunk.content)
+            plan.add_metas.append(meta)
+        elif old[cid] != meta:
+            plan.update_ids.append(cid)
+            plan.update_metas.append(meta)
+    keep = set(new_ids)
+    plan.delete_ids = [cid for cid in old if cid not in keep]
+    return plan
+
+
+async def _apply_plan(collection, plan: _FilePlan) -> None:
+    """Embed and write a single file's plan (used outside the pipeline)."""
+    lexical = get_lexical_index(collection.name)
+    if plan.add_docs:
+        embeddings = await embed_texts(plan.add_docs, collection_dimensions(collection.metadata))
+        collection.upsert(
+            ids=plan.add_ids,
+            documents=plan.add_docs,
+            metadatas=plan.add_metas,
+            embeddings=embeddings,
+        )
+        lexical.upsert(plan.add_ids, plan.add_docs, plan.add_metas)
+    if plan.update_ids:
+        collection.update(ids=plan.update_ids, metadatas=plan.update_metas)
+        lexical.update(plan.update_ids, plan.update_metas)
+    if plan.delete_ids:
+        collection.delete(ids=plan.delete_ids)
+        lexical.delete(plan.delete_ids)
+    invalidate_collection(collection.name)
+
+
+def _read_and_plan(
+    fpath: Path,
+    st: os.stat_result,
+    project_root: Path,
+    project_path: str,
+    collection,
+    manifest: Manifest,
+    assume_indexed: bool,
+) -> _FilePlan | None:
+    """Read, hash, chunk and diff one file whose stat changed.
+
+    Returns None if the file is unreadable or cannot be chunked. If the
+    bytes hash to what the manifest already records (e.g. a touch), returns
+    an empty plan.
+    """
+    try:
+        data = fpath.read_bytes()
+    except Exception:
+        return None
+
+    fhash = _file_hash(data)
+    rel_path = str(fpath.relative_to(project_root))
+    known_hash = manifest.get_hash(rel_path)
+    if known_hash == fhash:
+        return _FilePlan(rel_path=rel_path, file_hash=fhash, stat=st)
+
+    try:
+        content = _decode(data)
+        chunks = get_chunker(fpath.suffix).chunk(content, rel_path)
+    except Exception as e:
+        # One bad file (parser crash, odd encoding) must not fail the run
+        sys.stderr.write(f"[Catcot] Skipping {rel_path}: could not chunk it ({e!r})\n")
+        return None
+    plan = _plan_file(
+        collection, project_path, rel_path, fhash, chunks,
+        indexed_before=assume_indexed or known_hash is not None,
+    )
+    plan.stat = st
+    return plan
+
+
+def _filter_unchanged(
+    files: list[tuple[Path, os.stat_result]],
+    project_root: Path,
+    manifest: Manifest,
+) -> list[tuple[Path, os.stat_result]]:
+    """Drop files whose size/mtime/inode match the manifest — they are never opened."""
+    return [
+        (fpath, st) for fpath, st in files
+        if not manifest.is_unchanged(str(fpath.relative_to(project_root)), st)
+    ]
+
+
+async def _run_stages(tasks: list[asyncio.Task]) -> None:
+    """Wait for all pipeline tasks; on the first failure cancel the rest and re-raise."""
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except asyncio.CancelledError:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    for t in done:
+        if not t.cancelled() and t.exception() is not None:
+            for p in pending:
+                p.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise t.exception()
+
+
+async def _run_pipeline(
+    files: list[tuple[Path, os.stat_result]],
+    project_root: Path,
+    project_path: str,
+    collection,
+    manifest: Manifest,
+    assume_indexed: bool,
+    config: PipelineConfig,
+    stats: dict,
+    progress: Callable[[dict], None] | None = None,
+    dimensions: int | None = None,
+) -> None:
+    """Run the staged indexing pipeline.
+
+    discovery → N read+chunk workers → batcher → M embed workers → 1 writer
+
+    Every hand-off is a bounded queue, so a slow stage applies backpressure
+    upstream and memory stays proportional to the queue depths rather than
+    to the size of the repository.
+
+    A file is recorded in the manifest only once every batch carrying its
+    chunks has been written, so an interrupted run never marks a
+    half-written file as indexed. ``progress`` is called with the live
+    stats dict after every written batch.
+    """
+    path_q: asyncio.Queue = asyncio.Queue(maxsize=config.read_workers * 4)
+    file_q: asyncio.Queue = asyncio.Queue(maxsize=config.queue_depth)
+    embed_q: asyncio.Queue = asyncio.Queue(maxsize=config.queue_depth)
+    write_q: asyncio.Queue = asyncio.Queue(maxsize=config.queue_depth)
+
+    # rel_path -> number of in-flight batches still carrying work for it
+    outstanding: dict[str, int] = {}
+    completed: dict[str, _FilePlan] = {}
+
+    def track(batch: _Batch, plan: _FilePlan) -> None:
+        if plan.rel_path not in batch.files:
+            batch.files.append(plan.rel_path)
+            outstanding[plan.rel_path] = outstanding.get(plan.rel_path, 0) + 1
+            completed[plan.rel_path] = plan
+
+    async def discover() -> None:
+        for item in files:
+            await path_q.put(item)
+        for _ in range(config.read_workers):
+            await path_q.put(_DONE)
+
+    async def read_worker() -> None:
+        while True:
+            item = await path_q.get()
+            if item is _DONE:
+                await file_q.put(_DONE)
+                return
+            fpath, st = item
+            plan = await asyncio.to_thread(
+                _read_and_plan, fpath, st, project_root, project_path,
+                collection, manifest, assume_indexed,
+            )
+            if plan is None:
+                stats["files_skipped"] += 1
+                stats["files_done"] += 1
                 continue
-            rel = str(fpath.relative_to(project_path))
-            if _matches_gitignore(rel, gitignore_patterns):
+            if plan.is_noop:
+                manifest.record(plan.rel_path, st, plan.file_hash)
+                stats["files_done"] += 1
+                if plan.chunk_count == 0:
+                    stats["files_skipped"] += 1
+                    continue
+            stats["files_indexed"] += 1
+            stats["chunks_created"] += plan.chunk_count
+            stats["chunks_embedded"] += len(plan.add_ids)
+            stats["chunks_deleted"] += len(plan.delete_ids)
+            await file_q.put(plan)
+
+    # Batches close on an estimated token budget and a per-provider item cap,
+    # both adapted from observed latency and errors (see core/batching.py).
+    provider_name = get_provider_info()["name"]
+    sizer = None if config.batch_size else get_batch_sizer(provider_name)
+    # Throttling is tracked provider-wide; report what happened during this run
+    limiter = get_rate_limiter(provider_name)
+    limiter_base = limiter.stats()
+
+    def is_full(batch: _Batch, tokens: int) -> bool:
+        if not batch.docs:
+            return False
+        if sizer is None:
+            return len(batch.docs) >= config.batch_size
+        return len(batch.docs) >= sizer.max_items or batch.tokens + tokens > sizer.budget
+
+    async def batcher() -> None:
+        batch = _Batch()
+        finished_readers = 0
+        while finished_readers < config.read_workers:
+            plan = await file_q.get()
+            if plan is _DONE:
+                finished_readers += 1
                 continue
-            if fpath.stat().st_size > MAX_FILE_SIZE:
+            if plan.is_noop:
                 continue
-            files.append(fpath)
-    return files
+            track(batch, plan)
+            batch.update_ids += plan.update_ids
+            batch.update_metas += plan.update_metas
+            batch.delete_ids += plan.delete_ids
+            for cid, doc, meta in zip(plan.add_ids, plan.add_docs, plan.add_metas):
+                tokens = estimate_tokens(doc)
+                if is_full(batch, tokens):
+                    await embed_q.put(batch)
+                    batch = _Batch()
+                track(batch, plan)
+                batch.ids.append(cid)
+                batch.docs.append(doc)
+                batch.metas.append(meta)
+                batch.tokens += tokens
+        if batch.docs or batch.update_ids or batch.delete_ids:
+            await embed_q.put(batch)
+        for _ in range(config.embed_concurrency):
+            await embed_q.put(_DONE)
+
+    async def embed_worker() -> None:
+        while True:
+            batch = await embed_q.get()
+            if batch is _DONE:
+                await write_q.put(_DONE)
+                return
+            if batch.docs:
+                batch.embeddings = await embed_texts(batch.docs, dimensions)
+            await write_q.put(batch)
+
+    lexical = get_lexical_index(collection.name)
+
+    def write_lexical(batch: _Batch) -> None:
+        lexical.upsert(batch.ids, batch.docs, batch.metas)
+        lexical.update(batch.update_ids, batch.update_metas)
+        lexical.delete(batch.delete_ids)
+
+    async def writer() -> None:
+        last_save = time.monotonic()
+        finished_embedders = 0
+        while finished_embedders < config.embed_concurrency:
+            batch = await write_q.get()
+            if batch is _DONE:
+                finished_embedders += 1
+                continue
+            if batch.docs:
+                await asyncio.to_thread(
+                    collection.upsert,
+                    ids=batch.ids,
+                    documents=batch.docs,
+                    metadatas=batch.metas,
+                    embeddings=batch.embeddings,
+                )
+            # IDs are content-derived, so metadata updates and deletions of
+            # vanished chunks are safe to apply in any batch order.
+            if batch.update_ids:
+                await asyncio.to_thread(
+                    collection.update, ids=batch.update_ids, metadatas=batch.update_metas,
+                )
+            if batch.delete_ids:
+                await asyncio.to_thread(collection.delete, ids=batch.delete_ids)
+            await asyncio.to_thread(write_lexical, batch)
+
+            for rel_path in batch.files:
+                outstanding[rel_path] -= 1
+                if outstanding[rel_path] == 0:
+                    del outstanding[rel_path]
+                    plan = completed.pop(rel_path)
+                    manifest.record(rel_path, plan.stat, plan.file_hash)
+                    stats["files_done"] += 1
+            stats["chunks_written"] += len(batch.ids)
+            stats["tokens_embedded"] += batch.tokens
+            invalidate_collection(collection.name)
+            limits = limiter.stats()
+            stats["throttle_wait_seconds"] = round(
+                limits["wait_seconds"] - limiter_base["wait_seconds"], 2,
+            )
+            stats["rate_limited_responses"] = (
+                limits["rate_limited_responses"] - limiter_base["rate_limited_responses"]
+            )
+            if progress is not None:
+                progress(stats)
+            if time.monotonic() - last_save >= MANIFEST_SAVE_INTERVAL:
+                await asyncio.to_thread(manifest.save)
+                last_save = time.monotonic()
+
+    tasks = [asyncio.create_task(discover())]
+    tasks += [asyncio.create_task(read_worker()) for _ in range(config.read_workers)]
+    tasks.append(asyncio.create_task(batcher()))
+    tasks += [asyncio.create_task(embed_worker()) for _ in range(config.embed_concurrency)]
+    tasks.append(asyncio.create_task(writer()))
+    await _run_stages(tasks)
+
+
+async def index_project(
+    project_path: str,
+    reindex: bool = False,
+    config: PipelineConfig | None = None,
+    mode: str = "auto",
+    progress: Callable[[dict], None] | None = None,
+    dimensions: int | None = None,
+) -> dict:
+    """Index a project directory.
 
+    mode:
+      - "walk": walk the whole tree, skipping files whose stat is unchanged.
+      - "git":  only process paths git reports as changed since the commit
+                recorded by the previous run (plus untracked files).
+      - "auto": "git" when the project is a git repo with a recorded commit,
+                otherwise "walk".
+    Git mode falls back to a walk when there is no usable recorded commit.
 
-async def index_project(project_path: str, reindex: bool = False) -> dict:
-    """Index a project directory.
+    A run that is cancelled or crashes keeps every file whose batches were
+    written; calling index_project again resumes from there. ``progress`` is
+    called with the live stats dict as batches are written.
+
+    ``dimensions`` reduces Matryoshka embeddings for a new (or re-indexed)
+    collection; it defaults to CATCOT_EMBED_DIMENSIONS, else full size. The
+    size is stored in the collection metadata and reused by later runs,
+    the watcher and search.
 
     Returns stats about the indexing operation.
     """
+    if mode not in ("auto", "walk", "git"):
+        raise ValueError(f"Unknown index mode: '{mode}'. Use 'auto', 'walk', or 'git'.")
     project_path = os.path.abspath(os.path.expanduser(project_path))
     path = Path(project_path)
     if not path.is_dir():
@@ -97,9 +687,13 @@ async def index_project(project_path: str, reindex: bool = False) -> dict:
             client.delete_collection(col_name)
         except Exception:
             pass
+        invalidate_collection(col_name)
+        drop_lexical_index(col_name)
 
     # Get current provider info
-    provider = get_provider_info()
+    provider = await resolve_provider_info()
+    config = config or PipelineConfig.from_env(provider["name"])
+    dims = resolve_dimensions(dimensions)
 
     collection = client.get_or_create_collection(
         name=col_name,
@@ -108,7 +702,7 @@ async def index_project(project_path: str, reindex: bool = False) -> dict:
             "hnsw:space": "cosine",
             "embedding_provider": provider["name"],
             "embedding_model": provider["model"],
-            "embedding_dimensions": provider["dimensions"],
+            "embedding_dimensions": dims,
         },
     )
 
@@ -128,114 +722,129 @@ async def index_project(project_path: str, reindex: bool = False) -> dict:
                 f"Re-index the project to switch providers: reindex_project(\"{project_path}\")"
             )
 
+        # An existing collection keeps the size it was built with
+        stored_dims = col_meta.get("embedding_dimensions") or provider["dimensions"]
+        if dimensions and dims != stored_dims:
+            raise RuntimeError(
+                f"Embedding dimensions mismatch: collection was indexed with {stored_dims} "
+                f"dimensions, {dims} requested. Re-index the project to change them."
+            )
+        dims = stored_dims
+
     # Ensure metadata is written (get_or_create_collection ignores metadata for existing collections)
     # Note: hnsw:space cannot be changed after creation, so exclude it from modify
     collection.modify(metadata={
         "project_path": project_path,
         "embedding_provider": provider["name"],
         "embedding_model": provider["model"],
-        "embedding_dimensions": provider["dimensions"],
+        "embedding_dimensions": dims,
     })
+    invalidate_collection(col_name)
+
+    manifest = get_manifest(project_path)
+    if reindex or (manifest.files and collection.count() == 0):
+        # Fresh collection: anything the manifest remembers is gone
+        manifest.clear()
+    # Collections indexed before the manifest existed, and runs resuming an
+    # interrupted one: files missing from the manifest may already have
+    # chunks, so diff them against the collection rather than duplicating.
+    assume_indexed = (
+        (not manifest.existed or manifest.meta.get("incomplete", False))
+        and collection.count() > 0
+    )
 
-    # Load existing file hashes to skip unchanged files
-    existing_hashes: dict[str, str] = {}
-    if not reindex and collection.count() > 0:
-        existing = collection.get(include=["metadatas"])
-        if existing and existing["metadatas"]:
-            for meta in existing["metadatas"]:
-                if meta and "file_hash" in meta and "file_path" in meta:
-                    existing_hashes[meta["file_path"]] = meta["file_hash"]
-
-    gitignore_patterns = _load_gitignore(path)
-    files = _collect_files(path, gitignore_patterns)
-
-    stats = {"files_scanned": len(files), "files_indexed": 0, "files_skipped": 0, "chunks_created": 0}
-
-    # Process files in batches
-    batch_ids: list[str] = []
-    batch_docs: list[str] = []
-    batch_metas: list[dict] = []
-
-    BATCH_SIZE = 20  # Embed 20 chunks at a time
-
-    for fpath in files:
-        try:
-            content = fpath.read_text(errors="ignore")
-        except Exception:
-            continue
-
-        fhash = _file_hash(content)
-        rel_path = str(fpath.relative_to(path))
-
-        # Skip if unchanged
-        if rel_path in existing_hashes and existing_hashes[rel_path] == fhash:
-            stats["files_skipped"] += 1
-            continue
-
-        # Remove old chunks for this file if re-indexing a changed file
-        if rel_path in existing_hashes:
-            try:
-                collection.delete(where={"file_path": rel_path})
-            except Exception:
-                pass
-
-        chunker = get_chunker(fpath.suffix)
-        chunks = chunker.chunk(content, rel_path)
-
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"{hashlib.md5(rel_path.encode()).hexdigest()[:8]}_{i}"
-            meta = {
-                "file_path": chunk.file_path,
-                "start_line": chunk.start_line,
-                "end_line": chunk.end_line,
-                "language": chunk.language or "",
-                "symbol_name": chunk.symbol_name or "",
-                "file_hash": fhash,
-                "project_path": project_path,
-            }
-            batch_ids.append(chunk_id)
-            batch_docs.append(chunk.content)
-            batch_metas.append(meta)
-
-        stats["files_indexed"] += 1
-        stats["chunks_created"] += len(chunks)
-
-        # Flush batch when large enough
-        if len(batch_docs) >= BATCH_SIZE:
-            embeddings = await embed_texts(batch_docs)
-            collection.upsert(
-                ids=batch_ids,
-                documents=batch_docs,
-                metadatas=batch_metas,
-                embeddings=embeddings,
+    # Collections indexed before the lexical index existed get it built
+    # from the chunks Chroma already holds (no re-embedding)
+    if collection.count() > 0 and not get_lexical_index(col_name).exists():
+        await asyncio.to_thread(_backfill_lexical, collection)
+
+    matcher = get_ignore_matcher(project_path)
+
+    head = None
+    git_changes = None
+    if mode != "walk":
+        head = await get_head_commit(project_path)
+        if head is None and mode == "git":
+            raise ValueError(f"Not a git repository (or no commits yet): {project_path}")
+        last_head = manifest.meta.get("git_head")
+        if head and last_head and not reindex and manifest.existed:
+            git_changes = await get_changes_since(project_path, last_head)
+
+    if git_changes is not None:
+        files = await asyncio.to_thread(_collect_git_changes, path, git_changes, matcher)
+    else:
+        files = await asyncio.to_thread(_collect_files, path, matcher)
+    changed = await asyncio.to_thread(_filter_unchanged, files, path, manifest)
+
+    # Files gone since the last run: renamed ones keep their embeddings,
+    # the rest are purged in one bulk delete.
+    renamed = purged = 0
+    vanished = await asyncio.to_thread(
+        _find_vanished, path, manifest, files, git_changes,
+    )
+    if vanished:
+        renames = await asyncio.to_thread(_detect_renames, path, manifest, changed, vanished)
+        if renames:
+            renamed = await asyncio.to_thread(
+                _apply_renames, collection, path, project_path, manifest, renames,
             )
-            batch_ids, batch_docs, batch_metas = [], [], []
-
-    # Flush remaining
-    if batch_docs:
-        embeddings = await embed_texts(batch_docs)
-        collection.upsert(
-            ids=batch_ids,
-            documents=batch_docs,
-            metadatas=batch_metas,
-            embeddings=embeddings,
+            moved_to = {fpath for _, fpath, _, _ in renames}
+            changed = [(f, st) for f, st in changed if f not in moved_to]
+            moved_from = {old for old, _, _, _ in renames}
+            vanished = [p for p in vanished if p not in moved_from]
+        purged = await asyncio.to_thread(_purge_paths, collection, manifest, vanished)
+
+    stats = {
+        "mode": "git" if git_changes is not None else "walk",
+        "files_scanned": len(files),
+        "files_indexed": 0,
+        "files_skipped": len(files) - len(changed),
+        "chunks_created": 0,
+        "chunks_embedded": 0,
+        "chunks_deleted": 0,
+        "files_removed": purged,
+        "files_renamed": renamed,
+        "files_total": len(changed),
+        "files_done": 0,
+        "chunks_written": 0,
+        "tokens_embedded": 0,
+        "throttle_wait_seconds": 0.0,
+        "rate_limited_responses": 0,
+    }
+    if progress is not None:
+        progress(stats)
+
+    if changed:
+        manifest.meta["incomplete"] = True
+        await asyncio.to_thread(manifest.save, True)
+    try:
+        await _run_pipeline(
+            changed, path, project_path, collection, manifest, assume_indexed,
+            config, stats, progress,
+            dimensions=dims if dims < provider["dimensions"] else None,
         )
+        if head:
+            # Only a completed run may advance the commit the next run diffs from
+            manifest.meta["git_head"] = head
+        manifest.meta.pop("incomplete", None)
+    finally:
+        invalidate_collection(col_name)  # renames and purges too
+        await asyncio.to_thread(manifest.save, True)
 
     return stats
 
 
 def list_indexed_projects() -> list[dict]:
     """List all indexed projects."""
-    client = get_chroma_client()
-    collections = client.list_collections()
     projects = []
-    for col in collections:
-        meta = col.metadata or {}
+    for entry in list_collection_entries():
+        meta = entry.metadata
         projects.append({
-            "name": col.name,
+            "name": entry.name,
             "project_path": meta.get("project_path", "unknown"),
-            "chunks": col.count(),
+            "chunks": entry.count,
             "embedding_provider": meta.get("embedding_provider", "ollama"),
             "embedding_model": meta.get("embedding_model", "unknown"),
+            "embedding_dimensions": meta.get("embedding_dimensions"),
         })
     return projects
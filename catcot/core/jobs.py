@@ -0,0 +1,353 @@
+"""Background indexing jobs.
+
+index_project runs as an asyncio task with a short job ID so MCP tool calls
+return before large repositories finish embedding. Jobs expose live
+progress (files/chunks done, throughput, rate-limit throttling, ETA) and
+can be cancelled.
+
+Job records are persisted to INDEX_JOBS_FILE, which every Catcot process
+shares: each job records the pid of the process running it, and a save
+merges in the other processes' records instead of overwriting them. A job
+still marked running whose process is gone was interrupted; resuming it
+starts an incremental run, which skips every file the interrupted run
+already committed.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are still atomic, just not serialized
+    fcntl = None
+
+from catcot.config import BASE_DIR, INDEX_JOBS_FILE
+from catcot.core.indexer import index_project
+
+MAX_JOBS_KEPT = 50
+SAVE_INTERVAL = 5.0  # seconds between progress checkpoints on disk
+
+_ACTIVE = ("pending", "running")
+
+
+@dataclass
+class IndexJob:
+    id: str
+    project_path: str
+    mode: str = "auto"
+    reindex: bool = False
+    dimensions: int | None = None
+    status: str = "pending"  # pending | running | completed | failed | cancelled | interrupted
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    stats: dict = field(default_factory=dict)
+    error: str | None = None
+    resumed_from: str | None = None
+    pid: int | None = field(default_factory=os.getpid)  # process running the job
+    task: asyncio.Task | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status not in _ACTIVE
+
+    @property
+    def local(self) -> bool:
+        """Whether this process runs (or ran) the job."""
+        return self.pid == os.getpid()
+
+    def progress(self) -> dict:
+        """Files/chunks done, throughput, throttling and ETA from the live stats."""
+        total = self.stats.get("files_total", 0)
+        files_done = self.stats.get("files_done", 0)
+        chunks = self.stats.get("chunks_written", 0)
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        files_rate = files_done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.status == "running" and files_rate > 0:
+            eta = round((total - files_done) / files_rate, 1)
+        return {
+            "files_done": files_done,
+            "files_total": total,
+            "percent": round(100.0 * files_done / total, 1) if total else (100.0 if self.done else 0.0),
+            "chunks_written": chunks,
+            "elapsed_seconds": round(elapsed, 1),
+            "files_per_second": round(files_rate, 2),
+            "chunks_per_second": round(chunks / elapsed, 2) if elapsed > 0 else 0.0,
+            "tokens_per_minute": (
+                round(60 * self.stats.get("tokens_embedded", 0) / elapsed) if elapsed > 0 else 0
+            ),
+            "throttle_wait_seconds": self.stats.get("throttle_wait_seconds", 0.0),
+            "rate_limited_responses": self.stats.get("rate_limited_responses", 0),
+            "eta_seconds": eta,
+        }
+
+    def to_dict(self) -> dict:
+        data = {f.name: getattr(self, f.name) for f in fields(self) if f.name != "task"}
+        data["stats"] = dict(self.stats)
+        data["progress"] = self.progress()
+        return data
+
+
+_JOBS: dict[str, IndexJob] = {}
+_last_save = 0.0
+
+
+def _process_alive(pid: int | None) -> bool:
+    if not pid or pid == os.getpid():
+        return False  # this process's own jobs are never read back from the file
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+@contextmanager
+def _jobs_file_lock():
+    """Serialize read-merge-write cycles on INDEX_JOBS_FILE across processes."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(BASE_DIR, exist_ok=True)
+    with open(f"{INDEX_JOBS_FILE}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _merge_from_file() -> None:
+    """Take other processes' job records from disk; this process's stay as they are.
+
+    A job left active by a process that is no longer running is interrupted.
+    """
+    try:
+        with open(INDEX_JOBS_FILE, "r") as f:
+            records = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, IOError):
+        return
+    for rec in records:
+        rec.pop("progress", None)
+        rec.setdefault("pid", None)  # written before jobs recorded their process
+        known = _JOBS.get(rec.get("id"))
+        if known is not None and known.local:
+            continue
+        try:
+            job = IndexJob(**rec)
+        except TypeError:
+            continue
+        if job.status in _ACTIVE and not _process_alive(job.pid):
+            job.status = "interrupted"
+        _JOBS[job.id] = job
+
+
+def _load_jobs() -> None:
+    """Refresh job history, including jobs run by other Catcot processes."""
+    _merge_from_file()
+
+
+def _save_jobs() -> None:
+    global _last_save
+    with _jobs_file_lock():
+        _merge_from_file()
+        _write_jobs()
+    _last_save = time.monotonic()
+
+
+def _write_jobs() -> None:
+    jobs = sorted(_JOBS.values(), key=lambda j: j.created_at)
+    # Drop the oldest finished jobs beyond the cap
+    while len(jobs) > MAX_JOBS_KEPT:
+        old = next((j for j in jobs if j.done), None)
+        if old is None:
+            break
+        jobs.remove(old)
+        _JOBS.pop(old.id, None)
+    os.makedirs(BASE_DIR, exist_ok=True)
+    tmp = f"{INDEX_JOBS_FILE}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump([j.to_dict() for j in jobs], f, indent=2)
+        os.replace(tmp, INDEX_JOBS_FILE)
+    except OSError as e:
+        sys.stderr.write(f"[Catcot] Warning: could not save index jobs: {e}\n")
+
+
+def _on_progress(job: IndexJob, stats: dict) -> None:
+    job.stats = stats
+    if time.monotonic() - _last_save >= SAVE_INTERVAL:
+        _save_jobs()
+
+
+async def _run(job: IndexJob) -> None:
+    job.status = "running"
+    job.started_at = time.time()
+    _save_jobs()
+    try:
+        job.stats = await index_project(
+            job.project_path,
+            reindex=job.reindex,
+            mode=job.mode,
+            progress=lambda stats: _on_progress(job, stats),
+            dimensions=job.dimensions,
+        )
+        job.status = "completed"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        sys.stderr.write(f"[Catcot] Index job {job.id} failed: {e}\n")
+    finally:
+        job.finished_at = time.time()
+        job.task = None
+        _save_jobs()
+
+
+def start_index_job(
+    project_path: str,
+    reindex: bool = False,
+    mode: str = "auto",
+    resumed_from: str | None = None,
+    dimensions: int | None = None,
+) -> IndexJob:
+    """Start indexing in the background and return its job.
+
+    If the project already has an active job, that job is returned instead
+    of starting a second run over the same collection. A re-index is not
+    folded into an incremental job: it is rejected until that job ends.
+
+    Raises:
+        ValueError: If the path is not a directory or the mode is unknown,
+            another process is indexing the project, or a re-index is
+            requested while an incremental job is active.
+    """
+    if mode not in ("auto", "walk", "git"):
+        raise ValueError(f"Unknown index mode: '{mode}'. Use 'auto', 'walk', or 'git'.")
+    project_path = os.path.abspath(os.path.expanduser(project_path))
+    if not os.path.isdir(project_path):
+        raise ValueError(f"Not a directory: {project_path}")
+
+    _load_jobs()
+    for job in _JOBS.values():
+        if job.project_path == project_path and not job.done:
+            if not job.local:
+                raise ValueError(
+                    f"{project_path} is being indexed by another Catcot process "
+                    f"(pid {job.pid}, job {job.id}). Wait for it to finish."
+                )
+            if reindex and not job.reindex:
+                raise ValueError(
+                    f"Indexing job {job.id} is already running for {project_path}. "
+                    f"Wait for it or cancel it with index_job(job_id=\"{job.id}\", "
+                    "action=\"cancel\"), then re-index."
+                )
+            return job
+
+    job = IndexJob(
+        id=uuid.uuid4().hex[:8],
+        project_path=project_path,
+        mode=mode,
+        reindex=reindex,
+        dimensions=dimensions,
+        resumed_from=resumed_from,
+    )
+    _JOBS[job.id] = job
+    job.task = asyncio.get_running_loop().create_task(_run(job))
+    job.task.add_done_callback(lambda t: _mark_cancelled_early(job, t))
+    return job
+
+
+def _mark_cancelled_early(job: IndexJob, task: asyncio.Task) -> None:
+    """A task cancelled before its first step never runs _run's handlers."""
+    if task.cancelled() and not job.done:
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        job.task = None
+        _save_jobs()
+
+
+def get_job(job_id: str) -> IndexJob | None:
+    _load_jobs()
+    return _JOBS.get(job_id)
+
+
+def list_jobs(project_path: str | None = None) -> list[IndexJob]:
+    """Known jobs, newest first."""
+    _load_jobs()
+    jobs = list(_JOBS.values())
+    if project_path:
+        project_path = os.path.abspath(os.path.expanduser(project_path))
+        jobs = [j for j in jobs if j.project_path == project_path]
+    return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+
+def cancel_job(job_id: str) -> bool:
+    """Cancel a running job. Returns False if it is unknown or already finished.
+
+    Batches already written stay indexed, so the job can be resumed.
+    """
+    job = get_job(job_id)
+    if job is None or job.done or job.task is None:
+        return False
+    job.task.cancel()
+    return True
+
+
+def resume_job(job_id: str) -> IndexJob:
+    """Continue an interrupted, cancelled or failed job.
+
+    The new run is always incremental: even if the original job was a full
+    reindex, the collection was already cleared and partly rebuilt.
+
+    Raises:
+        ValueError: If the job is unknown or still active.
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise ValueError(f"Unknown index job: {job_id}")
+    if not job.done:
+        raise ValueError(f"Index job {job_id} is still {job.status}.")
+    if job.status == "completed":
+        raise ValueError(f"Index job {job_id} already completed.")
+    return start_index_job(
+        job.project_path, mode=job.mode, resumed_from=job.id, dimensions=job.dimensions,
+    )
+
+
+async def wait_for_job(
+    job: IndexJob,
+    timeout: float,
+    on_progress: Callable[[IndexJob], object] | None = None,
+    interval: float = 1.0,
+) -> bool:
+    """Wait up to ``timeout`` seconds for a job, reporting progress each interval.
+
+    ``on_progress`` may be a coroutine function. Returns True if the job
+    finished. Timing out does not cancel the job.
+    """
+    deadline = time.monotonic() + max(timeout, 0.0)
+    while not job.done:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or job.task is None:
+            break
+        await asyncio.wait({job.task}, timeout=min(interval, remaining))
+        if on_progress is not None and not job.done:
+            result = on_progress(job)
+            if asyncio.iscoroutine(result):
+                await result
+    return job.done
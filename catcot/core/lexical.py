@@ -0,0 +1,336 @@
+"""Per-project lexical (BM25) index next to each Chroma collection.
+
+Embeddings are poor at exact tokens: identifiers like ``_resolve_provider``
+or error strings. Every chunk is therefore also stored in a SQLite FTS5
+table (one file per collection under BASE_DIR/lexical), ranked with BM25
+over the symbol name, the chunk text, and the parts of its compound
+identifiers (``getUserName`` -> ``get user name``) so partial names match
+too. The indexer and the watcher mirror every Chroma write into it, and
+into the project's in-memory symbol table once one is attached (see
+core/symbols.py).
+
+Search fuses the lexical and the vector ranking with reciprocal rank
+fusion (see core/searcher.py). Set CATCOT_HYBRID_SEARCH=0 for vector-only
+search; the index is maintained either way.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from catcot.config import LEXICAL_DIR
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id          INTEGER PRIMARY KEY,
+    chunk_id    TEXT NOT NULL UNIQUE,
+    file_path   TEXT NOT NULL,
+    start_line  INTEGER NOT NULL,
+    end_line    INTEGER NOT NULL,
+    language    TEXT NOT NULL,
+    symbol_name TEXT NOT NULL,
+    project_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_file_path ON chunks(file_path);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    symbol_name, content, terms,
+    tokenize = "unicode61 tokenchars '_'"
+);
+"""
+
+# BM25 column weights: symbol_name, content, identifier parts
+_BM25 = "bm25(chunks_fts, 5.0, 1.0, 0.5)"
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def split_identifier(name: str) -> list[str]:
+    """Lower-cased parts of a snake_case / camelCase / PascalCase name."""
+    return [p.lower() for p in _PART.findall(name)]
+
+
+def _terms(content: str, symbol_name: str) -> str:
+    """Parts of every compound identifier in a chunk, for partial matches."""
+    parts = set()
+    for ident in _IDENTIFIER.findall(f"{symbol_name} {content}"):
+        split = split_identifier(ident)
+        if len(split) > 1:
+            parts.update(split)
+    return " ".join(sorted(parts))
+
+
+def _match_expression(query: str) -> str | None:
+    """FTS5 query: any of the query's tokens or their identifier parts.
+
+    Multi-word queries also get the whole phrase as a term, so chunks
+    containing it verbatim (e.g. an error message) rank first.
+    """
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    terms = []
+    if len(words) > 1:
+        terms.append(" ".join(w.lower() for w in words))
+    for word in words:
+        terms.append(word.lower())
+        parts = split_identifier(word)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+class LexicalIndex:
+    """FTS5 index of one collection's chunks (thread-safe)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.symbols = None  # core.symbols.SymbolTable, once attached
+
+    def exists(self) -> bool:
+        return self._conn is not None or os.path.exists(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _delete_rows(self, conn: sqlite3.Connection, column: str, values: list[str]) -> None:
+        # Chunked only to stay under SQLite's bound-parameter limit
+        for i in range(0, len(values), 500):
+            part = values[i:i + 500]
+            marks = ",".join("?" * len(part))
+            if self.symbols is not None:
+                ids = part if column == "chunk_id" else [
+                    row[0] for row in
+                    conn.execute(f"SELECT chunk_id FROM chunks WHERE {column} IN ({marks})", part)
+                ]
+                for cid in ids:
+                    self.symbols.remove(cid)
+            conn.execute(
+                f"DELETE FROM chunks_fts WHERE rowid IN "
+                f"(SELECT id FROM chunks WHERE {column} IN ({marks}))",
+                part,
+            )
+            conn.execute(f"DELETE FROM chunks WHERE {column} IN ({marks})", part)
+
+    def upsert(self, ids: list[str], docs: list[str], metas: list[dict]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            self._delete_rows(conn, "chunk_id", ids)
+            for cid, doc, meta in zip(ids, docs, metas):
+                symbol = meta.get("symbol_name") or ""
+                cur = conn.execute(
+                    "INSERT INTO chunks (chunk_id, file_path, start_line, end_line, "
+                    "language, symbol_name, project_path) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        cid, meta.get("file_path", ""), meta.get("start_line", 0),
+                        meta.get("end_line", 0), meta.get("language") or "", symbol,
+                        meta.get("project_path", ""),
+                    ),
+                )
+                conn.execute(
+                    "INSERT INTO chunks_fts (rowid, symbol_name, content, terms) VALUES (?, ?, ?, ?)",
+                    (cur.lastrowid, symbol, doc, _terms(doc, symbol)),
+                )
+                if self.symbols is not None:
+                    self.symbols.add(cid, meta)
+            conn.commit()
+
+    def update(self, ids: list[str], metas: list[dict]) -> None:
+        """Metadata-only changes (e.g. a chunk moved within its file)."""
+        if not ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            for cid, meta in zip(ids, metas):
+                conn.execute(
+                    "UPDATE chunks_fts SET symbol_name = ? "
+                    "WHERE rowid = (SELECT id FROM chunks WHERE chunk_id = ?)",
+                    (meta.get("symbol_name") or "", cid),
+                )
+                conn.execute(
+                    "UPDATE chunks SET file_path = ?, start_line = ?, end_line = ?, "
+                    "language = ?, symbol_name = ? WHERE chunk_id = ?",
+                    (
+                        meta.get("file_path", ""), meta.get("start_line", 0),
+                        meta.get("end_line", 0), meta.get("language") or "",
+                        meta.get("symbol_name") or "", cid,
+                    ),
+                )
+                if self.symbols is not None:
+                    self.symbols.add(cid, meta)
+            conn.commit()
+
+    def delete(self, ids: list[str]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            self._delete_rows(conn, "chunk_id", ids)
+            conn.commit()
+
+    def delete_files(self, rel_paths: list[str]) -> None:
+        if not rel_paths or not self.exists():
+            return
+        with self._lock:
+            conn = self._connect()
+            self._delete_rows(conn, "file_path", rel_paths)
+            conn.commit()
+
+    def attach_symbols(self, table) -> None:
+        """Fill ``table`` from the stored chunks and keep it current from now on."""
+        with self._lock:
+            if self.symbols is not None:
+                return
+            rows = self._connect().execute(
+                "SELECT chunk_id, symbol_name, file_path, start_line, end_line, language, "
+                "project_path FROM chunks WHERE symbol_name != ''"
+            )
+            for cid, symbol, file_path, start_line, end_line, language, project_path in rows:
+                table.add(cid, {
+                    "symbol_name": symbol,
+                    "file_path": file_path,
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "language": language,
+                    "project_path": project_path,
+                })
+            self.symbols = table
+
+    def count(self) -> int:
+        if not self.exists():
+            return 0
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        files: frozenset[str] | None = None,
+        path: str | None = None,
+        language: str | None = None,
+        symbol: str | None = None,
+    ) -> list[dict]:
+        """BM25-ranked chunks matching the query, best first.
+
+        Filters mirror core.searcher.SearchFilters. Hits carry the same
+        fields as vector hits, with ``similarity`` None and ``score`` the
+        BM25 relevance (higher is better).
+        """
+        expression = _match_expression(query)
+        if expression is None or not self.exists():
+            return []
+        sql = (
+            "SELECT c.file_path, c.start_line, c.end_line, c.symbol_name, c.language, "
+            f"f.content, c.project_path, {_BM25} AS bm25_score "
+            "FROM chunks_fts f JOIN chunks c ON c.id = f.rowid "
+            "WHERE chunks_fts MATCH ?"
+        )
+        params: list = [expression]
+        if files is not None:
+            sql += " AND c.file_path IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(sorted(files)))
+        if path:
+            if any(c in path for c in "*?["):
+                sql += " AND c.file_path GLOB ?"
+                params.append(path)
+            elif path.rstrip("/"):
+                # A file or a whole directory, never a sibling sharing its prefix
+                prefix = path.rstrip("/")
+                sql += " AND (c.file_path = ? OR substr(c.file_path, 1, ?) = ?)"
+                params += [prefix, len(prefix) + 1, prefix + "/"]
+        if language:
+            sql += " AND c.language = ?"
+            params.append(language)
+        if symbol:
+            sql += " AND c.symbol_name = ?"
+            params.append(symbol)
+        sql += " ORDER BY bm25_score LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [
+            {
+                "file_path": file_path,
+                "start_line": start_line,
+                "end_line": end_line,
+                "symbol_name": symbol_name,
+                "language": lang,
+                "content": content,
+                "similarity": None,
+                "project_path": project_path,
+                "score": round(-bm25_score, 4),
+            }
+            for file_path, start_line, end_line, symbol_name, lang, content, project_path, bm25_score
+            in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_INDEXES: dict[str, LexicalIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_lexical_index(col_name: str) -> LexicalIndex:
+    """Shared lexical index for a collection (created on first write)."""
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(col_name)
+        if index is None:
+            index = LexicalIndex(os.path.join(LEXICAL_DIR, f"{col_name}.sqlite3"))
+            _INDEXES[col_name] = index
+        return index
+
+
+def drop_lexical_index(col_name: str) -> None:
+    """Delete a collection's lexical index (re-index, project removal)."""
+    with _INDEXES_LOCK:
+        index = _INDEXES.pop(col_name, None)
+    if index is not None:
+        index.close()
+    path = os.path.join(LEXICAL_DIR, f"{col_name}.sqlite3")
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def hybrid_enabled() -> bool:
+    return os.environ.get("CATCOT_HYBRID_SEARCH", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def looks_like_identifier(query: str) -> bool:
+    """Whether a query is a code identifier rather than natural language.
+
+    A single token that is snake_case, camelCase, dotted (``mod.func``) or
+    ``Class::method``, optionally followed by ``()``. Plain words like
+    ``authentication`` are left to semantic search.
+    """
+    q = query.strip().removesuffix("()")
+    if not q or any(c.isspace() for c in q):
+        return False
+    names = re.split(r"\.|::", q)
+    if not all(_IDENTIFIER.fullmatch(n) for n in names):
+        return False
+    return len(names) > 1 or "_" in q or any(
+        len(split_identifier(n)) > 1 for n in names
+    )
@@ -0,0 +1,114 @@
+"""Per-project file manifest, stored outside ChromaDB.
+
+Records size, mtime_ns, inode and content hash for every indexed file so an
+incremental run can skip unchanged files from a single ``stat`` call instead
+of reading and hashing them, and without pulling every chunk's metadata out
+of the collection.
+"""
+
+import json
+import os
+import threading
+import time
+
+from catcot.config import MANIFEST_DIR, collection_name
+
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    """In-memory view of one project's manifest file (thread-safe)."""
+
+    def __init__(self, project_path: str):
+        self.project_path = project_path
+        self.path = os.path.join(MANIFEST_DIR, f"{collection_name(project_path)}.json")
+        self.files: dict[str, dict] = {}
+        self.meta: dict = {}
+        self.existed = False
+        self.lock = threading.RLock()
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        self.files = data.get("files", {})
+        self.meta = data.get("meta", {})
+        self.existed = True
+
+    def is_unchanged(self, rel_path: str, st: os.stat_result) -> bool:
+        """True if the file's stat matches the recorded one (no need to open it)."""
+        entry = self.files.get(rel_path)
+        return (
+            entry is not None
+            and entry["size"] == st.st_size
+            and entry["mtime_ns"] == st.st_mtime_ns
+            and entry["inode"] == st.st_ino
+        )
+
+    def get_hash(self, rel_path: str) -> str | None:
+        entry = self.files.get(rel_path)
+        return entry["hash"] if entry else None
+
+    def record(self, rel_path: str, st: os.stat_result, file_hash: str) -> None:
+        with self.lock:
+            self.files[rel_path] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "inode": st.st_ino,
+                "hash": file_hash,
+            }
+            self._dirty = True
+
+    def remove(self, rel_path: str) -> None:
+        with self.lock:
+            if self.files.pop(rel_path, None) is not None:
+                self._dirty = True
+
+    def clear(self) -> None:
+        with self.lock:
+            self.files.clear()
+            self.meta.clear()
+            self._dirty = True
+
+    def save(self, force: bool = False) -> None:
+        """Atomically persist the manifest if it changed."""
+        with self.lock:
+            if not (self._dirty or force):
+                return
+            data = {
+                "version": MANIFEST_VERSION,
+                "project_path": self.project_path,
+                "updated_at": time.time(),
+                "meta": self.meta,
+                "files": self.files,
+            }
+            os.makedirs(MANIFEST_DIR, exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+            self.existed = True
+
+
+_MANIFESTS: dict[str, Manifest] = {}
+_MANIFESTS_LOCK = threading.Lock()
+
+
+def get_manifest(project_path: str) -> Manifest:
+    """Shared manifest instance for a project (indexer and watcher use the same one)."""
+    project_path = os.path.abspath(os.path.expanduser(project_path))
+    with _MANIFESTS_LOCK:
+        manifest = _MANIFESTS.get(project_path)
+        if manifest is None:
+            manifest = Manifest(project_path)
+            _MANIFESTS[project_path] = manifest
+        return manifest
@@ -0,0 +1,151 @@
+"""Per-provider request/token rate limiting for API embedding providers.
+
+Each provider gets two token buckets — requests per minute and tokens per
+minute — that every request must pass before it is sent, so a large index
+run paces itself under the quota instead of running into 429s. A 429 (or
+its Retry-After) pauses the whole provider, not just the request that
+received it.
+
+Quotas default to entry-tier limits and are set with CATCOT_<PROVIDER>_RPM
+and CATCOT_<PROVIDER>_TPM (e.g. CATCOT_OPENAI_TPM=5000000); 0 disables a
+bucket.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# (requests per minute, tokens per minute); None = unlimited
+_DEFAULT_QUOTAS: dict[str, tuple[int | None, int | None]] = {
+    "openai": (3_000, 1_000_000),
+    "voyage": (2_000, 3_000_000),
+    "google": (1_500, None),
+}
+
+MAX_BACKOFF = 60.0
+
+
+class TokenBucket:
+    """Continuous-refill token bucket (capacity = one minute of quota)."""
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` (possibly going negative); return seconds to wait."""
+        now = time.monotonic()
+        self._refill(now)
+        amount = min(amount, self.capacity)  # a single oversized request must still pass
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Request and token buckets plus a shared cooldown for one provider."""
+
+    def __init__(self, rpm: int | None, tpm: int | None):
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.tokens = 0
+        self.throttled = 0          # requests that had to wait for the buckets
+        self.wait_seconds = 0.0     # total time spent waiting (buckets + cooldowns)
+        self.rate_limited = 0       # 429 responses received
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        with self._lock:
+            wait = max(0.0, self.cooldown_until - time.monotonic())
+            if self.rpm is not None:
+                wait = max(wait, self.rpm.reserve(1))
+            if self.tpm is not None and tokens:
+                wait = max(wait, self.tpm.reserve(tokens))
+            self.requests += 1
+            self.tokens += tokens
+            if wait > 0:
+                self.throttled += 1
+                self.wait_seconds += wait
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def backoff(self, attempt: int, retry_after: float | None, rate_limited: bool) -> float:
+        """Seconds to wait before retry ``attempt``; 429s pause the provider."""
+        if retry_after is not None:
+            delay = min(retry_after, MAX_BACKOFF)
+        else:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(MAX_BACKOFF, 2.0 ** (attempt + 1)))
+        with self._lock:
+            self.retries += 1
+            self.wait_seconds += delay
+            if rate_limited:
+                self.rate_limited += 1
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+        return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rpm_limit": round(self.rpm.capacity) if self.rpm else None,
+                "tpm_limit": round(self.tpm.capacity) if self.tpm else None,
+                "requests": self.requests,
+                "tokens": self.tokens,
+                "throttled_requests": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "rate_limited_responses": self.rate_limited,
+                "retries": self.retries,
+            }
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After as seconds (delta-seconds or HTTP-date form)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _quota(name: str, default: int | None) -> int | None:
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else None
+
+
+_LIMITERS: dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Shared limiter for a provider name."""
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(provider)
+        if limiter is None:
+            rpm, tpm = _DEFAULT_QUOTAS.get(provider, (None, None))
+            prefix = f"CATCOT_{provider.upper()}"
+            limiter = RateLimiter(_quota(f"{prefix}_RPM", rpm), _quota(f"{prefix}_TPM", tpm))
+            _LIMITERS[provider] = limiter
+        return limiter
@@ -0,0 +1,103 @@
+"""Process-wide registry of Chroma collection handles.
+
+Opening a collection and counting its chunks each cost SQLite queries;
+search used to pay them for every collection on every query. The registry
+keeps each handle with its metadata and chunk count (and, once a path
+filter asks for it, the indexed file list). Our own writes
+(indexing, the watcher, memory sync, deletes) invalidate the entries they
+touch; CATCOT_COLLECTION_CACHE_TTL (seconds, default 30) bounds how long
+changes made by another process go unnoticed.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from catcot.config import get_chroma_client
+
+
+@dataclass
+class CollectionEntry:
+    collection: object  # chromadb Collection
+    metadata: dict
+    count: int
+    loaded_at: float
+    _file_paths: frozenset[str] | None = field(default=None, repr=False)
+
+    @property
+    def name(self) -> str:
+        return self.collection.name
+
+    def file_paths(self) -> frozenset[str]:
+        """Distinct indexed file paths (read once per entry, for path filters)."""
+        if self._file_paths is None:
+            metas = self.collection.get(include=["metadatas"])["metadatas"] or []
+            self._file_paths = frozenset(m.get("file_path", "") for m in metas if m)
+        return self._file_paths
+
+
+_ENTRIES: dict[str, CollectionEntry] = {}
+_NAMES: list[str] = []          # every collection, as of _listed_at
+_listed_at: float | None = None
+_LOCK = threading.RLock()
+
+
+def _ttl() -> float:
+    try:
+        return max(0.0, float(os.environ.get("CATCOT_COLLECTION_CACHE_TTL", 30)))
+    except ValueError:
+        return 30.0
+
+
+def _load(name: str) -> CollectionEntry | None:
+    try:
+        col = get_chroma_client().get_collection(name)
+    except Exception:
+        return None
+    return CollectionEntry(
+        collection=col,
+        metadata=dict(col.metadata or {}),
+        count=col.count(),
+        loaded_at=time.monotonic(),
+    )
+
+
+def get_collection_entry(name: str) -> CollectionEntry | None:
+    """Cached handle, metadata and count for a collection, or None if it does not exist."""
+    with _LOCK:
+        entry = _ENTRIES.get(name)
+        if entry is not None and time.monotonic() - entry.loaded_at < _ttl():
+            return entry
+        entry = _load(name)
+        if entry is None:
+            _ENTRIES.pop(name, None)
+            if name in _NAMES:
+                _NAMES.remove(name)
+            return None
+        _ENTRIES[name] = entry
+        return entry
+
+
+def list_collection_entries() -> list[CollectionEntry]:
+    """Entries for every collection (the list itself is cached too)."""
+    global _listed_at
+    with _LOCK:
+        if _listed_at is None or time.monotonic() - _listed_at >= _ttl():
+            _NAMES[:] = [col.name for col in get_chroma_client().list_collections()]
+            _listed_at = time.monotonic()
+        entries = [get_collection_entry(name) for name in list(_NAMES)]
+    return [e for e in entries if e is not None]
+
+
+def invalidate_collection(name: str | None = None) -> None:
+    """Drop cached state after a write to ``name`` (None = everything)."""
+    global _listed_at
+    with _LOCK:
+        if name is None:
+            _ENTRIES.clear()
+            _listed_at = None
+            return
+        _ENTRIES.pop(name, None)
+        if name not in _NAMES:
+            _listed_at = None  # created since the last listing
@@ -1,76 +1,373 @@
-"""Searches indexed code using vector similarity."""
+"""Searches indexed code using vector similarity.
 
+Searching every project fans the per-collection queries out to a thread
+pool (CATCOT_SEARCH_WORKERS, default 8) and merges the already-sorted
+per-collection hits through a heap, so an all-project search costs about
+as much as its slowest collection. An optional deadline (per call, or
+CATCOT_SEARCH_DEADLINE seconds) bounds that: collections that have not
+answered by then are reported in ``results.skipped`` instead of stalling
+the call.
+
+Filters (file list, path prefix or glob, language, symbol) become a Chroma
+``where`` clause so the ANN search only ranks matching chunks. Chroma has
+no string prefix or pattern operators, so path filters are resolved
+against the collection's cached file list into a ``file_path $in`` set.
+
+Unless CATCOT_HYBRID_SEARCH=0, each collection is also searched through
+its lexical index (core/lexical.py) and the two rankings are combined with
+reciprocal rank fusion: a hit scores sum(1 / (RRF_K + rank)) over the
+lists it appears in. Identifier-like queries (``_resolve_provider``,
+``getUserName``, ``mod.func``) try the lexical index alone first and only
+pay for an embedding call if it finds nothing.
+"""
+
+import asyncio
+import fnmatch
+import heapq
+import itertools
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from catcot.config import collection_name
+from catcot.core.embedder import collection_dimensions, embed_query, resolve_provider_info
+from catcot.core.lexical import get_lexical_index, hybrid_enabled, looks_like_identifier
+from catcot.core.registry import (
+    CollectionEntry,
+    get_collection_entry,
+    invalidate_collection,
+    list_collection_entries,
+)
+
+RRF_K = 60  # rank damping in reciprocal rank fusion (the usual constant)
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+class SearchResults(list):
+    """Ranked hits, plus the collections that did not contribute to them.
+
+    Each ``skipped`` entry has ``project_path``, ``collection`` and
+    ``reason`` ("deadline", "provider mismatch" or the query error).
+    """
+
+    def __init__(self, hits=(), skipped: list[dict] | None = None):
+        super().__init__(hits)
+        self.skipped = skipped or []
+
+
+def _search_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            try:
+                workers = max(1, int(os.environ.get("CATCOT_SEARCH_WORKERS", 8)))
+            except ValueError:
+                workers = 8
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catcot-search")
+        return _EXECUTOR
+
+
+def _default_deadline() -> float | None:
+    try:
+        value = float(os.environ.get("CATCOT_SEARCH_DEADLINE") or 0)
+    except ValueError:
+        return None
+    return value if value > 0 else None
 
-from catcot.config import collection_name, get_chroma_client
-from catcot.core.embedder import embed_query, get_provider_info
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Restrict a search to matching chunks; unset fields match everything.
+
+    ``files`` are paths relative to the project root; ``path`` is a file or
+    directory (``src/api`` matches ``src/api/x.py`` but not ``src/apiary``)
+    or, if it contains ``*``, ``?`` or ``[``, a glob matched against the
+    whole relative path (``*`` also crosses ``/``).
+    """
+
+    files: frozenset[str] | None = None
+    path: str | None = None
+    language: str | None = None
+    symbol: str | None = None
+
+    def __bool__(self) -> bool:
+        return any(v is not None for v in (self.files, self.path, self.language, self.symbol))
+
+    def _match_path(self, file_path: str) -> bool:
+        if any(c in self.path for c in "*?["):
+            return fnmatch.fnmatchcase(file_path, self.path)
+        # Same rule as LexicalIndex.search
+        prefix = self.path.rstrip("/")
+        return not prefix or file_path == prefix or file_path.startswith(prefix + "/")
+
+    def where(self, entry: CollectionEntry) -> dict | None:
+        """Chroma ``where`` clause for this collection (``{}`` if nothing can match)."""
+        clauses = []
+        if self.language:
+            clauses.append({"language": self.language})
+        if self.symbol:
+            clauses.append({"symbol_name": self.symbol})
+        if self.files is not None or self.path:
+            candidates = self.files if self.files is not None else entry.file_paths()
+            if self.path:
+                candidates = {f for f in candidates if self._match_path(f)}
+            if not candidates:
+                return {}
+            if len(candidates) == 1:
+                clauses.append({"file_path": next(iter(candidates))})
+            else:
+                clauses.append({"file_path": {"$in": sorted(candidates)}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _query(col, embedding: list[float], n_results: int, where: dict | None = None) -> dict:
+    return col.query(
+        query_embeddings=[embedding],
+        n_results=n_results,
+        where=where,
+        include=["documents", "metadatas", "distances"],
+    )
+
+
+def _search_entry(
+    entry: CollectionEntry,
+    query: str,
+    embedding: list[float] | None,
+    depth: int,
+    filters: SearchFilters,
+    lexical: bool,
+) -> tuple[list[dict], list[dict]]:
+    """Vector and lexical hits for one collection (runs on the search pool).
+
+    Either side is skipped when ``embedding`` is None / ``lexical`` is off.
+    """
+    keyword_hits = []
+    if lexical:
+        keyword_hits = get_lexical_index(entry.name).search(
+            query, depth, filters.files, filters.path, filters.language, filters.symbol,
+        )
+    vector_hits = _query_entry(entry, embedding, depth, filters) if embedding is not None else []
+    return vector_hits, keyword_hits
+
+
+def _fuse(vector: list[dict], keyword: list[dict], top_k: int) -> list[dict]:
+    """Reciprocal rank fusion of two best-first hit lists."""
+    scores: dict[tuple, float] = {}
+    hits: dict[tuple, dict] = {}
+    for ranked in (vector, keyword):
+        for rank, hit in enumerate(ranked, 1):
+            key = (hit["project_path"], hit["file_path"], hit["start_line"], hit["end_line"])
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            hits.setdefault(key, hit)  # vector hits first: they carry a similarity
+    best = heapq.nlargest(top_k, scores, key=scores.__getitem__)
+    return [{**hits[key], "score": round(scores[key], 6)} for key in best]
+
+
+def _query_entry(
+    entry: CollectionEntry,
+    embedding: list[float],
+    top_k: int,
+    filters: SearchFilters,
+) -> list[dict]:
+    """Query one collection's vectors; hits best-first."""
+    try:
+        where = filters.where(entry) if filters else None
+        if where == {}:
+            return []
+        results = _query(entry.collection, embedding, min(top_k, entry.count), where)
+    except Exception:
+        # Stale handle: the collection was rebuilt or deleted elsewhere
+        invalidate_collection(entry.name)
+        fresh = get_collection_entry(entry.name)
+        if fresh is None or fresh.count == 0:
+            return []
+        where = filters.where(fresh) if filters else None
+        if where == {}:
+            return []
+        results = _query(fresh.collection, embedding, min(top_k, fresh.count), where)
+
+    hits = []
+    if results and results["documents"]:
+        for i, doc in enumerate(results["documents"][0]):
+            meta = results["metadatas"][0][i] if results["metadatas"] else {}
+            distance = results["distances"][0][i] if results["distances"] else 0
+            # ChromaDB cosine distance: 0 = identical, 2 = opposite
+            similarity = 1 - (distance / 2)
+            hits.append({
+                "file_path": meta.get("file_path", ""),
+                "start_line": meta.get("start_line", 0),
+                "end_line": meta.get("end_line", 0),
+                "symbol_name": meta.get("symbol_name", ""),
+                "language": meta.get("language", ""),
+                "content": doc,
+                "similarity": round(similarity, 4),
+                "project_path": meta.get("project_path", ""),
+            })
+    return hits
+
+
+def _skip(entry: CollectionEntry, reason: str) -> dict:
+    return {
+        "project_path": entry.metadata.get("project_path", entry.name),
+        "collection": entry.name,
+        "reason": reason,
+    }
 
 
 async def search_code(
     query: str,
     project_path: str | None = None,
     top_k: int = 5,
-) -> list[dict]:
+    deadline: float | None = None,
+    files: list[str] | None = None,
+    path: str | None = None,
+    language: str | None = None,
+    symbol: str | None = None,
+) -> SearchResults:
     """Search indexed code for relevant chunks.
 
-    If project_path is None, searches all indexed projects.
+    If project_path is None, searches all indexed projects in parallel.
+    ``deadline`` is how many seconds the whole call may wait for the
+    collections (default CATCOT_SEARCH_DEADLINE, else no limit), shared by
+    every pass it makes; late ones are listed in ``skipped`` on the
+    returned list. ``files``, ``path``, ``language`` and
+    ``symbol`` restrict the search as described in SearchFilters; absolute
+    ``files`` are made relative to project_path. With hybrid search on,
+    ``score`` is the fused rank score and ``similarity`` is None for hits
+    found by keyword only.
     Returns list of results with file_path, start_line, end_line, content, score.
     """
-    client = get_chroma_client()
-    query_embedding = await embed_query(query)
-
-    collections_to_search = []
+    # Handles, metadata and counts come from the collection registry, so
+    # nothing but the ANN query itself touches Chroma per search.
     if project_path:
         project_path = os.path.abspath(os.path.expanduser(project_path))
-        col_name = collection_name(project_path)
-        try:
-            col = client.get_collection(col_name)
-            collections_to_search.append(col)
-        except Exception:
+        entry = get_collection_entry(collection_name(project_path))
+        if entry is None:
             raise ValueError(
                 f"Project not indexed: {project_path}. Run index_project first."
             )
+        collections_to_search = [entry]
     else:
-        collections_to_search = client.list_collections()
+        collections_to_search = list_collection_entries()
+
+    if files is not None:
+        files = frozenset(
+            os.path.relpath(f, project_path) if project_path and os.path.isabs(f) else f
+            for f in files
+        )
+    if path:
+        path = path.removeprefix("./")
+    filters = SearchFilters(files, path or None, (language or "").lower() or None, symbol or None)
 
     # Filter out collections indexed with a different provider
-    current_provider = get_provider_info()["name"]
-    all_results = []
-    for col in collections_to_search:
-        if col.count() == 0:
+    current_provider = (await resolve_provider_info())["name"]
+    skipped = []
+    targets = []
+    for entry in collections_to_search:
+        if entry.count == 0:
             continue
-        col_meta = col.metadata or {}
-        col_provider = col_meta.get("embedding_provider")
+        col_provider = entry.metadata.get("embedding_provider")
         if col_provider and col_provider != current_provider:
-            import sys
-            proj = col_meta.get("project_path", col.name)
+            proj = entry.metadata.get("project_path", entry.name)
             sys.stderr.write(
                 f"[Catcot] Skipping '{proj}': indexed with '{col_provider}', "
                 f"current provider is '{current_provider}'. Reindex to fix.\n"
             )
+            skipped.append(_skip(entry, "provider mismatch"))
             continue
-        results = col.query(
-            query_embeddings=[query_embedding],
-            n_results=min(top_k, col.count()),
-            include=["documents", "metadatas", "distances"],
+        targets.append(entry)
+
+    if not targets:
+        return SearchResults(skipped=skipped)
+    if deadline is None:
+        deadline = _default_deadline()
+    # One budget for the whole call, however many passes it makes
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+    lexical = hybrid_enabled()
+    depth = top_k * 2 if lexical else top_k
+
+    # Exact identifiers: the lexical index alone, no embedding call
+    if lexical and looks_like_identifier(query):
+        attempt_skipped = list(skipped)
+        results = await _fan_out(targets, query, None, top_k, filters, True, deadline, attempt_skipped)
+        keyword = heapq.merge(*(k for _, k in results), key=lambda x: x["score"], reverse=True)
+        hits = list(itertools.islice(keyword, top_k))
+        if hits:
+            return SearchResults(hits, attempt_skipped)
+
+    query_embedding = await embed_query(query)
+    # Reduced-dimension collections get the query truncated to their size
+    embeddings = {}
+    for entry in targets:
+        dims = collection_dimensions(entry.metadata)
+        embeddings[entry.name] = await embed_query(query, dims) if dims else query_embedding
+
+    if deadline_at is not None:
+        deadline = max(0.0, deadline_at - time.monotonic())
+    results = await _fan_out(targets, query, embeddings, depth, filters, lexical, deadline, skipped)
+
+    # Each list is already best-first; merge them lazily
+    vector = heapq.merge(*(v for v, _ in results), key=lambda x: x["similarity"], reverse=True)
+    if not lexical:
+        return SearchResults(itertools.islice(vector, top_k), skipped)
+    keyword = heapq.merge(*(k for _, k in results), key=lambda x: x["score"], reverse=True)
+    return SearchResults(
+        _fuse(list(itertools.islice(vector, depth)), list(itertools.islice(keyword, depth)), top_k),
+        skipped,
+    )
+
+
+async def _fan_out(
+    targets: list[CollectionEntry],
+    query: str,
+    embeddings: dict[str, list[float]] | None,
+    depth: int,
+    filters: SearchFilters,
+    lexical: bool,
+    deadline: float | None,
+    skipped: list[dict],
+) -> list[tuple[list[dict], list[dict]]]:
+    """Run _search_entry for every collection on the pool, up to ``deadline``.
+
+    ``embeddings`` maps collection name to its query vector (None for a
+    lexical-only pass). Collections that are late or fail are appended to
+    ``skipped``.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _search_executor()
+    futures = {
+        loop.run_in_executor(
+            executor, _search_entry, entry, query,
+            embeddings[entry.name] if embeddings else None, depth, filters, lexical,
+        ): entry
+        for entry in targets
+    }
+    done, pending = await asyncio.wait(futures, timeout=deadline)
+
+    for future in pending:
+        # The pool thread finishes on its own; its result is dropped
+        future.cancel()
+        skipped.append(_skip(futures[future], "deadline"))
+
+    results = []
+    for future in done:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            entry = futures[future]
+            sys.stderr.write(f"[Catcot] Search failed for '{entry.name}': {e}\n")
+            skipped.append(_skip(entry, str(e) or type(e).__name__))
+
+    if pending:
+        sys.stderr.write(
+            f"[Catcot] Search deadline ({deadline:g}s) hit: skipped {len(pending)} "
+            f"of {len(futures)} collection(s)\n"
         )
-        if results and results["documents"]:
-            for i, doc in enumerate(results["documents"][0]):
-                meta = results["metadatas"][0][i] if results["metadatas"] else {}
-                distance = results["distances"][0][i] if results["distances"] else 0
-                # ChromaDB cosine distance: 0 = identical, 2 = opposite
-                similarity = 1 - (distance / 2)
-                all_results.append({
-                    "file_path": meta.get("file_path", ""),
-                    "start_line": meta.get("start_line", 0),
-                    "end_line": meta.get("end_line", 0),
-                    "symbol_name": meta.get("symbol_name", ""),
-                    "language": meta.get("language", ""),
-                    "content": doc,
-                    "similarity": round(similarity, 4),
-                    "project_path": meta.get("project_path", ""),
-                })
-
-    # Sort by similarity descending, take top_k
-    all_results.sort(key=lambda x: x["similarity"], reverse=True)
-    return all_results[:top_k]
+    return results
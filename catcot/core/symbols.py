@@ -0,0 +1,235 @@
+"""Per-project symbol tables: exact, prefix and fuzzy lookup by name.
+
+Chunks carry the name of the declaration they hold (``symbol_name``). The
+lexical index (core/lexical.py) already stores those names and locations
+and is kept in step by the indexer and the watcher. A project's symbol
+table is loaded from it once, attached to it, and from then on updated in
+place by every lexical write, so a lookup is a dict, bisect or trigram
+probe in memory: no SQLite query and no embedding call.
+
+Matching ignores case (exact-case hits rank first). Fuzzy matching scores
+names by trigram overlap (Dice coefficient), which tolerates typos and
+partial names (``UserRepo`` -> ``UserRepository``). Only named
+declarations are indexed; small files kept as one chunk have no symbol.
+"""
+
+import bisect
+import itertools
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from catcot.config import collection_name
+from catcot.core.lexical import get_lexical_index
+from catcot.core.registry import get_collection_entry, list_collection_entries
+
+MATCH_MODES = ("auto", "exact", "prefix", "fuzzy")
+FUZZY_MIN_SCORE = 0.3
+
+
+@dataclass(frozen=True)
+class Symbol:
+    name: str
+    file_path: str
+    start_line: int
+    end_line: int
+    language: str
+    project_path: str
+
+
+def _is_symbol(name: str) -> bool:
+    # "(imports)", "(header)", "(trailing)" label chunks, not declarations
+    return bool(name) and not name.startswith("(")
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolTable:
+    """Name -> locations for one project, with prefix and trigram indexes (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_chunk: dict[str, Symbol] = {}
+        self._by_key: dict[str, dict[str, Symbol]] = {}  # lower-cased name -> chunk_id -> symbol
+        self._grams: dict[str, set[str]] = {}            # trigram -> lower-cased names
+        self._sorted: list[str] | None = None            # sorted keys, rebuilt after changes
+
+    def __len__(self) -> int:
+        return len(self._by_chunk)
+
+    def add(self, chunk_id: str, meta: dict) -> None:
+        """Record (or replace) the symbol of a chunk from its metadata."""
+        with self._lock:
+            self._remove(chunk_id)
+            name = meta.get("symbol_name") or ""
+            if not _is_symbol(name):
+                return
+            symbol = Symbol(
+                name=name,
+                file_path=meta.get("file_path", ""),
+                start_line=meta.get("start_line", 0),
+                end_line=meta.get("end_line", 0),
+                language=meta.get("language") or "",
+                project_path=meta.get("project_path", ""),
+            )
+            key = name.lower()
+            self._by_chunk[chunk_id] = symbol
+            chunks = self._by_key.get(key)
+            if chunks is None:
+                chunks = self._by_key[key] = {}
+                for gram in _trigrams(key):
+                    self._grams.setdefault(gram, set()).add(key)
+                self._sorted = None
+            chunks[chunk_id] = symbol
+
+    def remove(self, chunk_id: str) -> None:
+        with self._lock:
+            self._remove(chunk_id)
+
+    def _remove(self, chunk_id: str) -> None:
+        symbol = self._by_chunk.pop(chunk_id, None)
+        if symbol is None:
+            return
+        key = symbol.name.lower()
+        chunks = self._by_key[key]
+        del chunks[chunk_id]
+        if not chunks:
+            del self._by_key[key]
+            for gram in _trigrams(key):
+                names = self._grams[gram]
+                names.discard(key)
+                if not names:
+                    del self._grams[gram]
+            self._sorted = None
+
+    def _exact(self, name: str) -> list[tuple[float, Symbol]]:
+        symbols = self._by_key.get(name.lower(), {}).values()
+        return sorted(
+            ((1.0, s) for s in symbols),
+            key=lambda hit: (hit[1].name != name, hit[1].file_path, hit[1].start_line),
+        )
+
+    def _prefix(self, name: str, limit: int) -> list[tuple[float, Symbol]]:
+        if self._sorted is None:
+            self._sorted = sorted(self._by_key)
+        prefix = name.lower()
+        keys = []
+        i = bisect.bisect_left(self._sorted, prefix)
+        while i < len(self._sorted) and self._sorted[i].startswith(prefix) and len(keys) < limit:
+            keys.append(self._sorted[i])
+            i += 1
+        keys.sort(key=len)  # closest completions first
+        return [
+            (round(len(prefix) / len(key), 4), s)
+            for key in keys
+            for s in self._by_key[key].values()
+        ]
+
+    def _fuzzy(self, name: str, limit: int) -> list[tuple[float, Symbol]]:
+        query = _trigrams(name.lower())
+        shared = Counter(itertools.chain.from_iterable(self._grams.get(g, ()) for g in query))
+        # Dice coefficient; padding gives every key len(key) + 1 trigrams
+        base = len(query) + 1
+        scored = [
+            (score, key)
+            for key, n in shared.items()
+            if (score := 2 * n / (base + len(key))) >= FUZZY_MIN_SCORE
+        ]
+        scored.sort(key=lambda item: (-item[0], len(item[1])))
+        return [
+            (round(score, 4), s)
+            for score, key in scored[:limit]
+            for s in self._by_key[key].values()
+        ]
+
+    def lookup(self, name: str, mode: str = "auto", limit: int = 20) -> list[tuple[str, float, Symbol]]:
+        """Matching symbols as (match kind, score, symbol), best first.
+
+        ``auto`` returns exact matches, then prefix completions, then fuzzy
+        matches, until ``limit`` is reached.
+        """
+        with self._lock:
+            hits: list[tuple[str, float, Symbol]] = []
+            seen: set[Symbol] = set()
+            for kind in ("exact", "prefix", "fuzzy"):
+                if mode not in ("auto", kind) or len(hits) >= limit:
+                    continue
+                if kind == "exact":
+                    found = self._exact(name)
+                elif kind == "prefix":
+                    found = self._prefix(name, limit)
+                else:
+                    found = self._fuzzy(name, limit)
+                for score, symbol in found:
+                    if symbol not in seen:
+                        seen.add(symbol)
+                        hits.append((kind, score, symbol))
+            return hits[:limit]
+
+
+def get_symbol_table(col_name: str) -> SymbolTable:
+    """The symbol table of a collection, loaded from its lexical index on first use."""
+    index = get_lexical_index(col_name)
+    table = index.symbols
+    if table is None:
+        table = SymbolTable()
+        if not index.exists():
+            return table  # not indexed since the lexical index was added
+        index.attach_symbols(table)
+        table = index.symbols
+    return table
+
+
+def find_symbols(
+    name: str,
+    project_path: str | None = None,
+    mode: str = "auto",
+    limit: int = 20,
+    language: str | None = None,
+) -> list[dict]:
+    """Look up symbols by name in one project, or in every indexed project.
+
+    Returns dicts with symbol, file_path, start_line, end_line, language,
+    project_path, match ("exact", "prefix" or "fuzzy") and score.
+    """
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode: '{mode}'. Use one of: {', '.join(MATCH_MODES)}.")
+    name = name.strip()
+    if not name:
+        raise ValueError("Symbol name is empty.")
+    if project_path:
+        project_path = os.path.abspath(os.path.expanduser(project_path))
+        col_name = collection_name(project_path)
+        if get_collection_entry(col_name) is None:
+            raise ValueError(f"Project not indexed: {project_path}. Run index_project first.")
+        col_names = [col_name]
+    else:
+        col_names = [entry.name for entry in list_collection_entries()]
+
+    language = (language or "").lower()
+    # Over-fetch when filtering by language, which the tables do not index
+    fetch = limit * 4 if language else limit
+    tier = {"exact": 0, "prefix": 1, "fuzzy": 2}
+    hits = []
+    for col_name in col_names:
+        for kind, score, symbol in get_symbol_table(col_name).lookup(name, mode, fetch):
+            if not language or symbol.language == language:
+                hits.append((kind, score, symbol))
+    hits.sort(key=lambda h: (tier[h[0]], -h[1], h[2].name != name, len(h[2].name)))
+    return [
+        {
+            "symbol": symbol.name,
+            "file_path": symbol.file_path,
+            "start_line": symbol.start_line,
+            "end_line": symbol.end_line,
+            "language": symbol.language,
+            "project_path": symbol.project_path,
+            "match": kind,
+            "score": score,
+        }
+        for kind, score, symbol in hits[:limit]
+    ]
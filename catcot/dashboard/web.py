@@ -9,8 +9,9 @@ from functools import partial
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from pathlib import Path
 
-from catcot.config import CHROMA_DIR, MEMORY_DIR, get_chroma_client
-from catcot.core.embedder import get_provider_info
+from catcot.config import CHROMA_DIR, MEMORY_DIR
+from catcot.core.embedder import get_provider_health, get_provider_info
+from catcot.core.registry import list_collection_entries
 from catcot.features.memory import list_memories, get_memory_stats
 from catcot.features.savings import get_savings_summary
 
@@ -35,6 +36,8 @@ class DashboardHandler(SimpleHTTPRequestHandler):
             self._api_projects()
         elif self.path == "/api/savings":
             self._api_savings()
+        elif self.path == "/api/health":
+            self._api_health()
         elif self.path == "/api/embeddings":
             self._api_embeddings()
         elif self.path == "/api/memories":
@@ -65,6 +68,13 @@ class DashboardHandler(SimpleHTTPRequestHandler):
             status["embedding_model"] = provider["model"]
             status["embedding_dimensions"] = provider["dimensions"]
             status["embedding_detail"] = f"{provider['name']} — {provider['model']}"
+            health = get_provider_health()
+            fallback = health["fallback"]
+            status["embedding_circuit"] = health["state"]
+            status["embedding_failover"] = fallback is not None and fallback["state"] != "open"
+            if health["state"] != "closed":
+                via = f"using {fallback['provider']}" if status["embedding_failover"] else "no fallback"
+                status["embedding_detail"] += f" · {health['state'].replace('_', '-')}, {via}"
         except RuntimeError:
             status["embedding"] = False
             status["embedding_provider"] = None
@@ -72,8 +82,7 @@ class DashboardHandler(SimpleHTTPRequestHandler):
 
         # Check ChromaDB
         try:
-            client = get_chroma_client()
-            collections = client.list_collections()
+            collections = list_collection_entries()
             status["chromadb"] = True
             status["chroma_detail"] = f"{len(collections)} collection(s)"
         except Exception:
@@ -82,17 +91,22 @@ class DashboardHandler(SimpleHTTPRequestHandler):
 
         self._send_json(status)
 
+    def _api_health(self):
+        """Circuit-breaker state of the embedding provider and its fallback."""
+        try:
+            self._send_json(get_provider_health())
+        except RuntimeError as e:
+            self._send_json({"provider": None, "state": "unavailable", "error": str(e)})
+
     def _api_projects(self):
         try:
-            client = get_chroma_client()
-            collections = client.list_collections()
             projects = []
-            for col in collections:
-                meta = col.metadata or {}
+            for entry in list_collection_entries():
+                meta = entry.metadata
                 projects.append({
-                    "name": col.name,
+                    "name": entry.name,
                     "project_path": meta.get("project_path", "unknown"),
-                    "chunks": col.count(),
+                    "chunks": entry.count,
                     "embedding_provider": meta.get("embedding_provider", "ollama"),
                     "embedding_model": meta.get("embedding_model", "unknown"),
                 })
@@ -118,12 +132,10 @@ class DashboardHandler(SimpleHTTPRequestHandler):
     def _api_embeddings(self):
         """Return 2-D projected embeddings for all indexed code chunks."""
         try:
-            client = get_chroma_client()
-            collections = client.list_collections()
-
             points = []
-            for col in collections:
-                meta = col.metadata or {}
+            for entry in list_collection_entries():
+                col = entry.collection
+                meta = entry.metadata
                 project = meta.get("project_path", col.name)
 
                 # Fetch everything — embeddings + metadata
@@ -29,6 +29,15 @@ class GitStatus:
         return result
 
 
+@dataclass
+class GitChanges:
+    """Paths changed since a commit, relative to the project directory."""
+    changed: list[str] = field(default_factory=list)  # added, modified, renamed-to, untracked
+    deleted: list[str] = field(default_factory=list)  # deleted, renamed-from
+    # Every file git lists in the project now (tracked or untracked), minus ignored ones
+    present: set[str] = field(default_factory=set)
+
+
 async def _run_git(project_path: str, *args: str) -> tuple[int, str, str]:
     """Run a git command asynchronously in the given project directory.
 
@@ -68,6 +77,81 @@ async def get_git_root(project_path: str) -> str | None:
         return None
 
 
+async def get_head_commit(project_path: str) -> str | None:
+    """Full SHA of HEAD, or None (not a repo / no commits yet)."""
+    try:
+        rc, stdout, _ = await _run_git(project_path, "rev-parse", "--verify", "-q", "HEAD")
+        return stdout if rc == 0 and stdout else None
+    except Exception:
+        return None
+
+
+async def get_changes_since(project_path: str, commit: str) -> GitChanges | None:
+    """Files changed between ``commit`` and the working tree, plus untracked files.
+
+    ``git diff <commit>`` compares the commit with the working tree, so it
+    covers both ``<commit>..HEAD`` and uncommitted changes in one call.
+    ``present`` comes from ``git ls-files``, so callers can spot indexed
+    files git no longer lists (untracked files deleted since, files ignored
+    since) without touching the disk.
+    Paths are relative to project_path (which may be a repo subdirectory).
+    Returns None if the commit is no longer reachable (e.g. after a rebase).
+    """
+    try:
+        rc, _, _ = await _run_git(project_path, "cat-file", "-e", f"{commit}^{{commit}}")
+        if rc != 0:
+            return None
+        rc, stdout, _ = await _run_git(
+            project_path, "diff", "--name-status", "-z", "-M", "--relative", commit,
+        )
+        if rc != 0:
+            return None
+        # -t tags tracked files (H, S, M) and untracked ones (?)
+        rc, listed, _ = await _run_git(
+            project_path, "ls-files", "-z", "-t", "--cached", "--others", "--exclude-standard",
+        )
+        if rc != 0:
+            return None
+        rc, ignored, _ = await _run_git(
+            project_path, "ls-files", "-z", "--cached", "--ignored", "--exclude-standard",
+        )
+        if rc != 0:
+            return None
+    except Exception:
+        return None
+
+    changes = GitChanges()
+    fields = [f for f in stdout.split("\0") if f]
+    i = 0
+    while i < len(fields):
+        status = fields[i]
+        if status[:1] in ("R", "C") and i + 2 < len(fields):
+            old, new = fields[i + 1], fields[i + 2]
+            if status[0] == "R":
+                changes.deleted.append(old)
+            changes.changed.append(new)
+            i += 3
+            continue
+        if i + 1 >= len(fields):
+            break
+        path = fields[i + 1]
+        if status[:1] == "D":
+            changes.deleted.append(path)
+        else:
+            changes.changed.append(path)
+        i += 2
+
+    for entry in listed.split("\0"):
+        if not entry:
+            continue
+        tag, path = entry[:1], entry[2:]
+        changes.present.add(path)
+        if tag == "?":
+            changes.changed.append(path)
+    changes.present.difference_update(f for f in ignored.split("\0") if f)
+    return changes
+
+
 async def get_status(project_path: str) -> GitStatus:
     """Parse git status --porcelain to get file change categories."""
     rc, stdout, _ = await _run_git(project_path, "status", "--porcelain")
@@ -12,6 +12,7 @@ import uuid
 from pathlib import Path
 
 from catcot.config import MEMORY_DIR, get_chroma_client, memory_collection_name
+from catcot.core.registry import get_collection_entry, invalidate_collection
 from catcot.core.embedder import embed_texts, embed_query
 
 
@@ -80,6 +81,7 @@ async def _sync_to_chroma(project_path: str, memories: list[dict]) -> None:
         metadatas=metadatas,
         embeddings=embeddings,
     )
+    invalidate_collection(col_name)
 
 
 async def store_memory(
@@ -179,17 +181,16 @@ async def recall_memory(
 
     # Semantic search
     if query and memories:
-        client = get_chroma_client()
         col_name = memory_collection_name(project_path)
-        try:
-            collection = client.get_collection(col_name)
-        except Exception:
+        entry = get_collection_entry(col_name)
+        if entry is None:
             # Collection doesn't exist yet — rebuild
             await _sync_to_chroma(project_path, memories)
-            collection = client.get_collection(col_name)
+            entry = get_collection_entry(col_name)
+        collection = entry.collection
 
         query_embedding = await embed_query(query)
-        count = collection.count()
+        count = entry.count
         if count == 0:
             return []
 
@@ -266,6 +267,7 @@ async def delete_memory(project_path: str, key: str) -> bool:
         collection.delete(ids=deleted_ids)
     except Exception:
         pass
+    invalidate_collection(memory_collection_name(project_path))
 
     return True
 
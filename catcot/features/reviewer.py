@@ -8,6 +8,7 @@ from typing import Optional, Tuple
 
 import httpx
 
+from catcot.core.httpclient import client_timeout, get_http_client
 from catcot.core.searcher import search_code
 
 
@@ -235,13 +236,12 @@ async def _ollama_review(prompt: str, model: str = "deepseek-coder") -> Optional
         "stream": False,
     }
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(url, json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                text = data.get("response", "").strip()
-                return text if text else None
-            return None
+        response = await get_http_client().post(url, json=payload, timeout=client_timeout(read=120.0))
+        if response.status_code == 200:
+            data = response.json()
+            text = data.get("response", "").strip()
+            return text if text else None
+        return None
     except (httpx.ConnectError, httpx.TimeoutException, Exception):
         return None
 
@@ -266,22 +266,22 @@ async def _anthropic_review(
         "messages": [{"role": "user", "content": prompt}],
     }
     try:
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=payload,
-            )
-            if response.status_code == 200:
-                data = response.json()
-                content_blocks = data.get("content", [])
-                text = "".join(
-                    block.get("text", "")
-                    for block in content_blocks
-                    if block.get("type") == "text"
-                ).strip()
-                return text if text else None
-            return None
+        response = await get_http_client().post(
+            "https://api.anthropic.com/v1/messages",
+            headers=headers,
+            json=payload,
+            timeout=client_timeout(read=90.0),
+        )
+        if response.status_code == 200:
+            data = response.json()
+            content_blocks = data.get("content", [])
+            text = "".join(
+                block.get("text", "")
+                for block in content_blocks
+                if block.get("type") == "text"
+            ).strip()
+            return text if text else None
+        return None
     except (httpx.ConnectError, httpx.TimeoutException, Exception):
         return None
 
@@ -302,18 +302,18 @@ async def _openai_review(prompt: str, model: str = "gpt-4o") -> Optional[str]:
         "max_tokens": 4096,
     }
     try:
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-            )
-            if response.status_code == 200:
-                data = response.json()
-                choices = data.get("choices", [])
-                if choices:
-                    text = choices[0].get("message", {}).get("content", "").strip()
-                    return text if text else None
-            return None
+        response = await get_http_client().post(
+            "https://api.openai.com/v1/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=client_timeout(read=90.0),
+        )
+        if response.status_code == 200:
+            data = response.json()
+            choices = data.get("choices", [])
+            if choices:
+                text = choices[0].get("message", {}).get("content", "").strip()
+                return text if text else None
+        return None
     except (httpx.ConnectError, httpx.TimeoutException, Exception):
         return None
@@ -7,6 +7,7 @@ from datetime import datetime, date
 from pathlib import Path
 
 from catcot.config import BASE_DIR, SAVINGS_FILE
+from catcot.core.ignore import get_ignore_matcher
 
 # Token estimation: ~4 characters = 1 token
 CHARS_PER_TOKEN = 4
@@ -69,15 +70,9 @@ def _estimate_full_read_tokens(project_path: str) -> int:
     if not project_path or not os.path.isdir(project_path):
         return 50000  # fallback estimate: ~50k chars = 12.5k tokens
 
-    for root, dirs, files in os.walk(project_path):
-        # Skip hidden dirs and common non-code dirs
-        dirs[:] = [
-            d for d in dirs
-            if not d.startswith(".") and d not in {
-                "node_modules", "__pycache__", "venv", ".venv", "dist",
-                "build", ".git", ".svn", "vendor",
-            }
-        ]
+    # Same ignore rules as the indexer (gitignore + built-in dirs)
+    for rel_dir, files in get_ignore_matcher(project_path).walk():
+        root = os.path.join(project_path, rel_dir)
         for f in files:
             ext = os.path.splitext(f)[1].lower()
             if ext in supported:
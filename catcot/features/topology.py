@@ -9,7 +9,8 @@ import math
 import os
 from collections import defaultdict
 
-from catcot.config import collection_name, get_chroma_client
+from catcot.config import collection_name
+from catcot.core.registry import get_collection_entry
 
 
 def _cosine_similarity(a: list[float], b: list[float]) -> float:
@@ -147,17 +148,14 @@ async def generate_project_map(project_path: str) -> dict:
     """
     project_path = os.path.abspath(os.path.expanduser(project_path))
 
-    client = get_chroma_client()
-    col_name = collection_name(project_path)
-
-    try:
-        collection = client.get_collection(col_name)
-    except Exception:
+    entry = get_collection_entry(collection_name(project_path))
+    if entry is None:
         raise ValueError(
             f"Project not indexed: {project_path}. Run index_project first."
         )
+    collection = entry.collection
 
-    count = collection.count()
+    count = entry.count
     if count == 0:
         raise ValueError(
             f"Project has no indexed chunks: {project_path}. Run index_project first."
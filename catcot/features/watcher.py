@@ -1,7 +1,6 @@
 """Catcot file watcher — auto-indexes files on save using watchdog."""
 
 import asyncio
-import hashlib
 import os
 import threading
 import time
@@ -18,14 +17,19 @@ except ImportError:
     class FileSystemEventHandler:  # type: ignore
         pass
 
-from catcot.chunkers import get_chunker, Chunk
+from catcot.chunkers import get_chunker
 from catcot.config import collection_name, get_chroma_client
-from catcot.core.embedder import embed_texts, get_provider_info
+from catcot.core.embedder import get_provider_info
+from catcot.core.httpclient import close_http_client
+from catcot.core.lexical import get_lexical_index
+from catcot.core.registry import get_collection_entry, invalidate_collection
+from catcot.core.manifest import get_manifest
+from catcot.core.ignore import is_ignored_path
 from catcot.core.indexer import (
-    IGNORE_DIRS,
-    IGNORE_EXTENSIONS,
+    _apply_plan,
+    _decode,
     _file_hash,
-    _should_ignore,
+    _plan_file,
 )
 
 
@@ -47,7 +51,8 @@ async def _index_single_file(project_path: str, file_path: str) -> dict:
     """Re-index a single file. Returns stats dict.
     
     Handles chunking, embedding, and upserting to ChromaDB.
-    Removes old chunks for the file first.
+    Only chunks whose content changed are re-embedded; vanished chunks
+    are deleted by ID.
     """
     project_path = os.path.abspath(os.path.expanduser(project_path))
     file_path = os.path.abspath(os.path.expanduser(file_path))
@@ -57,34 +62,32 @@ async def _index_single_file(project_path: str, file_path: str) -> dict:
         # File was deleted
         return {"status": "file_deleted", "file_path": file_path}
     
-    if _should_ignore(path_obj):
+    if is_ignored_path(project_path, path_obj):
         return {"status": "ignored", "file_path": file_path}
     
     if not path_obj.is_file():
         return {"status": "not_a_file", "file_path": file_path}
     
-    if path_obj.stat().st_size > 500_000:  # MAX_FILE_SIZE
+    st = path_obj.stat()
+    if st.st_size > 500_000:  # MAX_FILE_SIZE
         return {"status": "too_large", "file_path": file_path}
     
     try:
-        content = path_obj.read_text(errors="ignore")
+        data = path_obj.read_bytes()
     except Exception as e:
         return {"status": "read_error", "file_path": file_path, "error": str(e)}
     
-    client = get_chroma_client()
-    col_name = collection_name(project_path)
-    
-    try:
-        collection = client.get_collection(col_name)
-    except Exception:
+    entry = get_collection_entry(collection_name(project_path))
+    if entry is None:
         return {
             "status": "project_not_indexed",
             "file_path": file_path,
             "message": "Project not indexed. Run index_project first.",
         }
+    collection = entry.collection
 
     # Check provider mismatch
-    col_meta = collection.metadata or {}
+    col_meta = entry.metadata
     stored_provider = col_meta.get("embedding_provider")
     current_provider = get_provider_info()["name"]
     if stored_provider and stored_provider != current_provider:
@@ -109,16 +112,16 @@ async def _index_single_file(project_path: str, file_path: str) -> dict:
             "message": f"File is not in project directory {project_path}",
         }
     
-    # Remove old chunks for this file
-    try:
-        collection.delete(where={"file_path": rel_path})
-    except Exception:
-        pass
+    manifest = get_manifest(project_path)
+    file_hash = _file_hash(data)
+    if manifest.get_hash(rel_path) == file_hash:
+        manifest.record(rel_path, st, file_hash)
+        return {"status": "unchanged", "file_path": file_path}
     
     # Chunk the file
     chunker = get_chunker(path_obj.suffix)
     try:
-        chunks = chunker.chunk(content, rel_path)
+        chunks = chunker.chunk(_decode(data), rel_path)
     except Exception as e:
         return {
             "status": "chunk_error",
@@ -126,61 +129,41 @@ async def _index_single_file(project_path: str, file_path: str) -> dict:
             "error": str(e),
         }
     
-    if not chunks:
+    # Diff against the indexed chunks: only new/changed chunks get embedded
+    try:
+        plan = _plan_file(collection, project_path, rel_path, file_hash, chunks)
+    except Exception as e:
         return {
-            "status": "no_chunks",
+            "status": "plan_error",
             "file_path": file_path,
+            "error": str(e),
         }
     
-    # Embed chunks
-    batch_ids: list[str] = []
-    batch_docs: list[str] = []
-    batch_metas: list[dict] = []
-    
-    file_hash = _file_hash(content)
-    
-    for i, chunk in enumerate(chunks):
-        chunk_id = f"{hashlib.md5(rel_path.encode()).hexdigest()[:8]}_{i}"
-        meta = {
-            "file_path": chunk.file_path,
-            "start_line": chunk.start_line,
-            "end_line": chunk.end_line,
-            "language": chunk.language or "",
-            "symbol_name": chunk.symbol_name or "",
-            "file_hash": file_hash,
-            "project_path": project_path,
-        }
-        batch_ids.append(chunk_id)
-        batch_docs.append(chunk.content)
-        batch_metas.append(meta)
-    
     try:
-        embeddings = await embed_texts(batch_docs)
+        await _apply_plan(collection, plan)
     except Exception as e:
         return {
-            "status": "embed_error",
+            "status": "embed_error" if isinstance(e, RuntimeError) else "upsert_error",
             "file_path": file_path,
             "error": str(e),
         }
     
-    try:
-        collection.upsert(
-            ids=batch_ids,
-            documents=batch_docs,
-            metadatas=batch_metas,
-            embeddings=embeddings,
-        )
-    except Exception as e:
+    manifest.record(rel_path, st, file_hash)
+    manifest.save()
+    
+    if not chunks:
         return {
-            "status": "upsert_error",
+            "status": "no_chunks",
             "file_path": file_path,
-            "error": str(e),
         }
     
     return {
         "status": "success",
         "file_path": file_path,
         "chunks_indexed": len(chunks),
+        "chunks_embedded": len(plan.add_ids),
+        "chunks_updated": len(plan.update_ids),
+        "chunks_deleted": len(plan.delete_ids),
     }
 
 
@@ -193,14 +176,20 @@ def _process_pending_files():
     if not pending:
         return
     
-    # Run async operations in an isolated loop (don't pollute global state)
-    try:
-        for file_path, info in pending.items():
-            project_path = info["project_path"]
-            asyncio.run(_index_single_file(project_path, file_path))
-    except Exception as e:
-        import sys
-        sys.stderr.write(f"[Catcot Watcher] Error processing {file_path}: {e}\n")
+    # Run async operations in an isolated loop (don't pollute global state);
+    # one loop per batch so its HTTP connections are reused, then closed.
+    async def process() -> None:
+        try:
+            for file_path, info in pending.items():
+                try:
+                    await _index_single_file(info["project_path"], file_path)
+                except Exception as e:
+                    import sys
+                    sys.stderr.write(f"[Catcot Watcher] Error processing {file_path}: {e}\n")
+        finally:
+            await close_http_client()
+
+    asyncio.run(process())
 
 
 class _FileWatcherHandler(FileSystemEventHandler):
@@ -214,10 +203,9 @@ class _FileWatcherHandler(FileSystemEventHandler):
             return
         
         file_path = event.src_path
-        path_obj = Path(file_path)
         
-        # Skip ignored files
-        if _should_ignore(path_obj):
+        # Skip ignored files (same gitignore rules as the indexer)
+        if is_ignored_path(self.project_path, file_path):
             return
         
         with _watcher_state.lock:
@@ -262,6 +250,12 @@ class _FileWatcherHandler(FileSystemEventHandler):
             collection.delete(where={"file_path": rel_path})
         except Exception:
             pass
+        invalidate_collection(col_name)
+        get_lexical_index(col_name).delete_files([rel_path])
+        
+        manifest = get_manifest(project_path)
+        manifest.remove(rel_path)
+        manifest.save()
 
 
 def start_watching(project_path: str) -> str:
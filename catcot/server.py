@@ -10,12 +10,35 @@ import json
 import os
 import sys
 import time
+from contextlib import asynccontextmanager
 
 from mcp.server import FastMCP
-
-from catcot.core.embedder import get_provider_info
-from catcot.core.indexer import index_project as do_index, list_indexed_projects as do_list
+from mcp.server.fastmcp import Context
+
+from catcot.core.embedder import (
+    get_batching_stats,
+    get_embedding_cache_stats,
+    get_provider_health,
+    get_query_cache_stats,
+    get_rate_limit_stats,
+    peek_provider_info,
+    resolve_dimensions,
+    resolve_provider_info,
+    start_provider_detection,
+)
+from catcot.core.httpclient import close_http_client
+from catcot.core.indexer import list_indexed_projects as do_list
+from catcot.core.jobs import (
+    IndexJob,
+    cancel_job,
+    get_job,
+    list_jobs,
+    resume_job,
+    start_index_job,
+    wait_for_job,
+)
 from catcot.core.searcher import search_code as do_search
+from catcot.core.symbols import find_symbols
 from catcot.features.savings import record_search, get_savings_summary
 from catcot.features.reviewer import code_review as do_review
 from catcot.features.git_tools import (
@@ -35,37 +58,134 @@ from catcot.features.memory import (
     delete_memory as do_delete_memory,
 )
 
-mcp = FastMCP("catcot")
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    """Close pooled HTTP connections when the server shuts down."""
+    try:
+        yield {}
+    finally:
+        await close_http_client()
+
+
+mcp = FastMCP("catcot", lifespan=_lifespan)
+
+
+async def _await_index_job(job: IndexJob, ctx: Context, wait_seconds: float) -> bool:
+    """Wait for a job while streaming MCP progress notifications."""
+    async def report(j: IndexJob) -> None:
+        p = j.progress()
+        try:
+            await ctx.report_progress(p["files_done"], p["files_total"] or None)
+        except Exception:
+            pass  # Progress is best-effort; the client may not support it
+    return await wait_for_job(job, wait_seconds, on_progress=report)
+
+
+def _format_job(job: IndexJob) -> str:
+    """Job summary: final stats when done, progress while running."""
+    if job.status == "completed":
+        stats = dict(job.stats)
+        stats["elapsed_seconds"] = round(job.finished_at - job.started_at, 1)
+        return json.dumps(stats, indent=2)
+    data = {
+        "job_id": job.id,
+        "project_path": job.project_path,
+        "status": job.status,
+        "mode": job.mode,
+        "reindex": job.reindex,
+        "progress": job.progress(),
+    }
+    if job.error:
+        data["error"] = job.error
+    if job.resumed_from:
+        data["resumed_from"] = job.resumed_from
+    return json.dumps(data, indent=2)
+
+
+def _match_label(result: dict) -> str:
+    """How a search hit matched: its vector similarity, or keyword-only."""
+    if result["similarity"] is None:
+        return "keyword match"
+    return f"similarity: {result['similarity']}"
+
+
+async def _index_tool(
+    path: str,
+    ctx: Context,
+    wait_seconds: float,
+    reindex: bool = False,
+    mode: str = "auto",
+    dimensions: int = 0,
+) -> str:
+    try:
+        provider = await resolve_provider_info()
+    except RuntimeError as e:
+        return f"[Catcot] Error: {e}"
+    action = "Re-indexing" if reindex else "Indexing"
+    sys.stderr.write(f"[Catcot] {action} {path} using {provider['name']} ({provider['model']})\n")
+    try:
+        if dimensions:
+            resolve_dimensions(dimensions)  # reject unsupported sizes before starting a job
+        job = start_index_job(path, reindex=reindex, mode=mode, dimensions=dimensions or None)
+    except ValueError as e:
+        return f"[Catcot] Error: {e}"
+    await _await_index_job(job, ctx, wait_seconds)
+
+    if job.status == "completed":
+        job.stats["embedding_provider"] = provider["name"]
+        job.stats["embedding_model"] = provider["model"]
+        elapsed = job.finished_at - job.started_at
+        sys.stderr.write(
+            f"[Catcot] Indexed {job.stats['files_indexed']} files, "
+            f"{job.stats['chunks_created']} chunks in {elapsed:.1f}s\n"
+        )
+        result = _format_job(job)
+        return f"[Catcot] Re-indexed from scratch:\n{result}" if job.reindex else result
+    if job.status == "failed":
+        return f"[Catcot] Error: {job.error}"
+    return (
+        f"[Catcot] Indexing continues in the background as job {job.id}. "
+        f"Check it with index_job(job_id=\"{job.id}\").\n{_format_job(job)}"
+    )
 
 
 @mcp.tool()
-async def index_project(path: str) -> str:
+async def index_project(
+    path: str, ctx: Context, mode: str = "auto", wait_seconds: float = 30, dimensions: int = 0,
+) -> str:
     """Index a project directory for Catcot semantic code search.
 
     Scans files, splits into meaningful chunks (by class/function/etc.),
     embeds them using the active embedding provider, and stores in ChromaDB.
     Skips unchanged files on subsequent runs.
 
+    Indexing runs as a background job. If it takes longer than wait_seconds
+    the job ID is returned; use index_job to follow or cancel it.
+
     Args:
         path: Absolute path to the project directory to index.
+        mode: "auto" (default), "git" to only process files git reports as
+              changed since the last indexed commit, or "walk" to scan the
+              whole tree.
+        wait_seconds: How long to wait for the job before returning (default: 30).
+        dimensions: Reduced embedding size for a new index (Matryoshka models
+                    only, e.g. 256 or 512); 0 = CATCOT_EMBED_DIMENSIONS or full size.
+                    An existing index keeps its size; re-index to change it.
     """
-    provider = get_provider_info()
-    sys.stderr.write(f"[Catcot] Indexing {path} using {provider['name']} ({provider['model']})\n")
-    t0 = time.time()
-    stats = await do_index(path)
-    elapsed = time.time() - t0
-    stats["embedding_provider"] = provider["name"]
-    stats["embedding_model"] = provider["model"]
-    stats["elapsed_seconds"] = round(elapsed, 1)
-    sys.stderr.write(
-        f"[Catcot] Indexed {stats['files_indexed']} files, "
-        f"{stats['chunks_created']} chunks in {elapsed:.1f}s\n"
-    )
-    return json.dumps(stats, indent=2)
+    return await _index_tool(path, ctx, wait_seconds, mode=mode, dimensions=dimensions)
 
 
 @mcp.tool()
-async def search_code(query: str, project_path: str = "", top_k: int = 5) -> str:
+async def search_code(
+    query: str,
+    project_path: str = "",
+    top_k: int = 5,
+    deadline: float = 0,
+    files: list[str] | None = None,
+    path: str = "",
+    language: str = "",
+    symbol: str = "",
+) -> str:
     """Catcot semantic code search -- find relevant code using natural language.
 
     Returns the most relevant code chunks with file paths, line numbers,
@@ -76,14 +196,27 @@ async def search_code(query: str, project_path: str = "", top_k: int = 5) -> str
         query: Natural language query or code pattern to search for.
         project_path: Optional: limit search to a specific project path.
         top_k: Number of results to return (default: 5).
+        deadline: Seconds the whole search may wait for project indexes;
+                  ones that have not answered by then are skipped and
+                  listed. 0 = CATCOT_SEARCH_DEADLINE or no limit.
+        files: Optional: only search these files (paths relative to the project).
+        path: Optional: only search this file or directory (e.g. "src/api")
+              or matching this glob (e.g. "tests/*_test.py").
+        language: Optional: only search chunks in this language (e.g. "python").
+        symbol: Optional: only search chunks for this exact symbol name.
     """
-    provider = get_provider_info()
+    provider = await resolve_provider_info()
     sys.stderr.write(f"[Catcot] Searching: \"{query}\" via {provider['name']}\n")
     t0 = time.time()
     results = await do_search(
         query=query,
         project_path=project_path or None,
         top_k=top_k,
+        deadline=deadline or None,
+        files=files,
+        path=path,
+        language=language,
+        symbol=symbol,
     )
     elapsed = time.time() - t0
     sys.stderr.write(f"[Catcot] Found {len(results)} results in {elapsed:.2f}s\n")
@@ -100,41 +233,89 @@ async def search_code(query: str, project_path: str = "", top_k: int = 5) -> str
         formatted.append(
             f"### {r['file_path']}:{r['start_line']}-{r['end_line']}"
             f" ({r['symbol_name'] or 'chunk'})"
-            f" [similarity: {r['similarity']}]\n"
+            f" [{_match_label(r)}]\n"
             f"```{r['language']}\n{r['content']}\n```"
         )
+    skipped_note = ""
+    if results.skipped:
+        skipped_note = "Skipped: " + ", ".join(
+            f"{s['project_path']} ({s['reason']})" for s in results.skipped
+        ) + "\n"
     if not formatted:
-        return "[Catcot] No results found."
+        return ("[Catcot] No results found.\n" + skipped_note).rstrip()
 
     header = (
         f"[Catcot] Found {len(results)} results "
-        f"(saved ~{savings['tokens_saved']:,} tokens, ~${savings['dollars_saved']:.4f})\n\n"
+        f"(saved ~{savings['tokens_saved']:,} tokens, ~${savings['dollars_saved']:.4f})\n"
+        f"{skipped_note}\n"
     )
     return header + "\n\n".join(formatted)
 
 
 @mcp.tool()
-async def reindex_project(path: str) -> str:
+async def reindex_project(path: str, ctx: Context, wait_seconds: float = 30, dimensions: int = 0) -> str:
     """Re-index a project from scratch with Catcot. Deletes existing index and rebuilds.
 
     Use when files have changed significantly or index seems stale.
+    Runs as a background job, like index_project.
 
     Args:
         path: Absolute path to the project directory to re-index.
+        wait_seconds: How long to wait for the job before returning (default: 30).
+        dimensions: Reduced embedding size (Matryoshka models only, e.g. 256 or
+                    512); 0 = CATCOT_EMBED_DIMENSIONS or full size.
     """
-    provider = get_provider_info()
-    sys.stderr.write(f"[Catcot] Re-indexing {path} from scratch using {provider['name']} ({provider['model']})\n")
-    t0 = time.time()
-    stats = await do_index(path, reindex=True)
-    elapsed = time.time() - t0
-    stats["embedding_provider"] = provider["name"]
-    stats["embedding_model"] = provider["model"]
-    stats["elapsed_seconds"] = round(elapsed, 1)
-    sys.stderr.write(
-        f"[Catcot] Re-indexed {stats['files_indexed']} files, "
-        f"{stats['chunks_created']} chunks in {elapsed:.1f}s\n"
-    )
-    return f"[Catcot] Re-indexed from scratch:\n{json.dumps(stats, indent=2)}"
+    return await _index_tool(path, ctx, wait_seconds, reindex=True, dimensions=dimensions)
+
+
+@mcp.tool()
+async def index_job(ctx: Context, job_id: str = "", action: str = "status", wait_seconds: float = 0) -> str:
+    """Check, cancel or resume a background indexing job.
+
+    Args:
+        job_id: Job ID returned by index_project / reindex_project. Leave
+                empty with action "status" to list recent jobs.
+        action: "status" (default), "cancel", or "resume" (continue an
+                interrupted, cancelled or failed job from its last written batch).
+        wait_seconds: For "status" and "resume": wait up to this long for
+                      the job to finish, streaming progress (default: 0).
+    """
+    if action == "status" and not job_id:
+        jobs = list_jobs()[:10]
+        if not jobs:
+            return "[Catcot] No indexing jobs."
+        lines = ["[Catcot] Recent indexing jobs:"]
+        for j in jobs:
+            p = j.progress()
+            lines.append(
+                f"  - {j.id} [{j.status}] {j.project_path} "
+                f"({p['files_done']}/{p['files_total']} files, {p['percent']}%)"
+            )
+        return "\n".join(lines)
+
+    if action == "resume":
+        try:
+            job = resume_job(job_id)
+        except ValueError as e:
+            return f"[Catcot] Error: {e}"
+    else:
+        job = get_job(job_id)
+        if job is None:
+            return f"[Catcot] Error: Unknown index job: {job_id}"
+
+    if action == "cancel":
+        if not cancel_job(job_id):
+            if not job.done and not job.local:
+                return f"[Catcot] Job {job_id} runs in another Catcot process (pid {job.pid}); cancel it there."
+            return f"[Catcot] Job {job_id} is not running (status: {job.status})."
+        await wait_for_job(job, 5)
+        return f"[Catcot] Cancelled job {job_id}. Resume it with index_job(job_id=\"{job_id}\", action=\"resume\").\n{_format_job(job)}"
+    if action not in ("status", "resume"):
+        return f"[Catcot] Unknown action: '{action}'. Use 'status', 'cancel', or 'resume'."
+
+    if wait_seconds > 0:
+        await _await_index_job(job, ctx, wait_seconds)
+    return f"[Catcot] Job {job.id} ({job.status}):\n{_format_job(job)}"
 
 
 @mcp.tool()
@@ -143,8 +324,12 @@ async def list_indexed_projects() -> str:
     projects = do_list()
     if not projects:
         return "[Catcot] No projects indexed yet."
-    provider = get_provider_info()
-    header = f"[Catcot] Active provider: {provider['name']} ({provider['model']})\n\n"
+    # Listing needs no embeddings: don't wait for provider detection
+    provider = peek_provider_info()
+    if provider is None:
+        header = "[Catcot] Active provider: (detecting)\n\n"
+    else:
+        header = f"[Catcot] Active provider: {provider['name']} ({provider['model']})\n\n"
     return header + json.dumps(projects, indent=2)
 
 
@@ -155,12 +340,17 @@ async def get_embedding_status() -> str:
     Use this to check which embedding provider Catcot is currently using.
     """
     try:
-        provider = get_provider_info()
+        provider = await resolve_provider_info()
         return json.dumps({
             "provider": provider["name"],
             "model": provider["model"],
             "dimensions": provider["dimensions"],
             "status": "active",
+            "health": get_provider_health(),
+            "embedding_cache": get_embedding_cache_stats(),
+            "query_cache": get_query_cache_stats(),
+            "batching": get_batching_stats(),
+            "rate_limit": get_rate_limit_stats(),
         }, indent=2)
     except RuntimeError as e:
         return json.dumps({
@@ -188,6 +378,52 @@ async def code_review(file_path: str, context: str = "", model: str = "auto") ->
     return f"[Catcot Review]\n\n{result}"
 
 
+@mcp.tool()
+async def find_symbol(
+    name: str,
+    project_path: str = "",
+    match: str = "auto",
+    top_k: int = 20,
+    language: str = "",
+) -> str:
+    """Find where a class, function or other declaration is defined, by name.
+
+    Looks the name up in the project's symbol table instead of running a
+    semantic search, so it answers instantly and needs no embedding call.
+    Use search_code for questions about behaviour; use this when you know
+    (part of) the name, e.g. "UserRepository" or "parse_conf".
+
+    Args:
+        name: Symbol name, or its beginning / an approximate spelling.
+        project_path: Optional: limit the lookup to a specific project path.
+        match: "exact", "prefix", "fuzzy", or "auto" (exact, then prefix,
+               then fuzzy matches).
+        top_k: Maximum number of symbols to return (default: 20).
+        language: Optional: only symbols in this language (e.g. "python").
+    """
+    t0 = time.perf_counter()
+    try:
+        hits = find_symbols(name, project_path or None, match, top_k, language or None)
+    except ValueError as e:
+        return f"[Catcot] Error: {e}"
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    sys.stderr.write(f"[Catcot] Symbol lookup \"{name}\": {len(hits)} hits in {elapsed_ms:.2f}ms\n")
+    if not hits:
+        return (
+            f"[Catcot] No symbols matching '{name}'. Symbols of projects indexed "
+            f"before symbol lookup existed appear after the next index_project run."
+        )
+    lines = [f"[Catcot] {len(hits)} symbol(s) matching '{name}':\n"]
+    for h in hits:
+        location = os.path.join(h["project_path"], h["file_path"]) if h["project_path"] else h["file_path"]
+        score = "" if h["match"] == "exact" else f", score {h['score']}"
+        lines.append(
+            f"- `{h['symbol']}` — {location}:{h['start_line']}-{h['end_line']}"
+            f" ({h['language'] or 'unknown'}, {h['match']}{score})"
+        )
+    return "\n".join(lines)
+
+
 # ---------------------------------------------------------------------------
 # Feature: Git Integration
 # ---------------------------------------------------------------------------
@@ -222,20 +458,15 @@ async def search_modified_files(
     if not modified_files:
         return "[Catcot] No modified files found in working directory or recent commits."
 
-    # Search across the entire project
-    all_results = await do_search(
+    # The file filter is applied inside the vector query, so all top_k
+    # results come from modified files
+    filtered = await do_search(
         query=query,
         project_path=project_path,
-        top_k=top_k * 3,  # Fetch more to filter down
+        top_k=top_k,
+        files=modified_files,
     )
 
-    # Filter results to only modified files
-    modified_set = set(modified_files)
-    filtered = [
-        r for r in all_results
-        if r.get("file_path", "") in modified_set
-    ][:top_k]
-
     if not filtered:
         # Return the list of modified files even if no semantic matches
         files_list = "\n".join(f"  - {f}" for f in modified_files[:20])
@@ -252,7 +483,7 @@ async def search_modified_files(
         formatted.append(
             f"### {r['file_path']}:{r['start_line']}-{r['end_line']}"
             f" ({r['symbol_name'] or 'chunk'})"
-            f" [similarity: {r['similarity']}]\n"
+            f" [{_match_label(r)}]\n"
             f"```{r['language']}\n{r['content']}\n```"
         )
 
@@ -320,7 +551,7 @@ async def review_diff(project_path: str, staged: bool = False) -> str:
                     seen_context_files.add(ctx_file)
                     context_sections.append(
                         f"**{ctx_file}:{r['start_line']}-{r['end_line']}** "
-                        f"({r['symbol_name'] or 'chunk'}, similarity: {r['similarity']})\n"
+                        f"({r['symbol_name'] or 'chunk'}, {_match_label(r)})\n"
                         f"```{r['language']}\n{r['content'][:500]}\n```"
                     )
         except Exception:
@@ -638,14 +869,7 @@ async def delete_project_memory(project_path: str, key: str) -> str:
 def main():
     """Entry point for running the Catcot MCP server."""
     from catcot.dashboard.web import start_dashboard
-    try:
-        provider = get_provider_info()
-        sys.stderr.write(
-            f"[Catcot] Embedding provider: {provider['name']} "
-            f"(model: {provider['model']}, dims: {provider['dimensions']})\n"
-        )
-    except RuntimeError as e:
-        sys.stderr.write(f"[Catcot] Warning: {e}\n")
+    start_provider_detection()
     port = start_dashboard(open_browser=True)
     sys.stderr.write(f"[Catcot] Dashboard running at http://localhost:{port}\n")
     mcp.run(transport="stdio")
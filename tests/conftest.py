@@ -0,0 +1,58 @@
+"""Shared test setup.
+
+Catcot derives its data directory (BASE_DIR) from HOME at import time, so
+HOME is pointed at a throwaway directory before any catcot module loads.
+"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+import uuid
+
+import pytest
+
+os.environ["HOME"] = tempfile.mkdtemp(prefix="catcot-tests-")
+os.environ["CATCOT_EMBED_CACHE"] = "0"
+
+
+@pytest.fixture
+def collection():
+    """An empty in-memory Chroma collection."""
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    yield client.create_collection(name)
+    client.delete_collection(name)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """An empty git repository; call it with args to run git inside it."""
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=tmp_path, check=True, capture_output=True, text=True,
+        ).stdout.strip()
+
+    git("init", "-q")
+    git.path = tmp_path
+    return git
+
+
+async def _hash_embed(client, texts):
+    return [[b / 255 for b in hashlib.sha256(t.encode()).digest()[:8]] for t in texts]
+
+
+@pytest.fixture
+def offline_provider(monkeypatch):
+    """A deterministic embedding provider (and regex chunkers): no network, no models."""
+    import catcot.chunkers
+    from catcot.core import embedder
+
+    monkeypatch.setattr(catcot.chunkers, "_treesitter_available", False)
+    monkeypatch.setattr(
+        embedder, "_PROVIDER_CACHE",
+        embedder._EmbeddingProvider(name="test-hash", dimensions=8, model="hash", embed=_hash_embed),
+    )
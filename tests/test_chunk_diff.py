@@ -0,0 +1,68 @@
+from catcot.chunkers import Chunk
+from catcot.core.indexer import _chunk_ids, _chunk_meta, _plan_file
+
+
+def _chunks(*specs):
+    """Chunks of a.py from (content, start_line) pairs."""
+    return [
+        Chunk(content=content, file_path="a.py", start_line=start,
+              end_line=start + content.count("\n"), symbol_name=content.split("(")[0][4:],
+              language="python")
+        for content, start in specs
+    ]
+
+
+def _store(collection, chunks, file_hash="h1"):
+    ids = _chunk_ids("a.py", chunks)
+    collection.upsert(
+        ids=ids,
+        documents=[c.content for c in chunks],
+        metadatas=[_chunk_meta(c, file_hash, "/proj") for c in chunks],
+        embeddings=[[0.1, 0.2, 0.3]] * len(chunks),
+    )
+    return ids
+
+
+def test_chunk_ids_depend_on_path_and_content_only():
+    a = _chunks(("def f(): pass", 1), ("def g(): pass", 3))
+    moved = _chunks(("def g(): pass", 1), ("def f(): pass", 5))
+    assert set(_chunk_ids("a.py", a)) == set(_chunk_ids("a.py", moved))
+    assert _chunk_ids("a.py", a) != _chunk_ids("b.py", a)
+
+
+def test_chunk_ids_disambiguate_duplicate_content():
+    ids = _chunk_ids("a.py", _chunks(("def f(): pass", 1), ("def f(): pass", 3)))
+    assert len(set(ids)) == 2
+    assert ids[1] == ids[0] + "_1"
+
+
+def test_plan_new_file_adds_every_chunk(collection):
+    chunks = _chunks(("def f(): pass", 1), ("def g(): pass", 3))
+    plan = _plan_file(collection, "/proj", "a.py", "h1", chunks, indexed_before=False)
+    assert plan.add_ids == _chunk_ids("a.py", chunks)
+    assert plan.add_docs == [c.content for c in chunks]
+    assert not plan.update_ids and not plan.delete_ids
+
+
+def test_plan_unchanged_file_is_noop(collection):
+    chunks = _chunks(("def f(): pass", 1), ("def g(): pass", 3))
+    _store(collection, chunks)
+    assert _plan_file(collection, "/proj", "a.py", "h1", chunks).is_noop
+
+
+def test_plan_diffs_added_moved_and_deleted_chunks(collection):
+    f, g, h = ("def f(): pass", 1), ("def g(): pass", 3), ("def h(): pass", 5)
+    old_ids = _store(collection, _chunks(f, g, h))
+
+    # g deleted, f moved down two lines, k added
+    new = _chunks(("def k(): pass", 1), ("def f(): pass", 3), h)
+    plan = _plan_file(collection, "/proj", "a.py", "h2", new)
+    new_ids = _chunk_ids("a.py", new)
+
+    assert plan.add_ids == [new_ids[0]]
+    assert plan.add_docs == ["def k(): pass"]
+    # f moved and h is unchanged but the file hash changed: metadata-only updates
+    assert plan.update_ids == [old_ids[0], old_ids[2]]
+    assert plan.update_metas[0]["start_line"] == 3
+    assert plan.delete_ids == [old_ids[1]]
+    assert plan.chunk_count == 3
@@ -0,0 +1,76 @@
+import pytest
+
+from catcot.core import embedder
+from catcot.core.embedder import _truncate, collection_dimensions, resolve_dimensions
+
+
+async def _unused(client, texts):
+    raise AssertionError("no embedding expected")
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Make a provider active: provider(model, dimensions)."""
+    monkeypatch.delenv("CATCOT_EMBED_DIMENSIONS", raising=False)
+
+    def use(model: str = "nomic-embed-text", dimensions: int = 768):
+        monkeypatch.setattr(
+            embedder, "_PROVIDER_CACHE",
+            embedder._EmbeddingProvider(name="ollama", dimensions=dimensions, model=model, embed=_unused),
+        )
+    use()
+    return use
+
+
+def test_defaults_to_full_size_when_unset(provider):
+    assert resolve_dimensions(None) == 768
+    assert resolve_dimensions(0) == 768
+
+
+def test_defaults_to_full_size_for_non_matryoshka_models(provider):
+    provider("all-minilm", 384)
+    assert resolve_dimensions(None) == 384
+
+
+def test_reads_the_environment_default(provider, monkeypatch):
+    monkeypatch.setenv("CATCOT_EMBED_DIMENSIONS", "256")
+    assert resolve_dimensions(None) == 256
+    assert resolve_dimensions(512) == 512  # an explicit size wins
+
+
+def test_empty_environment_value_means_full_size(provider, monkeypatch):
+    monkeypatch.setenv("CATCOT_EMBED_DIMENSIONS", "")
+    assert resolve_dimensions(None) == 768
+
+
+def test_rejects_invalid_sizes(provider, monkeypatch):
+    with pytest.raises(ValueError, match="between 1 and 768"):
+        resolve_dimensions(1024)
+    with pytest.raises(ValueError, match="between 1 and 768"):
+        resolve_dimensions(-5)
+    monkeypatch.setenv("CATCOT_EMBED_DIMENSIONS", "small")
+    with pytest.raises(ValueError, match="must be an integer"):
+        resolve_dimensions(None)
+
+
+def test_rejects_reduction_for_non_matryoshka_models(provider):
+    provider("all-minilm", 384)
+    assert resolve_dimensions(384) == 384
+    with pytest.raises(ValueError, match="does not support reduced dimensions"):
+        resolve_dimensions(128)
+
+
+def test_model_tag_is_ignored_for_matryoshka_support(provider):
+    provider("nomic-embed-text:latest", 768)
+    assert resolve_dimensions(256) == 256
+
+
+def test_collection_dimensions(provider):
+    assert collection_dimensions(None) is None
+    assert collection_dimensions({"embedding_dimensions": 256}) == 256
+    assert collection_dimensions({"embedding_dimensions": 768}) is None
+
+
+def test_truncate_keeps_leading_dimensions_normalized():
+    assert _truncate([[3.0, 4.0, 12.0]], 2) == [[0.6, 0.8]]
+    assert _truncate([[1.0, 2.0]], 4) == [[1.0, 2.0]]
@@ -0,0 +1,49 @@
+import asyncio
+import json
+import os
+import tempfile
+
+import pytest
+
+from catcot.core import embed_daemon
+
+
+@pytest.fixture
+def daemon_reply(monkeypatch):
+    """Run a fake daemon that answers every request with the given raw line."""
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="catcot-"), "embed.sock")
+    monkeypatch.setattr(embed_daemon, "EMBED_DAEMON_SOCKET", socket_path)
+    monkeypatch.setattr(embed_daemon, "_unavailable_until", 0.0)
+    monkeypatch.setenv("CATCOT_EMBED_DAEMON", "1")
+
+    def embed(reply: bytes):
+        async def handle(reader, writer):
+            await reader.readline()
+            writer.write(reply)
+            await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_unix_server(handle, path=socket_path)
+            async with server:
+                return await embed_daemon.embed_via_daemon("m", ["text"])
+        return asyncio.run(run())
+    return embed
+
+
+def test_valid_reply_is_decoded(daemon_reply):
+    reply = json.dumps({"vectors": embed_daemon._encode([[1.0, 2.0]]), "dim": 2}).encode() + b"\n"
+    assert daemon_reply(reply) == [[1.0, 2.0]]
+    assert embed_daemon._unavailable_until == 0.0
+
+
+@pytest.mark.parametrize("reply", [b'{"vectors": [\n', b'{"dim": 8}\n', b"[1, 2]\n", b""])
+def test_garbled_reply_counts_as_unreachable(daemon_reply, reply, capsys):
+    assert daemon_reply(reply) is None
+    assert embed_daemon._unavailable_until > 0
+    assert "bad reply" in capsys.readouterr().err
+
+
+def test_daemon_error_still_raises(daemon_reply):
+    with pytest.raises(RuntimeError, match="Embedding daemon error: boom"):
+        daemon_reply(b'{"error": "boom"}\n')
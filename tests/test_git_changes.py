@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+
+from catcot.core.ignore import IgnoreMatcher
+from catcot.core.indexer import _collect_git_changes, _find_vanished, index_project
+from catcot.core.manifest import Manifest
+from catcot.features.git_tools import get_changes_since, get_head_commit
+
+
+def _write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def _changes_since(git, commit):
+    return asyncio.run(get_changes_since(str(git.path), commit))
+
+
+def _base_commit(git, *files):
+    for rel in files:
+        _write(git.path, rel, f"# {rel}\n")
+    git("add", "-A")
+    git("commit", "-qm", "base")
+    return asyncio.run(get_head_commit(str(git.path)))
+
+
+def test_changes_since_reports_modified_added_deleted_and_untracked(git_repo):
+    base = _base_commit(git_repo, "a.py", "b.py", "c.py")
+    _write(git_repo.path, "a.py", "# changed\n")
+    git_repo("rm", "-q", "b.py")
+    _write(git_repo.path, "d.py", "# new\n")
+    git_repo("add", "d.py")
+    git_repo("commit", "-qm", "more")
+    _write(git_repo.path, "e.py", "# untracked\n")
+    (git_repo.path / "c.py").unlink()  # deleted, not yet committed
+
+    changes = _changes_since(git_repo, base)
+    assert sorted(changes.changed) == ["a.py", "d.py", "e.py"]
+    assert sorted(changes.deleted) == ["b.py", "c.py"]
+
+
+def test_changes_since_splits_renames_into_delete_and_add(git_repo):
+    base = _base_commit(git_repo, "old/name.py")
+    (git_repo.path / "new").mkdir()
+    git_repo("mv", "old/name.py", "new/name.py")
+
+    changes = _changes_since(git_repo, base)
+    assert changes.changed == ["new/name.py"]
+    assert changes.deleted == ["old/name.py"]
+
+
+def test_changes_since_is_relative_to_a_subdirectory(git_repo):
+    base = _base_commit(git_repo, "pkg/a.py", "other/b.py")
+    _write(git_repo.path, "pkg/a.py", "# changed\n")
+    _write(git_repo.path, "other/b.py", "# changed\n")
+
+    changes = asyncio.run(get_changes_since(str(git_repo.path / "pkg"), base))
+    assert changes.changed == ["a.py"]
+
+
+def test_changes_since_unknown_commit_returns_none(git_repo):
+    _base_commit(git_repo, "a.py")
+    assert _changes_since(git_repo, "0" * 40) is None
+
+
+def _manifest_for(root, *rels):
+    manifest = Manifest(str(root))
+    for rel in rels:
+        manifest.record(rel, os.stat(root / rel), f"hash-{rel}")
+    return manifest
+
+
+def test_git_mode_vanished_includes_untracked_deletions_and_new_ignores(git_repo):
+    root = git_repo.path
+    base = _base_commit(git_repo, "a.py", "b.py", "c.py")
+    _write(root, "scratch.py", "# untracked, indexed\n")
+    manifest = _manifest_for(root, "a.py", "b.py", "c.py", "scratch.py")
+
+    (root / "scratch.py").unlink()   # never tracked: git diff does not report it
+    _write(root, ".gitignore", "b.py\n")
+    git_repo("rm", "-q", "c.py")
+
+    changes = _changes_since(git_repo, base)
+    assert "scratch.py" not in changes.deleted
+    matcher = IgnoreMatcher(str(root))
+    files = _collect_git_changes(root, changes, matcher)
+    vanished = _find_vanished(root, manifest, files, changes)
+    assert sorted(vanished) == ["b.py", "c.py", "scratch.py"]
+
+
+def test_walk_mode_vanished_is_manifest_minus_files_seen(tmp_path):
+    _write(tmp_path, "a.py", "# a\n")
+    _write(tmp_path, "b.py", "# b\n")
+    manifest = _manifest_for(tmp_path, "a.py", "b.py")
+    (tmp_path / "b.py").unlink()
+
+    files = [(tmp_path / "a.py", os.stat(tmp_path / "a.py"))]
+    vanished = _find_vanished(tmp_path, manifest, files, None)
+    assert vanished == ["b.py"]
+
+
+def test_changes_since_present_excludes_ignored_and_deleted_untracked(git_repo):
+    base = _base_commit(git_repo, "a.py", "b.py")
+    _write(git_repo.path, "new.py", "# untracked\n")
+    _write(git_repo.path, "debug.log", "")
+    _write(git_repo.path, ".gitignore", "*.log\nb.py\n")
+
+    changes = _changes_since(git_repo, base)
+    assert changes.present == {"a.py", "new.py", ".gitignore"}
+
+
+def test_noop_git_mode_is_not_slower_than_a_walk(git_repo, offline_provider):
+    for i in range(1200):
+        _write(git_repo.path, f"pkg{i % 30}/sub{i % 5}/m{i}.py", f"x{i} = {i}\n")
+    for j in range(30):
+        _write(git_repo.path, f"pkg{j}/.gitignore", "*.tmp\n")
+    git_repo("add", "-A")
+    git_repo("commit", "-qm", "base")
+    project = str(git_repo.path)
+
+    async def best_of(mode, runs=3):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            stats = await index_project(project, mode=mode)
+            times.append(time.perf_counter() - start)
+            assert stats["mode"] == mode and stats["files_indexed"] == 0
+        return min(times)
+
+    async def compare():
+        await index_project(project)
+        return await best_of("git"), await best_of("walk")
+
+    git_time, walk_time = asyncio.run(compare())
+    assert git_time <= walk_time, f"git {git_time:.3f}s vs walk {walk_time:.3f}s"
@@ -0,0 +1,175 @@
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from catcot.core import embedder, health
+from catcot.core.health import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderUnavailableError,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(now=1000.0, time=time.time)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(health, "time", fake)
+    return fake
+
+
+def _trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure(RuntimeError("down"))
+
+
+def test_opens_after_consecutive_failures_only(clock):
+    breaker = CircuitBreaker("p", failure_threshold=3, cooldown=30)
+    breaker.record_failure(RuntimeError("a"))
+    breaker.record_failure(RuntimeError("b"))
+    breaker.record_success()  # resets the streak
+    breaker.record_failure(RuntimeError("c"))
+    breaker.record_failure(RuntimeError("d"))
+    assert breaker.state == CLOSED
+
+    breaker.record_failure(RuntimeError("e"))
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    assert breaker.last_error == "e"
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+    assert breaker.retry_in() == 30
+
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker("p", failure_threshold=2, cooldown=30)
+    _trip(breaker)
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # probe already claimed
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker("p", failure_threshold=2, cooldown=30)
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_for_another_cooldown(clock):
+    breaker = CircuitBreaker("p", failure_threshold=2, cooldown=30)
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure(RuntimeError("still down"))
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    assert breaker.retry_in() == 30
+
+
+def test_released_probe_can_be_claimed_again(clock):
+    breaker = CircuitBreaker("p", failure_threshold=1, cooldown=30)
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def _provider(embed, **kwargs) -> embedder._EmbeddingProvider:
+    # Unique names give every test fresh breakers and batch sizers
+    return embedder._EmbeddingProvider(
+        name=f"test-{uuid.uuid4().hex[:8]}", dimensions=2, model="m", embed=embed, **kwargs,
+    )
+
+
+def _unreachable(calls):
+    async def embed(client, texts):
+        calls.append(len(texts))
+        raise httpx.ConnectError("refused")
+    return embed
+
+
+def _working(calls):
+    async def embed(client, texts):
+        calls.append(len(texts))
+        return [[1.0, 0.0] for _ in texts]
+    return embed
+
+
+def test_failover_to_fallback_then_skip_open_primary():
+    primary_calls, fallback_calls = [], []
+    fallback = _provider(_working(fallback_calls))
+    primary = _provider(_unreachable(primary_calls), fallback=fallback)
+    breaker = health.get_breaker(primary.key)
+
+    async def embed_many(n):
+        for _ in range(n):
+            assert await embedder._embed_with_failover(primary, ["x"]) == [[1.0, 0.0]]
+
+    asyncio.run(embed_many(breaker.failure_threshold + 2))
+    assert breaker.state == OPEN
+    assert len(primary_calls) == breaker.failure_threshold  # no calls once open
+    assert len(fallback_calls) == breaker.failure_threshold + 2
+
+
+def test_open_circuit_without_fallback_raises_circuit_open():
+    primary = _provider(_unreachable([]))
+    breaker = health.get_breaker(primary.key)
+
+    async def embed_many(n):
+        for _ in range(n):
+            with pytest.raises(ProviderUnavailableError):
+                await embedder._embed_with_failover(primary, ["x"])
+
+    asyncio.run(embed_many(breaker.failure_threshold))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(embedder._embed_with_failover(primary, ["x"]))
+
+
+def _rejecting(calls, status, body):
+    async def embed(client, texts):
+        calls.append(len(texts))
+        if len(texts) > 1:
+            request = httpx.Request("POST", "http://provider.test/embed")
+            raise httpx.HTTPStatusError(
+                "rejected", request=request,
+                response=httpx.Response(status, text=body, request=request),
+            )
+        return [[1.0, 0.0]]
+    return embed
+
+
+@pytest.mark.parametrize("status, body", [
+    (413, "Request Entity Too Large"),
+    (400, "input length exceeds the context length"),
+])
+def test_batch_rejected_as_too_large_is_split(status, body):
+    calls = []
+    provider = _provider(_rejecting(calls, status, body))
+    result = asyncio.run(embedder._embed_request(provider, ["a", "b", "c", "d"]))
+    assert result == [[1.0, 0.0]] * 4
+    assert calls == [4, 2, 1, 1, 2, 1, 1]
+
+
+def test_other_bad_request_is_raised_without_splitting():
+    calls = []
+    provider = _provider(_rejecting(calls, 400, "model 'nope' not found"))
+    with pytest.raises(RuntimeError, match="400"):
+        asyncio.run(embedder._embed_request(provider, ["a", "b", "c", "d"]))
+    assert calls == [4]
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from catcot.core import hostpool
+from catcot.core.embedder import _ollama_embed_balanced
+from catcot.core.hostpool import HostPool
+
+A, B, C = "http://a:11434", "http://b:11434", "http://c:11434"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(now=1000.0, time=time.time)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(hostpool, "time", fake)
+    return fake
+
+
+def _states(pool: HostPool) -> dict[str, str]:
+    return {h["url"]: h["state"] for h in pool.stats()}
+
+
+def test_picks_least_outstanding_then_lowest_latency(clock):
+    pool = HostPool((A, B, C), cooldown=10)
+    for url, seconds in ((A, 0.3), (B, 0.1), (C, 0.2)):
+        host = pool.acquire(exclude={u for u in (A, B, C) if u != url})
+        pool.release(host, seconds=seconds)
+
+    first = pool.acquire()
+    second = pool.acquire()
+    third = pool.acquire()
+    assert [first.url, second.url, third.url] == [B, C, A]
+    pool.release(second, seconds=0.2)
+    assert pool.acquire().url == C  # the only host with nothing in flight
+
+
+def test_latency_is_a_moving_average(clock):
+    pool = HostPool((A,), cooldown=10)
+    pool.release(pool.acquire(), seconds=1.0)
+    pool.release(pool.acquire(), seconds=2.0)
+    assert pool.hosts[0].latency == pytest.approx(1.3)
+
+
+def test_failed_host_leaves_rotation_for_the_cooldown(clock):
+    pool = HostPool((A, B), cooldown=10)
+    pool.release(pool.acquire(exclude={B}), error=ConnectionError("refused"))
+    assert _states(pool) == {A: "down", B: "healthy"}
+    assert pool.acquire().url == B
+    assert pool.acquire(exclude={B}) is None
+    clock.now += 10
+    assert _states(pool)[A] == "probing"
+
+
+def test_repeated_failures_back_off_exponentially_up_to_a_cap(clock):
+    pool = HostPool((A,), cooldown=10)
+    waits = []
+    for _ in range(6):
+        pool.release(pool.acquire(), error=TimeoutError())
+        waits.append(pool.stats()[0]["retry_in_seconds"])
+        clock.now += waits[-1]
+    assert waits == [10, 20, 40, 80, 80, 80]
+
+
+def test_recovering_host_takes_one_probe_at_a_time(clock):
+    pool = HostPool((A,), cooldown=10)
+    pool.release(pool.acquire(), error=ConnectionError())
+    clock.now += 10
+    probe = pool.acquire()
+    assert probe is not None
+    assert pool.acquire() is None
+    pool.release(probe, seconds=0.1)
+    assert _states(pool) == {A: "healthy"}
+    assert pool.acquire() is not None and pool.acquire() is not None
+
+
+def test_release_without_outcome_keeps_health(clock):
+    pool = HostPool((A,), cooldown=10)
+    host = pool.acquire()
+    pool.release(host)  # e.g. a 4xx or cancellation
+    assert host.outstanding == 0
+    assert host.requests == 0
+    assert _states(pool) == {A: "healthy"}
+
+
+def test_ollama_batch_moves_to_another_host_when_one_is_down():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "a":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"embeddings": [[1.0, 0.0]]})
+
+    async def embed(pool):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(3):
+                assert await _ollama_embed_balanced(client, pool, "m", ["x"]) == [[1.0, 0.0]]
+
+    pool = HostPool((A, B), cooldown=10)
+    asyncio.run(embed(pool))
+    assert _states(pool) == {A: "down", B: "healthy"}
+    assert [h.requests for h in pool.hosts] == [1, 3]
@@ -0,0 +1,113 @@
+import pytest
+
+from catcot.core.lexical import (
+    LexicalIndex,
+    _match_expression,
+    looks_like_identifier,
+    split_identifier,
+)
+from catcot.core.searcher import RRF_K, _fuse
+
+
+def _hit(file_path, start=1, similarity=None):
+    return {
+        "project_path": "/proj", "file_path": file_path, "start_line": start,
+        "end_line": start + 5, "similarity": similarity,
+    }
+
+
+def test_fuse_sums_reciprocal_ranks_across_lists():
+    vector = [_hit("a.py", similarity=0.9), _hit("b.py", similarity=0.8)]
+    keyword = [_hit("b.py"), _hit("c.py")]
+    fused = _fuse(vector, keyword, top_k=10)
+
+    assert [h["file_path"] for h in fused] == ["b.py", "a.py", "c.py"]
+    assert fused[0]["score"] == round(1 / (RRF_K + 2) + 1 / (RRF_K + 1), 6)
+    assert fused[1]["score"] == round(1 / (RRF_K + 1), 6)
+    assert fused[0]["similarity"] == 0.8  # the vector hit's fields are kept
+
+
+def test_fuse_keeps_top_k_and_tells_chunks_of_one_file_apart():
+    vector = [_hit("a.py", 1), _hit("a.py", 20)]
+    keyword = [_hit("a.py", 20), _hit("b.py")]
+    fused = _fuse(vector, keyword, top_k=2)
+    assert [(h["file_path"], h["start_line"]) for h in fused] == [("a.py", 20), ("a.py", 1)]
+
+
+@pytest.mark.parametrize("name, parts", [
+    ("getUserName", ["get", "user", "name"]),
+    ("_resolve_provider", ["resolve", "provider"]),
+    ("HTTPClient", ["http", "client"]),
+    ("parse2Json", ["parse", "2", "json"]),
+])
+def test_split_identifier(name, parts):
+    assert split_identifier(name) == parts
+
+
+def test_match_expression_adds_phrase_and_identifier_parts():
+    assert _match_expression("getUser failed") == (
+        '"getuser failed" OR "getuser" OR "get" OR "user" OR "failed"'
+    )
+    assert _match_expression("?!") is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("_resolve_provider", True),
+    ("getUserName()", True),
+    ("os.path", True),
+    ("Foo::bar", True),
+    ("authentication", False),
+    ("how is auth done", False),
+])
+def test_looks_like_identifier(query, expected):
+    assert looks_like_identifier(query) is expected
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    meta = {"start_line": 1, "end_line": 9, "language": "python", "project_path": "/proj"}
+    index.upsert(
+        ["c1", "c2", "c3", "c4"],
+        [
+            "def resolve_provider():\n    return detect()",
+            "def getUserName(user):\n    return user.name",
+            "# unrelated\nx = 1",
+            "def getUserName(bee):\n    return bee.name",
+        ],
+        [
+            {**meta, "file_path": "core/embedder.py", "symbol_name": "resolve_provider"},
+            {**meta, "file_path": "api/users.py", "symbol_name": "getUserName"},
+            {**meta, "file_path": "core/other.py", "symbol_name": ""},
+            {**meta, "file_path": "apiary/hive.py", "symbol_name": "getUserName"},
+        ],
+    )
+    yield index
+    index.close()
+
+
+def test_lexical_search_matches_names_and_their_parts(index):
+    assert [h["file_path"] for h in index.search("resolve_provider", 5)] == ["core/embedder.py"]
+    hits = index.search("user name", 5)
+    assert hits[0]["file_path"] == "api/users.py"
+    assert hits[0]["similarity"] is None and hits[0]["score"] > 0
+
+
+def test_lexical_search_filters(index):
+    assert index.search("resolve_provider", 5, path="api/") == []
+    assert len(index.search("resolve_provider", 5, path="core/*.py")) == 1
+    assert index.search("getUserName", 5, files=frozenset({"core/embedder.py"})) == []
+    assert len(index.search("getUserName", 5, symbol="getUserName")) == 2
+
+
+def test_lexical_path_filter_is_a_directory_not_a_string_prefix(index):
+    for path in ("api", "api/"):
+        assert [h["file_path"] for h in index.search("getUserName", 5, path=path)] == ["api/users.py"]
+    assert len(index.search("getUserName", 5, path="api/users.py")) == 1
+
+
+def test_lexical_delete_files_and_count(index):
+    assert index.count() == 4
+    index.delete_files(["api/users.py"])
+    assert index.count() == 3
+    assert [h["file_path"] for h in index.search("getUserName", 5)] == ["apiary/hive.py"]
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+from catcot.core.ignore import IgnoreMatcher
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A project with .gitignore files; write(rel, text) adds files to it."""
+    (tmp_path / ".git").mkdir()
+
+    def write(rel: str, text: str = "") -> None:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    write.path = tmp_path
+    return write
+
+
+def _matcher(project) -> IgnoreMatcher:
+    return IgnoreMatcher(str(project.path))
+
+
+def test_negation_reincludes_a_file(project):
+    project(".gitignore", "*.log\n!keep.log\n")
+    m = _matcher(project)
+    assert m.is_ignored("debug.log")
+    assert m.is_ignored("sub/debug.log")
+    assert not m.is_ignored("keep.log")
+
+
+def test_negation_cannot_reinclude_inside_an_ignored_directory(project):
+    project(".gitignore", "logs/\n!logs/keep.txt\n")
+    assert _matcher(project).is_ignored("logs/keep.txt")
+
+
+def test_anchored_patterns_match_only_from_their_directory(project):
+    project(".gitignore", "/todo.txt\ndocs/*.md\n")
+    m = _matcher(project)
+    assert m.is_ignored("todo.txt")
+    assert not m.is_ignored("sub/todo.txt")
+    assert m.is_ignored("docs/guide.md")
+    assert not m.is_ignored("sub/docs/guide.md")
+    assert not m.is_ignored("docs/deep/guide.md")
+
+
+def test_unanchored_patterns_match_at_any_depth(project):
+    project(".gitignore", "secret.py\n")
+    m = _matcher(project)
+    assert m.is_ignored("secret.py")
+    assert m.is_ignored("a/b/secret.py")
+
+
+def test_directory_only_patterns(project):
+    project(".gitignore", "out/\n")
+    m = _matcher(project)
+    assert m.is_ignored("out", is_dir=True)
+    assert m.is_ignored("out/main.py")
+    assert not m.is_ignored("out")  # a file named "out"
+
+
+def test_double_star(project):
+    project(".gitignore", "**/gen/*.py\nassets/**\na/**/z.py\n")
+    m = _matcher(project)
+    assert m.is_ignored("gen/x.py")
+    assert m.is_ignored("deep/er/gen/x.py")
+    assert m.is_ignored("assets/img/logo.txt")
+    assert not m.is_ignored("assets", is_dir=True)
+    assert m.is_ignored("a/z.py")
+    assert m.is_ignored("a/b/c/z.py")
+    assert not m.is_ignored("b/z.py")
+
+
+def test_single_star_and_class_do_not_cross_directories(project):
+    project(".gitignore", "src/*.tmp\nfile[0-9].txt\n")
+    m = _matcher(project)
+    assert m.is_ignored("src/a.tmp")
+    assert not m.is_ignored("src/sub/a.tmp")
+    assert m.is_ignored("file1.txt")
+    assert not m.is_ignored("filex.txt")
+
+
+def test_nested_gitignore_is_relative_to_its_directory(project):
+    project(".gitignore", "*.tmp\n")
+    project("pkg/.gitignore", "/local.py\n!keep.tmp\n")
+    m = _matcher(project)
+    assert m.is_ignored("pkg/local.py")
+    assert not m.is_ignored("local.py")
+    assert not m.is_ignored("pkg/sub/local.py")
+    assert not m.is_ignored("pkg/keep.tmp")
+    assert m.is_ignored("keep.tmp")
+
+
+def test_git_info_exclude_and_builtin_rules(project):
+    project(".git/info/exclude", "scratch/\n")
+    project(".gitignore", "!node_modules/\n")
+    m = _matcher(project)
+    assert m.is_ignored("scratch/notes.py")
+    assert m.is_ignored("node_modules/pkg/index.js")  # built-ins cannot be negated
+    assert m.is_ignored("image.png")
+
+
+def test_project_in_a_repo_subdirectory_sees_parent_rules(project):
+    project(".gitignore", "app/generated/\n")
+    project("app/main.py")
+    m = IgnoreMatcher(str(project.path / "app"))
+    assert m.is_ignored("generated/x.py")
+    assert not m.is_ignored("main.py")
+
+
+def test_rules_reload_when_gitignore_changes(project):
+    project(".gitignore", "*.py\n")
+    m = _matcher(project)
+    assert m.is_ignored("a.py")
+    project(".gitignore", "*.txt\n")
+    os.utime(project.path / ".gitignore", ns=(1, 1))  # mtime differs for sure
+    assert not m.is_ignored("a.py")
+
+
+def test_walk_prunes_ignored_directories(project):
+    project(".gitignore", "skip/\n*.log\n")
+    project("src/a.py")
+    project("src/b.log")
+    project("skip/c.py")
+    walked = {rel_dir: sorted(files) for rel_dir, files in _matcher(project).walk()}
+    assert walked["src"] == ["a.py"]
+    assert "skip" not in walked
@@ -0,0 +1,23 @@
+import asyncio
+
+from catcot.core import indexer
+from catcot.core.indexer import index_project
+
+
+def test_file_that_fails_to_chunk_is_skipped_not_fatal(tmp_path, offline_provider, monkeypatch, capsys):
+    (tmp_path / "good.py").write_text("def good():\n    return 1\n")
+    (tmp_path / "bad.py").write_text("def bad():\n    return 2\n")
+    get_chunker = indexer.get_chunker
+
+    class Broken:
+        def chunk(self, content, rel_path):
+            if rel_path == "bad.py":
+                raise RecursionError("maximum recursion depth exceeded")
+            return get_chunker(".py").chunk(content, rel_path)
+
+    monkeypatch.setattr(indexer, "get_chunker", lambda suffix: Broken())
+    stats = asyncio.run(index_project(str(tmp_path)))
+
+    assert stats["files_indexed"] == 1
+    assert stats["files_skipped"] == 1
+    assert "[Catcot] Skipping bad.py: could not chunk it" in capsys.readouterr().err
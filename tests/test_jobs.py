@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from catcot.core import jobs
+from catcot.core.jobs import start_index_job
+
+
+@pytest.fixture
+def project(tmp_path, offline_provider):
+    """A small project indexed with a deterministic offline provider."""
+    for i in range(3):
+        (tmp_path / f"m{i}.py").write_text(f"def f{i}():\n    return {i}\n")
+    return str(tmp_path)
+
+
+def test_reindex_is_rejected_while_an_incremental_job_runs(project):
+    async def run():
+        job = start_index_job(project)
+        assert start_index_job(project) is job
+        with pytest.raises(ValueError, match=f"job {job.id} is already running"):
+            start_index_job(project, reindex=True)
+        await job.task
+        assert job.status == "completed"
+
+        full = start_index_job(project, reindex=True)
+        assert full is not job and full.reindex
+        assert start_index_job(project) is full  # an incremental run joins a re-index
+        await full.task
+        return full
+
+    assert asyncio.run(run()).stats["files_indexed"] == 3
+
+
+@pytest.fixture
+def jobs_file(tmp_path, monkeypatch):
+    """An isolated jobs file; write(records) stores other processes' jobs in it."""
+    path = tmp_path / "index_jobs.json"
+    monkeypatch.setattr(jobs, "INDEX_JOBS_FILE", str(path))
+    monkeypatch.setattr(jobs, "_JOBS", {})
+
+    def write(*records):
+        path.write_text(json.dumps([
+            {"id": job_id, "project_path": project, "status": status, "pid": pid}
+            for job_id, project, status, pid in records
+        ]))
+    write.path = path
+    return write
+
+
+@pytest.fixture
+def other_process():
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    yield proc.pid
+    proc.kill()
+    proc.wait()
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_live_job_of_another_process_is_left_running(jobs_file, other_process, project):
+    jobs_file(("other", project, "running", other_process))
+
+    job = jobs.get_job("other")
+    assert job.status == "running" and not job.local
+    with pytest.raises(ValueError, match="still running"):
+        jobs.resume_job("other")
+    with pytest.raises(ValueError, match=f"another Catcot process \\(pid {other_process}"):
+        asyncio.run(_start(project))
+
+
+def test_job_of_a_dead_process_is_interrupted_and_resumable(jobs_file, project):
+    jobs_file(("gone", project, "running", _dead_pid()), ("old", project, "pending", None))
+
+    assert jobs.get_job("gone").status == "interrupted"
+    assert jobs.get_job("old").status == "interrupted"  # written before jobs had a pid
+
+    async def resume():
+        job = jobs.resume_job("gone")
+        await job.task
+        return job
+    assert asyncio.run(resume()).resumed_from == "gone"
+
+
+def test_saving_keeps_other_processes_jobs(jobs_file, other_process, project, tmp_path):
+    jobs_file(("other", str(tmp_path / "elsewhere"), "running", other_process))
+    jobs.get_job("other")
+
+    # The other process finishes its job after this one loaded the file
+    jobs_file(("other", str(tmp_path / "elsewhere"), "completed", other_process))
+    job = asyncio.run(_run_job(project))
+
+    saved = {rec["id"]: rec for rec in json.loads(jobs_file.path.read_text())}
+    assert saved["other"]["status"] == "completed"
+    assert saved[job.id]["status"] == "completed"
+    assert saved[job.id]["pid"] == os.getpid()
+
+
+async def _start(project):
+    return jobs.start_index_job(project)
+
+
+async def _run_job(project):
+    job = jobs.start_index_job(project)
+    await job.task
+    return job
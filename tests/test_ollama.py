@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from catcot.core.embedder import MIN_CHARS, _ollama_embed_batch
+
+CONTEXT_ERROR = '{"error":"the input length exceeds the context length"}'
+
+
+def _ollama(max_chars: int, requests: list):
+    """Mock Ollama that rejects any input longer than max_chars."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        requests.append([len(i) for i in inputs])
+        if any(len(i) > max_chars for i in inputs):
+            return httpx.Response(400, text=CONTEXT_ERROR)
+        return httpx.Response(200, json={"embeddings": [[float(len(i)), 1.0] for i in inputs]})
+    return httpx.MockTransport(handler)
+
+
+def _embed(batch: list[str], max_chars: int, requests: list):
+    async def run():
+        async with httpx.AsyncClient(transport=_ollama(max_chars, requests)) as client:
+            return await _ollama_embed_batch(client, "http://ollama.test", "m", batch)
+    return asyncio.run(run())
+
+
+def test_batch_is_sent_in_one_request():
+    requests = []
+    result = _embed(["a" * 10, "b" * 20], max_chars=100, requests=requests)
+    assert result == [[10.0, 1.0], [20.0, 1.0]]
+    assert requests == [[10, 20]]
+
+
+def test_input_over_the_context_is_split_and_the_rest_retried():
+    requests = []
+    long_text = "x" * 1500 + "\n" + "y" * 1500
+    result = _embed(["short", long_text], max_chars=2000, requests=requests)
+
+    # whole batch, the long input alone, its two halves, then the rest of the batch
+    assert requests == [[5, 3001], [3001], [1501], [1500], [5]]
+    assert result[0] == [5.0, 1.0]
+    assert len(result[1]) == 2  # halves pooled into one vector
+
+
+def test_input_rejected_at_the_minimum_size_raises_runtime_error():
+    with pytest.raises(RuntimeError, match="ollama API error: 400 .*context length of model 'm'"):
+        _embed(["z" * (MIN_CHARS * 2)], max_chars=MIN_CHARS // 4, requests=[])
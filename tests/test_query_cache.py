@@ -0,0 +1,110 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from catcot.core import embed_cache
+from catcot.core.embed_cache import QueryCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the cache: clock.now += seconds."""
+    fake = SimpleNamespace(now=1000.0, time=time.time)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(embed_cache, "time", fake)
+    return fake
+
+
+def _compute(vector, calls, delay=0.0):
+    async def compute():
+        calls.append(vector)
+        if delay:
+            await asyncio.sleep(delay)
+        return vector
+    return compute
+
+
+def test_hit_within_ttl_and_recompute_after_expiry(clock):
+    cache = QueryCache(max_entries=8, ttl=60)
+    calls = []
+
+    async def lookups():
+        assert await cache.get_or_compute(("q",), _compute([1.0], calls)) == [1.0]
+        clock.now += 59
+        assert await cache.get_or_compute(("q",), _compute([2.0], calls)) == [1.0]
+        clock.now += 2
+        assert await cache.get_or_compute(("q",), _compute([3.0], calls)) == [3.0]
+
+    asyncio.run(lookups())
+    assert calls == [[1.0], [3.0]]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_entries=2, ttl=60)
+    calls = []
+
+    async def lookups():
+        await cache.get_or_compute(("a",), _compute([1.0], calls))
+        await cache.get_or_compute(("b",), _compute([2.0], calls))
+        await cache.get_or_compute(("a",), _compute([9.0], calls))  # a is now most recent
+        await cache.get_or_compute(("c",), _compute([3.0], calls))  # evicts b
+        assert await cache.get_or_compute(("a",), _compute([9.0], calls)) == [1.0]
+        assert await cache.get_or_compute(("b",), _compute([4.0], calls)) == [4.0]
+
+    asyncio.run(lookups())
+    assert calls == [[1.0], [2.0], [3.0], [4.0]]
+
+
+def test_concurrent_lookups_share_one_computation():
+    cache = QueryCache(max_entries=8, ttl=60)
+    calls = []
+
+    async def lookups():
+        return await asyncio.gather(*(
+            cache.get_or_compute(("q",), _compute([1.0], calls, delay=0.01))
+            for _ in range(5)
+        ))
+
+    assert asyncio.run(lookups()) == [[1.0]] * 5
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced) == (1, 4)
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    cache = QueryCache(max_entries=8, ttl=60)
+    calls = []
+
+    async def failing():
+        calls.append("fail")
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def lookups():
+        results = await asyncio.gather(
+            *(cache.get_or_compute(("q",), failing) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await cache.get_or_compute(("q",), _compute([1.0], calls))
+
+    assert asyncio.run(lookups()) == [1.0]
+    assert calls == ["fail", [1.0]]
+
+
+def test_follower_computes_when_the_leader_is_cancelled():
+    cache = QueryCache(max_entries=8, ttl=60)
+    calls = []
+
+    async def lookups():
+        leader = asyncio.create_task(cache.get_or_compute(("q",), _compute([1.0], calls, delay=1)))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute(("q",), _compute([2.0], calls)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(lookups()) == [2.0]
+    assert calls == [[1.0], [2.0]]
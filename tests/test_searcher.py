@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from catcot.core import searcher
+from catcot.core.registry import CollectionEntry
+
+
+def _entry(name):
+    return CollectionEntry(SimpleNamespace(name=name), {"project_path": f"/{name}"}, 1, 0.0)
+
+
+def test_deadline_bounds_the_whole_call_not_each_pass(monkeypatch):
+    release = threading.Event()
+
+    def search_entry(entry, query, embedding, depth, filters, lexical):
+        if entry.name == "slow":
+            release.wait(5)
+        return [], []
+
+    async def provider_info():
+        return {"name": "test"}
+
+    async def embed_query(query, dims=None):
+        return [0.0]
+
+    monkeypatch.setattr(searcher, "list_collection_entries", lambda: [_entry("fast"), _entry("slow")])
+    monkeypatch.setattr(searcher, "resolve_provider_info", provider_info)
+    monkeypatch.setattr(searcher, "embed_query", embed_query)
+    monkeypatch.setattr(searcher, "_search_entry", search_entry)
+    monkeypatch.setenv("CATCOT_HYBRID_SEARCH", "1")
+
+    # An identifier with no keyword hits takes both the lexical and the hybrid pass
+    t0 = time.monotonic()
+    try:
+        results = asyncio.run(searcher.search_code("getUserName", deadline=0.4))
+    finally:
+        release.set()
+    elapsed = time.monotonic() - t0
+
+    assert elapsed < 0.6
+    assert [s["reason"] for s in results.skipped] == ["deadline"]
+
+
+def test_path_filter_is_a_directory_not_a_string_prefix():
+    entry = _entry("proj")
+    entry._file_paths = frozenset({"src/api/routes.py", "src/apiary/hive.py", "src/api"})
+
+    for path in ("src/api", "src/api/"):
+        where = searcher.SearchFilters(path=path).where(entry)
+        assert where == {"file_path": {"$in": ["src/api", "src/api/routes.py"]}}
+    assert searcher.SearchFilters(path="src/api/routes.py").where(entry) == {
+        "file_path": "src/api/routes.py"
+    }
@@ -0,0 +1,90 @@
+import pytest
+
+from catcot.core.lexical import LexicalIndex
+from catcot.core.symbols import SymbolTable
+
+
+def _meta(name, file_path="a.py", start=1):
+    return {
+        "symbol_name": name, "file_path": file_path, "start_line": start,
+        "end_line": start + 3, "language": "python", "project_path": "/proj",
+    }
+
+
+@pytest.fixture
+def table():
+    table = SymbolTable()
+    for i, (name, path) in enumerate([
+        ("UserRepository", "repo.py"),
+        ("UserRepositoryImpl", "repo_impl.py"),
+        ("userRepository", "wiring.py"),
+        ("UserService", "service.py"),
+        ("parse_config", "config.py"),
+        ("(imports)", "repo.py"),
+    ]):
+        table.add(f"c{i}", _meta(name, path))
+    return table
+
+
+def _names(hits):
+    return [(kind, symbol.name) for kind, _, symbol in hits]
+
+
+def test_labels_are_not_symbols(table):
+    assert len(table) == 5
+    assert table.lookup("(imports)", "exact") == []
+
+
+def test_exact_ignores_case_and_ranks_exact_case_first(table):
+    hits = table.lookup("userRepository", "exact")
+    assert _names(hits) == [("exact", "userRepository"), ("exact", "UserRepository")]
+    assert all(score == 1.0 for _, score, _ in hits)
+
+
+def test_prefix_returns_closest_completions_first(table):
+    hits = table.lookup("UserRepo", "prefix")
+    assert [s.name for _, _, s in hits][-1] == "UserRepositoryImpl"
+    assert {s.name for _, _, s in hits} == {"UserRepository", "userRepository", "UserRepositoryImpl"}
+    assert table.lookup("user", "prefix", limit=2)[0][2].name.lower() == "userrepository"
+
+
+def test_fuzzy_tolerates_typos(table):
+    hits = table.lookup("UserRepostory", "fuzzy")
+    assert hits[0][2].name.lower() == "userrepository"
+    assert 0.3 <= hits[0][1] < 1.0
+    assert table.lookup("zzzzqqq", "fuzzy") == []
+
+
+def test_auto_goes_exact_then_prefix_then_fuzzy_without_duplicates(table):
+    hits = table.lookup("UserRepository", "auto")
+    kinds = [kind for kind, _, _ in hits]
+    assert kinds == sorted(kinds, key=["exact", "prefix", "fuzzy"].index)
+    assert kinds[:2] == ["exact", "exact"]
+    assert len({id(s) for _, _, s in hits}) == len(hits)
+    assert len(table.lookup("UserRepository", "auto", limit=2)) == 2
+
+
+def test_replacing_and_removing_keep_the_indexes_in_step(table):
+    table.add("c4", _meta("load_config", "config.py"))  # renamed declaration
+    assert table.lookup("parse_config", "exact") == []
+    assert table.lookup("parse_conf", "prefix") == []
+    assert _names(table.lookup("load_config", "exact")) == [("exact", "load_config")]
+
+    table.remove("c3")
+    assert table.lookup("UserService", "exact") == []
+    assert all(s.name != "UserService" for _, _, s in table.lookup("UserService", "auto"))
+
+
+def test_attached_table_follows_lexical_writes(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.upsert(["c1"], ["def alpha(): pass"], [_meta("alpha")])
+    table = SymbolTable()
+    index.attach_symbols(table)
+    assert _names(table.lookup("alpha", "exact")) == [("exact", "alpha")]
+
+    index.upsert(["c2"], ["def beta(): pass"], [_meta("beta", "b.py")])
+    index.update(["c1"], [_meta("alpha", start=10)])
+    assert table.lookup("alpha", "exact")[0][2].start_line == 10
+    index.delete_files(["b.py"])
+    assert table.lookup("beta", "exact") == []
+    index.close()